@@ -0,0 +1,269 @@
+"""
+Adaptive parameter search on BacktestEngine (adaptive_search.py)
+================================================================
+
+Instead of running every combination of a grid on every pair:
+
+1. Successive halving: all candidates are run on a small random subset of the
+   pairs, the best 1/eta are promoted to eta times more pairs, and so on until
+   the survivors run on the whole universe. Pair subsets are nested and the
+   (combination, pair) trades are journaled (SweepJournal), so a promotion
+   only computes the newly added pairs; an interrupted search resumes too.
+2. Refinement (TPE-style): full-universe results are split into good (top
+   `gamma`) and bad ones; per parameter a smoothed density of the good, l(x),
+   and of the rest, g(x), is built (ordinal parameters also weight their grid
+   neighbours) and the unexplored grid points with the highest l(x)/g(x) are
+   run on the whole universe. Repeated for `refine_rounds` rounds.
+
+Every full-universe result is passed to on_result(point, trades), e.g. to
+store it in the results DB. The ranking is by metric(trades) (default: total
+pnl_usd); summary['cost'] is the fraction of the exhaustive (combination x
+pair) work that was actually computed.
+
+    python adaptive_search.py --top-k 20
+"""
+
+import argparse
+import itertools
+import math
+import os
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest_framework import BacktestEngine
+from src import config, storage
+from sweep_journal import SweepJournal
+
+SEARCH_JOURNAL_FILE = config.META_DIR / "adaptive_search.sqlite"
+
+
+def total_pnl(trades: pd.DataFrame) -> float:
+    return float(trades['pnl_usd'].sum()) if len(trades) else 0.0
+
+
+def _is_ordinal(values: Sequence) -> bool:
+    return all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values)
+
+
+def tpe_propose(space: Dict[str, Sequence], good: List[Dict], bad: List[Dict], n: int,
+                exclude=(), samples: int = 64, prior: float = 1.0, rng=None) -> List[Dict]:
+    """
+    Up to n grid points (not in `exclude`, a set of point keys) maximizing
+    l(x) / g(x), with independent per-parameter densities over the grid values.
+    Points are drawn from l(x); `samples` draws per requested point.
+    """
+    rng = rng or np.random.default_rng(0)
+    names = list(space)
+
+    def density(points, values):
+        weights = np.full(len(values), prior / len(values))
+        index = {v: i for i, v in enumerate(values)}
+        ordinal = _is_ordinal(values)
+        for p in points:
+            i = index[p]
+            weights[i] += 1.0
+            if ordinal:  # neighbours on the grid share some of the mass
+                if i > 0:
+                    weights[i - 1] += 0.5
+                if i + 1 < len(values):
+                    weights[i + 1] += 0.5
+        return weights / weights.sum()
+
+    l = {k: density([p[k] for p in good], list(space[k])) for k in names}
+    g = {k: density([p[k] for p in bad], list(space[k])) for k in names}
+
+    draws = {k: rng.choice(len(space[k]), size=n * samples, p=l[k]) for k in names}
+    scored = {}
+    for j in range(n * samples):
+        idx = tuple(int(draws[k][j]) for k in names)
+        point_key = tuple(space[k][i] for k, i in zip(names, idx))
+        if point_key in exclude or point_key in scored:
+            continue
+        scored[point_key] = sum(math.log(l[k][i]) - math.log(g[k][i]) for k, i in zip(names, idx))
+    best = sorted(scored, key=scored.get, reverse=True)[:n]
+    return [dict(zip(names, key)) for key in best]
+
+
+class AdaptiveSearch:
+    """
+    Successive halving over pair subsets plus TPE refinement for one SignalStrategy.
+
+    space: {parameter: grid values}; candidates are points of the product grid.
+    build(point) -> run_batch combination dict (default: the point itself plus
+    `fixed`), so a driver can keep its own parameter encoding.
+    """
+
+    def __init__(self, engine: BacktestEngine, strategy_class, space: Dict[str, Sequence],
+                 build: Optional[Callable[[Dict], Dict]] = None, fixed: Optional[Dict] = None,
+                 metric: Callable[[pd.DataFrame], float] = total_pnl, eta: int = 3, min_pairs: int = 4,
+                 seed: int = 0, journal: Optional[SweepJournal] = None, tf_filter: Optional[str] = None,
+                 parallel: bool = True, workers: Optional[int] = None,
+                 on_result: Optional[Callable[[Dict, pd.DataFrame], None]] = None):
+        self.engine = engine
+        self.strategy_class = strategy_class
+        self.space = {k: list(v) for k, v in space.items()}
+        self.build = build or (lambda point: dict(fixed or {}, **point))
+        self.metric = metric
+        self.eta = eta
+        self.rng = np.random.default_rng(seed)
+        self.journal = journal or SweepJournal(SEARCH_JOURNAL_FILE)
+        self.run_kwargs = dict(tf_filter=tf_filter, parallel=parallel, workers=workers)
+        self.on_result = on_result
+
+        pairs = [str(p) for p in storage.list_datasets(engine.data_dir, tf_filter)]
+        self.pairs = [pairs[i] for i in self.rng.permutation(len(pairs))]
+        self.min_pairs = max(1, min(min_pairs, len(self.pairs)))
+        self.evaluated_tasks = set()      # (point key, pair) computed or read back
+        self.scores: Dict[Tuple, Tuple[int, float]] = {}  # point key -> (pairs used, score)
+
+    def key(self, point: Dict) -> Tuple:
+        return tuple(point[k] for k in self.space)
+
+    def grid(self) -> List[Dict]:
+        return [dict(zip(self.space, values)) for values in itertools.product(*self.space.values())]
+
+    def rungs(self) -> List[int]:
+        """Pair counts per rung: the whole universe divided by eta until min_pairs."""
+        sizes = [len(self.pairs)]
+        while sizes[-1] // self.eta >= self.min_pairs:
+            sizes.append(sizes[-1] // self.eta)
+        return sizes[::-1]
+
+    def evaluate(self, points: List[Dict], n_pairs: int) -> List[float]:
+        """
+        Scores of the points on the first n_pairs pairs (full universe: on_result is called).
+        Pairs run_batch left out after retries do not count: such a point is scored on
+        fewer pairs, so it is never taken for a full-universe result.
+        """
+        if not points:
+            return []
+        pairs = self.pairs[:n_pairs]
+        frames = self.engine.run_batch(self.strategy_class, [self.build(p) for p in points], pairs=pairs,
+                                       journal=self.journal, **self.run_kwargs)
+        scores = []
+        for point, frame in zip(points, frames):
+            score = self.metric(frame)
+            failed = set(frame.attrs.get('failed_pairs', []))
+            if failed:
+                print(f"⚠️ {point}: {len(failed)} pairs failed, not a full-universe result")
+            self.scores[self.key(point)] = (n_pairs - len(failed), score)
+            self.evaluated_tasks.update((self.key(point), pair) for pair in pairs if pair not in failed)
+            if n_pairs == len(self.pairs) and not failed and self.on_result:
+                self.on_result(point, frame)
+            scores.append(score)
+        return scores
+
+    def successive_halving(self, points: List[Dict]) -> List[Dict]:
+        """Survivors of the last rung (evaluated on every pair)."""
+        for n_pairs in self.rungs():
+            print(f"🪜 Rung: {len(points)} candidates on {n_pairs}/{len(self.pairs)} pairs")
+            scores = self.evaluate(points, n_pairs)
+            if n_pairs == len(self.pairs):
+                return points
+            order = sorted(range(len(points)), key=lambda i: scores[i], reverse=True)
+            points = [points[i] for i in order[:max(1, math.ceil(len(points) / self.eta))]]
+        return points
+
+    def refine(self, rounds: int, per_round: int, gamma: float = 0.25):
+        full = len(self.pairs)
+        for r in range(rounds):
+            done = [(k, s) for k, (n, s) in self.scores.items() if n == full]
+            if not done:
+                return
+            done.sort(key=lambda item: item[1], reverse=True)
+            n_good = max(1, math.ceil(len(done) * gamma))
+            good = [dict(zip(self.space, k)) for k, _ in done[:n_good]]
+            # Bad: the rest of the full runs and everything pruned on fewer pairs
+            bad = [dict(zip(self.space, k)) for k, _ in done[n_good:]]
+            bad += [dict(zip(self.space, k)) for k, (n, _) in self.scores.items() if n < full]
+            proposals = tpe_propose(self.space, good, bad, per_round,
+                                    exclude={k for k, _ in done}, rng=self.rng)
+            if not proposals:
+                return
+            print(f"🎯 Refinement {r + 1}/{rounds}: {len(proposals)} proposals on all pairs")
+            self.evaluate(proposals, full)
+
+    def run(self, top_k: int = 20, initial: Optional[List[Dict]] = None, refine_rounds: int = 3,
+            per_round: Optional[int] = None, gamma: float = 0.25) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Halving over `initial` (default: the whole grid), then refinement.
+        Returns (top_k full-universe results as a DataFrame of parameters +
+        score, summary dict with evaluations and cost).
+        """
+        if not self.pairs:
+            print("❌ No data files found.")
+            return pd.DataFrame(), {}
+        candidates = initial if initial is not None else self.grid()
+        self.successive_halving(candidates)
+        self.refine(refine_rounds, per_round or max(1, top_k // 2), gamma)
+
+        full = len(self.pairs)
+        rows = [dict(zip(self.space, k), score=s) for k, (n, s) in self.scores.items() if n == full]
+        top = pd.DataFrame(rows).sort_values('score', ascending=False, kind='stable').head(top_k)
+        exhaustive = len(self.grid()) * full
+        summary = {
+            'candidates': len(candidates),
+            'full_runs': len(rows),
+            'tasks': len(self.evaluated_tasks),
+            'cost': len(self.evaluated_tasks) / exhaustive if exhaustive else 0.0,
+        }
+        return top.reset_index(drop=True), summary
+
+
+def mega_batch_space() -> Dict[str, List]:
+    """The run_mega_batch grid as a search space (threshold is |%|, mapped by cond)."""
+    return {
+        'side': ["SHORT", "LONG"],
+        'cond': ["pump", "dump"],
+        'thresh': [1.0, 1.5, 2.0, 2.5, 3.0],
+        'ema': ["none", "all_bear", "all_bull", "big_bear", "big_bull", "small_bear", "small_bull",
+                "big_bear_small_bull", "big_bull_small_bear"],
+        'tp': list(range(1, 11)),
+        'sl': list(range(1, 11)),
+        'tsl': [0, 1.0],
+    }
+
+
+if __name__ == "__main__":
+    from conditions.vectorized_strategy import VectorizedStrategy
+    from results_db import ResultsDB, run_params
+    from run_mega_batch import DATA_ROOT, combination_params, strategy_name, summarize
+
+    parser = argparse.ArgumentParser(description="Adaptive search over the mega batch grid")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--min-pairs", type=int, default=8)
+    parser.add_argument("--refine-rounds", type=int, default=3)
+    parser.add_argument("--tf", default=None, help="Timeframe filter (e.g. 5s)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not os.path.exists(DATA_ROOT):
+        print(f"❌ Data path not found: {DATA_ROOT}")
+        raise SystemExit(1)
+
+    db = ResultsDB()
+    order = list(mega_batch_space())
+
+    def record(point, trades):
+        combo = tuple(point[k] for k in order)
+        key_params = run_params(VectorizedStrategy, **combination_params(*combo))
+        if trades.empty:
+            db.mark_completed(key_params)
+        else:
+            db.record(key_params, summarize(strategy_name(*combo), point['tp'], point['sl'], trades))
+
+    search = AdaptiveSearch(BacktestEngine(data_dir=DATA_ROOT), VectorizedStrategy, mega_batch_space(),
+                            build=lambda p: combination_params(*(p[k] for k in order)),
+                            eta=args.eta, min_pairs=args.min_pairs, seed=args.seed, tf_filter=args.tf,
+                            workers=args.workers, on_result=record)
+    top, summary = search.run(top_k=args.top_k, refine_rounds=args.refine_rounds)
+
+    print(f"\n🏆 Top {len(top)} (full universe):")
+    print(top.to_string())
+    print(f"\n📊 {summary['full_runs']} full runs, {summary['tasks']} (combination, pair) tasks = "
+          f"{summary['cost'] * 100:.1f}% of the exhaustive grid")
+    print(f"📒 Full-universe results stored in {db.path}. Push to Google Sheets with: python results_db.py sync")
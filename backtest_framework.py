@@ -1,10 +1,19 @@
 import pandas as pd
 import numpy as np
 import os
+import heapq
+import itertools
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from contextlib import contextmanager, nullcontext
+from types import MappingProxyType
+from typing import List, Dict, Mapping, NamedTuple, Optional, Tuple
 from dataclasses import dataclass
+import tempfile
 import warnings
+import polars as pl
+
+from conditions.signal_batch import SignalFeatures, ThresholdLadder
+from src import features, hot_cache, storage
 
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
@@ -22,6 +31,14 @@ class Trade:
     pump_percent: float = 0.0
     level: int = 1  # Pyramid level (1=first position, 2=second, etc.)
 
+@dataclass
+class ExitParams:
+    side: str = 'SHORT'  # 'SHORT' | 'LONG'
+    tp: float = 0.04
+    sl: float = 0.02
+    tsl: float = 0.0
+    bet_size: float = 7.0
+
 class Strategy(ABC):
     """
     Abstract Base Class for all strategies.
@@ -40,37 +57,181 @@ class Strategy(ABC):
         """
         pass
 
+class SignalStrategy(Strategy):
+    """
+    Vectorized strategy protocol. The engine owns loading, caching and column
+    projection; a SignalStrategy never touches the filesystem.
+
+      required_columns  bar columns signals() reads (the time column is added by the engine)
+      feature_columns   optional materialized columns (src/features.py) added when their sidecars exist
+      warmup_bars       leading bars whose signals are discarded (indicator warm-up)
+      signals(bars)     pure function of a Polars frame -> bool array / pl.Series / pl.Expr
+      exit_params()     side, TP, SL, TSL and bet size for simulate_exits
+    """
+    required_columns: Tuple[str, ...] = ('open', 'high', 'low', 'close')
+    feature_columns: Tuple[str, ...] = ()
+    warmup_bars: int = 0
+
+    @abstractmethod
+    def signals(self, bars):
+        pass
+
+    def exit_params(self) -> ExitParams:
+        return ExitParams(
+            side=getattr(self, 'side', 'SHORT'),
+            tp=getattr(self, 'tp', 0.04),
+            sl=getattr(self, 'sl', 0.02),
+            tsl=self.tsl,
+            bet_size=self.bet_size,
+        )
+
+    def on_candle(self, timestamp, open, high, low, close) -> Optional[Dict]:
+        # Evaluated in bulk through signals(); no row-wise behaviour by default
+        return None
+
+class MultiTimeframeStrategy(SignalStrategy):
+    """
+    Signal strategy over base timeframe(s) plus context timeframes of the same symbol.
+    The engine schedules one task per symbol and loads every timeframe once.
+
+      base_timeframes   TFs whose bars are traded (signals + exits), one result set each
+      context_columns   {tf: columns} read from each context TF
+      context(tf, bars) columns computed on the native context bars (indicators belong
+                        here, not on the aligned copy); default: the raw context_columns
+
+    signals(bars) gets the base bars plus every context column as "<name>_<tf>",
+    taken as-of from the last context bar CLOSED at or before the base bar's close
+    (ts_1s is the bar open, so close = ts_1s + TF): no future leakage.
+    """
+    base_timeframes: Tuple[str, ...] = ('5s',)
+    context_columns: Mapping[str, Tuple[str, ...]] = MappingProxyType({})  # read-only; subclasses assign their own
+
+    def context(self, tf: str, bars: pl.DataFrame):
+        """pl.Expr list or a DataFrame (one row per context bar) of context columns."""
+        return [pl.col(c) for c in self.context_columns[tf]]
+
+class CrossSectionalStrategy(SignalStrategy):
+    """
+    Universe-wide strategy for BacktestEngine.run_cross_sectional: each pair is
+    scored on its own bars, then candidates are ranked across all pairs per bar
+    timestamp ("short the top 3 pumps of the universe this minute").
+
+      score(bars)   per-bar score of one pair (pl.Expr / pl.Series / array); null or NaN = no candidate
+      top_n         entries taken per timestamp, best scores first
+      ascending     rank lowest scores first instead
+
+    In a pair-major run() every scored bar is a signal.
+    """
+    top_n: int = 3
+    ascending: bool = False
+
+    @abstractmethod
+    def score(self, bars):
+        pass
+
+    def signals(self, bars):
+        return ~np.isnan(evaluate_scores(self, bars))
+
+def align_context(base: pl.DataFrame, base_tf: str, context: pl.DataFrame, tf: str,
+                  ts_col: str = storage.TS_COL) -> pl.DataFrame:
+    """
+    As-of join of context columns onto base bars on bar CLOSE times: each base bar
+    sees the last context bar that closed at or before it closed.
+    Context columns are suffixed with "_<tf>".
+    """
+    key = "_close_ts"
+    left = base.with_columns(pl.col(ts_col).dt.offset_by(base_tf).alias(key)).set_sorted(key)
+    right = context.select(
+        pl.col(ts_col).dt.offset_by(tf).alias(key),
+        *[pl.col(c).alias(f"{c}_{tf}") for c in context.columns if c != ts_col],
+    ).set_sorted(key)
+    return left.join_asof(right, on=key, strategy="backward").drop(key)
+
+class CompositeState:
+    """
+    What action_func sees each candle: merged conditions of all strategies plus TP/SL.
+    One instance per pair, updated in place (no per-candle objects).
+    """
+    __slots__ = ('conditions', 'tp', 'sl')
+
+    def __init__(self, base_strat):
+        self.conditions = {}
+        self.tp = getattr(base_strat, 'tp', 0.04)
+        self.sl = getattr(base_strat, 'sl', 0.04)
+
+
+class Candle:
+    """Reused per-row candle; supports candle['open'] for action funcs written against dicts."""
+    __slots__ = ('timestamp', 'open', 'high', 'low', 'close')
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+
+class RowConditions:
+    """
+    Read-only view of precomputed condition arrays at the current row
+    (strategies implementing batch_conditions). state.conditions['x'] -> arrays['x'][row].
+    """
+    __slots__ = ('arrays', 'row')
+
+    def __init__(self, arrays: Dict[str, list]):
+        self.arrays = arrays
+        self.row = 0
+
+    def __getitem__(self, key):
+        return self.arrays[key][self.row]
+
+    def get(self, key, default=None):
+        values = self.arrays.get(key)
+        return default if values is None else values[self.row]
+
+    def __contains__(self, key):
+        return key in self.arrays
+
+    def keys(self):
+        return self.arrays.keys()
+
+
 # Top-level function for multiprocessing (must be picklable)
 def process_single_pair(args):
     """
-    Worker function to process a single parquet file.
+    Row-wise worker for strategies without a vectorized path (on_candle + action_func).
     args: (filepath, strategy_classes, check_current_candle, strategy_kwargs)
     Note: strategy_classes can be a single class or a list of classes.
+
+    Condition interface (per strategy, fastest first):
+      - batch_conditions(df) -> {name: array}: computed once, exposed to action_func
+        as state.conditions[name] at the current row; on_candle is not called.
+      - on_candle(timestamp, open, high, low, close) + .conditions dict: called every row.
+    Decision: action_func(state, candle) -> {'action': 'SHORT'|'LONG', 'entry_price', 'tp', 'sl', ...}
+    (prices). Without action_func the primary strategy's on_candle return
+    {'type', 'tp', 'sl'} (fractions) enters at the close.
+    If action_func.candidates(condition_arrays) exists, it returns a bool mask of rows where
+    an entry is possible and flat stretches between them are skipped.
     """
     filepath, strategy_classes, check_current_candle, strategy_kwargs = args
     
-    # Extract action_func if provided
+    # Extract engine-level options (not strategy constructor args)
+    strategy_kwargs = dict(strategy_kwargs)
     action_func = strategy_kwargs.pop('action_func', None)
+    use_cache = strategy_kwargs.pop('use_cache', True)
     
     try:
-        path = args[0] if isinstance(args, tuple) else args
-        # Check if dir
         import pathlib
-        import polars as pl
         p = pathlib.Path(filepath)
         
-        if p.is_dir():
-             # Load directory
-             df = pl.scan_parquet(str(p / "*.parquet")).collect().sort("ts_1s").to_pandas()
-        else:
-             df = pd.read_parquet(filepath)
+        # Memory-mapped hot cache if fresh, else parquet (sorted/unique on write, see src.storage)
+        df = hot_cache.load_bars(p, use_cache=use_cache).to_pandas()
 
         if df.empty: return []
 
-        symbol = os.path.basename(filepath).replace('.parquet', '')
+        symbol = _display_symbol(p)
         
         # --- MULTI-CONDITION SUPPORT ---
-        # Ensure strategy_classes is a list
         if not isinstance(strategy_classes, list):
             strategy_classes = [strategy_classes]
             
@@ -85,252 +246,180 @@ def process_single_pair(args):
             if hasattr(st, 'prep_data'):
                 st.prep_data(df)
             strategies.append(st)
-
             
         primary_strategy = strategies[0] # Use this for bet_size access
+        bet_size = primary_strategy.bet_size
+        tsl = getattr(primary_strategy, 'tsl', 0.0)
         
-        opens = df['open'].values
-        highs = df['high'].values
-        lows = df['low'].values
-        closes = df['close'].values
+        # Positional access on Python lists is much cheaper than numpy scalars per row
+        opens = df['open'].tolist()
+        highs = df['high'].tolist()
+        lows = df['low'].tolist()
+        closes = df['close'].tolist()
         
         if 'open_time' in df.columns:
-            times = df['open_time'].values
+            times = df['open_time'].tolist()
         elif 'ts_1s' in df.columns:
-            times = df['ts_1s'].values
+            times = df['ts_1s'].tolist()
+        else:
+            times = df.index.tolist()
+        n = len(closes)
+
+        # Batched conditions: computed once, no per-row on_candle
+        batched = all(hasattr(st, 'batch_conditions') for st in strategies)
+        state = CompositeState(primary_strategy)
+        candle = Candle()
+        streaming = []
+        candidate_rows = None
+        if batched:
+            arrays = {}
+            for st in strategies:
+                arrays.update({k: np.asarray(v) for k, v in st.batch_conditions(df).items()})
+            if action_func is not None and hasattr(action_func, 'candidates'):
+                candidate_rows = np.flatnonzero(action_func.candidates(arrays))
+            state.conditions = RowConditions({k: v.tolist() for k, v in arrays.items()})
         else:
-            times = df.index.values
+            streaming = [(st, st.on_candle, hasattr(st, 'conditions')) for st in strategies]
         
         in_position = False
         position_side = None # 'LONG' or 'SHORT'
         entry_price = 0.0
         tp_price = 0.0
         sl_price = 0.0
+        best_price = 0.0
         entry_time = None
         entry_pump = 0.0
         
         completed_trades = []
+
+        def close_trade(exit_time, exit_type, exit_price):
+            if position_side == 'SHORT':
+                pnl_pct = (entry_price - exit_price) / entry_price
+            else: # LONG
+                pnl_pct = (exit_price - entry_price) / entry_price
+            completed_trades.append(Trade(
+                symbol=symbol,
+                entry_time=str(entry_time),
+                exit_time=str(exit_time),
+                type=exit_type,
+                entry_price=entry_price,
+                exit_price=exit_price,
+                pnl_percent=pnl_pct,
+                pnl_usd=bet_size * pnl_pct,
+                duration_min=0,
+                pump_percent=entry_pump
+            ))
         
-        for i in range(len(closes)):
+        i = 0
+        while i < n:
             current_time = times[i]
+            high = highs[i]
+            low = lows[i]
+
+            # 1. Indicator updates (incremental strategies need every candle)
+            result = None
+            if streaming:
+                merged = state.conditions
+                merged.clear()  # only this candle's conditions reach action_func
+                for st, on_candle, has_conditions in streaming:
+                    res = on_candle(current_time, opens[i], high, low, closes[i])
+                    if st is primary_strategy:
+                        result = res
+                    if has_conditions:
+                        merged.update(st.conditions)
             
             if in_position:
                 exit_price = 0.0
                 exit_type = ""
                 
-                # SHORT EXIT LOGIC
+                # Static SL/TP first (SL wins a same-candle tie), then trailing SL
                 if position_side == 'SHORT':
-                    if highs[i] >= sl_price:
-                        exit_price = sl_price
-                        exit_type = "SL"
-                    elif lows[i] <= tp_price:
-                        exit_price = tp_price
-                        exit_type = "TP"
-                
-                # LONG EXIT LOGIC
-                elif position_side == 'LONG':
-                    if lows[i] <= sl_price:
-                        exit_price = sl_price
-                        exit_type = "SL"
-                    elif highs[i] >= tp_price:
-                        exit_price = tp_price
-                        exit_type = "TP"
+                    if high >= sl_price:
+                        exit_price, exit_type = sl_price, "SL"
+                    elif low <= tp_price:
+                        exit_price, exit_type = tp_price, "TP"
+                    elif tsl > 0 and high >= best_price * (1 + tsl):
+                        exit_price, exit_type = best_price * (1 + tsl), "TSL"
+                    elif low < best_price:
+                        best_price = low
+                else: # LONG
+                    if low <= sl_price:
+                        exit_price, exit_type = sl_price, "SL"
+                    elif high >= tp_price:
+                        exit_price, exit_type = tp_price, "TP"
+                    elif tsl > 0 and low <= best_price * (1 - tsl):
+                        exit_price, exit_type = best_price * (1 - tsl), "TSL"
+                    elif high > best_price:
+                        best_price = high
                     
                 if exit_type:
-                    if position_side == 'SHORT':
-                        pnl_pct = (entry_price - exit_price) / entry_price
-                    else: # LONG
-                        pnl_pct = (exit_price - entry_price) / entry_price
-                        
-                    pnl_usd = primary_strategy.bet_size * pnl_pct
-                    
-                    completed_trades.append(Trade(
-                        symbol=symbol,
-                        entry_time=str(entry_time),
-                        exit_time=str(current_time),
-                        type=exit_type,
-                        entry_price=entry_price,
-                        exit_price=exit_price,
-                        pnl_percent=pnl_pct,
-                        pnl_usd=pnl_usd,
-                        duration_min=0,
-                        pump_percent=entry_pump
-                    ))
+                    close_trade(current_time, exit_type, exit_price)
                     in_position = False
                     position_side = None
-                    continue
-            
-            if not in_position:
-                # 1. Update State (ALL Conditions)
-                # We collect 'conditions' dict from ALL strategies and merge them
-                merged_conditions = {}
-                
-                for strategy in strategies:
-                    # Run on_candle for indicator updates
-                    # (Some might return trade dicts, but we ignore them if using action_func)
-                    strategy.on_candle(
-                        timestamp=current_time,
-                        open=opens[i],
-                        high=highs[i],
-                        low=lows[i],
-                        close=closes[i]
-                    )
-                    
-                    # Merge conditions if it has them
-                    if hasattr(strategy, 'conditions'):
-                        merged_conditions.update(strategy.conditions)
-                
-                # Create a "Composite" object to pass to actions
-                # It behaves like a strategy instance but has merged conditions
-                class CompositeState:
-                    def __init__(self, conds, base_strat):
-                        self.conditions = conds
-                        self.tp = getattr(base_strat, 'tp', 0.04)
-                        self.sl = getattr(base_strat, 'sl', 0.04)
-                
-                composite_state = CompositeState(merged_conditions, primary_strategy)
-                
-                # 2. Evaluate Decision (Actions)
-                decision = None
-                if action_func:
-                    candle_data = {
-                        'timestamp': current_time,
-                        'open': opens[i],
-                        'high': highs[i],
-                        'low': lows[i],
-                        'close': closes[i]
-                    }
-                    decision = action_func(composite_state, candle_data)
-                
-                if decision:
-                    action = decision.get('action')
-                    if action in ['SHORT', 'LONG']:
-                        entry_price = decision['entry_price']
-                        tp_price = decision['tp']
-                        sl_price = decision['sl']
-                        entry_time = decision.get('timestamp', current_time)
-                        entry_pump = decision.get('pump_percent', 0.0)
-                        should_check_current = decision.get('check_current_candle', check_current_candle)
-
-                        # Validate TP/SL vs Entry to avoid instant triggers if logic is bad
-                        # (Optional check could go here)
-
-                        instant_exit = False
-                        
-                        if should_check_current:
-                            if action == 'SHORT':
-                                if highs[i] >= sl_price:
-                                    instant_exit = True
-                                    exit_price = sl_price
-                                    exit_type = "SL_INSTANT"
-                                    pnl_pct = (entry_price - sl_price) / entry_price
-                                elif lows[i] <= tp_price:
-                                    instant_exit = True
-                                    exit_price = tp_price
-                                    exit_type = "TP_INSTANT"
-                                    pnl_pct = (entry_price - tp_price) / entry_price
-                            elif action == 'LONG':
-                                if lows[i] <= sl_price:
-                                    instant_exit = True
-                                    exit_price = sl_price
-                                    exit_type = "SL_INSTANT"
-                                    pnl_pct = (sl_price - entry_price) / entry_price
-                                elif highs[i] >= tp_price:
-                                    instant_exit = True
-                                    exit_price = tp_price
-                                    exit_type = "TP_INSTANT"
-        return completed_trades
+                i += 1
+                continue
 
-        # Dead code below this line (removed/skipped)
-        curr_idx = 0
-        max_idx = len(df)
-        
-        tp_pct = strategy.tp
-        sl_pct = strategy.sl
-        bet_size = 7.0 # Fixed for now or passed via args
-        
-        while curr_idx < max_idx:
-            # 1. Find Next Signal
-            # Slice the signal array
-            future_signals = arr_signals[curr_idx:]
-            
-            # Find indices where True
-            true_indices = np.where(future_signals)[0]
-            
-            if len(true_indices) == 0:
-                break # No more signals
-            
-            # Global Index of next signal
-            entry_idx = curr_idx + true_indices[0]
-            
-            # Execute Entry
-            entry_price = arr_close[entry_idx]
-            entry_time = arr_time[entry_idx]
-            
-            tp_price = entry_price * (1 - tp_pct)
-            sl_price = entry_price * (1 + sl_pct)
-            
-            # 2. Find Exit (Scan forward from distinct entry_idx + 1)
-            # We look for: Low <= TP  OR  High >= SL
-            
-            # Optimization: We only check slice [entry_idx + 1 : ]
-            search_slice_high = arr_high[entry_idx+1:]
-            search_slice_low = arr_low[entry_idx+1:]
-            
-            # Find first occurrence indices
-            # SL Hit: High >= SL
-            sl_hits = np.where(search_slice_high >= sl_price)[0]
-            
-            # TP Hit: Low <= TP
-            tp_hits = np.where(search_slice_low <= tp_price)[0]
-            
-            first_sl_idx = sl_hits[0] if len(sl_hits) > 0 else 999999999
-            first_tp_idx = tp_hits[0] if len(tp_hits) > 0 else 999999999
-            
-            if first_sl_idx == 999999999 and first_tp_idx == 999999999:
-                # Never exits (End of Data)
-                # Force close at end? Or ignore?
-                break
-                
-            # Compare which happened first
-            if first_sl_idx <= first_tp_idx:
-                # SL Hit
-                local_exit_idx = first_sl_idx
-                exit_type = "SL"
-                exit_price = sl_price
-                pnl_pct = (entry_price - exit_price) / entry_price # Short logic
-            else:
-                # TP Hit
-                local_exit_idx = first_tp_idx
-                exit_type = "TP"
-                exit_price = tp_price
-                pnl_pct = (entry_price - exit_price) / entry_price # Short logic
-                
-            # Global Exit Index
-            real_exit_idx = (entry_idx + 1) + local_exit_idx
-            exit_time = arr_time[real_exit_idx]
-            
-            pnl_usd = bet_size * pnl_pct
-            
-            completed_trades.append(Trade(
-                symbol=os.path.basename(filepath).replace('.parquet',''),
-                entry_time=str(entry_time),
-                exit_time=str(exit_time),
-                type=exit_type,
-                entry_price=entry_price,
-                exit_price=exit_price,
-                pnl_percent=pnl_pct,
-                pnl_usd=pnl_usd,
-                duration_min=0
-            ))
+            # Flat: jump straight to the next candidate row if the action can tell us
+            if candidate_rows is not None:
+                k = np.searchsorted(candidate_rows, i)
+                if k == len(candidate_rows):
+                    break
+                if candidate_rows[k] != i:
+                    i = int(candidate_rows[k])
+                    continue
+            if batched:
+                state.conditions.row = i
             
-            # Resume search AFTER the exit
-            curr_idx = real_exit_idx + 1
+            # 2. Evaluate Decision (Actions)
+            decision = None
+            if action_func:
+                candle.timestamp = current_time
+                candle.open = opens[i]
+                candle.high = high
+                candle.low = low
+                candle.close = closes[i]
+                decision = action_func(state, candle)
+            elif result:
+                # Strategy.on_candle contract: {'type', 'tp', 'sl'} as fractions, entry at close
+                close = closes[i]
+                if result['type'] == 'SHORT':
+                    decision = {'action': 'SHORT', 'entry_price': close,
+                                'tp': close * (1 - result['tp']), 'sl': close * (1 + result['sl'])}
+                else:
+                    decision = {'action': 'LONG', 'entry_price': close,
+                                'tp': close * (1 + result['tp']), 'sl': close * (1 - result['sl'])}
             
+            if decision and decision.get('action') in ('SHORT', 'LONG'):
+                position_side = decision['action']
+                entry_price = decision['entry_price']
+                tp_price = decision['tp']
+                sl_price = decision['sl']
+                entry_time = decision.get('timestamp', current_time)
+                entry_pump = decision.get('pump_percent', 0.0)
+                best_price = entry_price
+                in_position = True
+
+                if decision.get('check_current_candle', check_current_candle):
+                    if position_side == 'SHORT':
+                        if high >= sl_price:
+                            close_trade(current_time, "SL_INSTANT", sl_price)
+                            in_position = False
+                        elif low <= tp_price:
+                            close_trade(current_time, "TP_INSTANT", tp_price)
+                            in_position = False
+                    else:
+                        if low <= sl_price:
+                            close_trade(current_time, "SL_INSTANT", sl_price)
+                            in_position = False
+                        elif high >= tp_price:
+                            close_trade(current_time, "TP_INSTANT", tp_price)
+                            in_position = False
+            i += 1
+
         return completed_trades
 
     except Exception as e:
-        print(f"Error Polars {filepath}: {e}")
+        print(f"Error {filepath}: {e}")
         import traceback
         traceback.print_exc()
         return []
@@ -338,47 +427,38 @@ def process_single_pair(args):
 class BacktestEngine:
     def __init__(self, data_dir: str):
         self.data_dir = data_dir
+        self._executor = None
+
+    @contextmanager
+    def shared_pool(self, workers=None):
+        """
+        Keeps one process pool for every run() inside the block, so in-process
+        batch drivers do not start a new pool per combination:
+            with engine.shared_pool(8):
+                for params in grid: engine.run(VectorizedStrategy, **params)
+        Workers are spawned, not forked: the pool lives next to a parent that
+        has used polars' thread pool, and its start-up is paid once anyway.
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self._executor = ProcessPoolExecutor(max_workers=workers or 8, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            yield self
+        finally:
+            self._executor.shutdown()
+            self._executor = None
         
     def _extract_base_pair(self, symbol: str) -> str:
         """Extract base pair without timeframe suffix. e.g. BTCUSDT_30s -> BTCUSDT"""
         parts = symbol.split('_')
         return parts[0] if parts else symbol
         
-    def run(self, strategy_class, max_positions=10, avg_threshold=0.10, parallel=True, workers=None, check_current_candle=True, tf_filter=None, **strategy_kwargs) -> pd.DataFrame:
-        from pathlib import Path
-        base_path = Path(self.data_dir)
-        raw_path = base_path / "raw"
-        
-        files = [] # This will store paths to "TF Dataset" directories (e.g. raw/BTCUSDT/5s)
-        
-        if raw_path.exists():
-             # New Mode: Iterate symbol directories
-             # Structure: raw/SYMBOL/TF/*.parquet
-             
-             # 1. Get all symbols
-             symbols = [d for d in raw_path.iterdir() if d.is_dir()]
-             
-             for sym_dir in symbols:
-                 # 2. Get all TFs in symbol dir
-                 tfs = [d for d in sym_dir.iterdir() if d.is_dir()]
-                 
-                 for tf_dir in tfs:
-                     tf_name = tf_dir.name # e.g. "5s", "1m"
-                     
-                     if tf_filter and tf_name != tf_filter:
-                         continue
-                         
-                     # Add this dataset directory to processing list
-                     files.append(str(tf_dir))
-                     
-             if tf_filter:
-                 print(f"📂 Timeframe filter applied: {tf_filter}")
-        else:
-             # Legacy Mode
-             files = [os.path.join(self.data_dir, f) for f in os.listdir(self.data_dir) if f.endswith('.parquet')]
-             if tf_filter:
-                files = [f for f in files if f"_{tf_filter}.parquet" in f]
-                print(f"📂 Timeframe filter: {tf_filter} ({len(files)} files)")
+    def run(self, strategy_class, max_positions=10, avg_threshold=0.10, parallel=True, workers=None, check_current_candle=True, tf_filter=None, use_cache=True, **strategy_kwargs) -> pd.DataFrame:
+        # Dataset discovery: raw/SYMBOL/TF directories (new) or SYMBOL_TF.parquet (legacy)
+        files = [str(p) for p in storage.list_datasets(self.data_dir, tf_filter)]
+        if tf_filter:
+            print(f"📂 Timeframe filter applied: {tf_filter} ({len(files)} datasets)")
         
         if not files:
             print("❌ No data files found.")
@@ -394,8 +474,20 @@ class BacktestEngine:
         worker_func = process_single_pair
         desc = "Standard"
         
-        # Check if strategy supports Polars Turbo Mode
-        if hasattr(strategy_class, 'process_file'):
+        if isinstance(strategy_class, type) and issubclass(strategy_class, MultiTimeframeStrategy):
+            # One task per symbol: every timeframe of the symbol is read once
+            if tf_filter:
+                print(f"⚠️ tf_filter ignored: {strategy_class.__name__} sets its own timeframes")
+            files = [{tf: str(p) for tf, p in tfs.items()}
+                     for tfs in storage.list_symbol_timeframes(self.data_dir).values()]
+            worker_func = process_symbol_multi_tf
+            desc = "🧭 MULTI-TF (per symbol)"
+        elif isinstance(strategy_class, type) and issubclass(strategy_class, SignalStrategy):
+            # Strategy protocol: engine loads projected columns, strategy only computes signals
+            worker_func = process_single_pair_signals
+            desc = "⚡ SIGNAL (protocol)"
+        elif hasattr(strategy_class, 'process_file'):
+            # Legacy Polars Turbo Mode (strategy reads its own data)
             worker_func = process_single_pair_polars
             desc = "🚀 TURBO (Polars)"
         
@@ -407,13 +499,21 @@ class BacktestEngine:
              
         print(f"📊 Pyramid Mode: max_positions={max_positions}, avg_threshold={avg_threshold*100:.0f}%")
         
+        # Hot cache (python -m src.hot_cache build); stale entries fall back to parquet
+        if use_cache:
+            datasets = [p for f in files for p in (f.values() if isinstance(f, dict) else [f])]
+            fresh = sum(1 for p in datasets if hot_cache.is_fresh(p))
+            print(f"🔥 Hot cache: {fresh}/{len(datasets)} datasets memory-mapped")
+        worker_kwargs = dict(strategy_kwargs, use_cache=use_cache)
+        
         all_trades = []
         
         if parallel:
             # Prepare arguments for each worker
-            tasks = [(f, strategy_class, check_current_candle, strategy_kwargs) for f in files]
+            tasks = [(f, strategy_class, check_current_candle, worker_kwargs) for f in files]
             
-            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            pool = nullcontext(self._executor) if self._executor else ProcessPoolExecutor(max_workers=num_workers)
+            with pool as executor:
                 # Submit all tasks
                 futures = [executor.submit(worker_func, t) for t in tasks]
                 results = []
@@ -438,7 +538,7 @@ class BacktestEngine:
         else:
             # Serial fallback
             for filepath in files:
-                res = worker_func((filepath, strategy_class, check_current_candle, strategy_kwargs))
+                res = worker_func((filepath, strategy_class, check_current_candle, worker_kwargs))
                 all_trades.extend(res)
                 
         print(f"📊 Raw trades before pyramid filter: {len(all_trades)}")
@@ -449,13 +549,274 @@ class BacktestEngine:
              all_trades = self._apply_pyramid_strategy(all_trades, max_positions, avg_threshold)
         
         print(f"✅ Final trades: {len(all_trades)}")
-        df = pd.DataFrame([t.__dict__ for t in all_trades])
+        return self._trades_frame(all_trades)
+
+    def _trades_frame(self, trades: List[Trade]) -> pd.DataFrame:
+        df = pd.DataFrame([t.__dict__ for t in trades])
         # Reorder columns to put 'level' second (after symbol)
         if not df.empty and 'level' in df.columns:
             cols = ['symbol', 'level'] + [c for c in df.columns if c not in ['symbol', 'level']]
             df = df[cols]
         return df
-    
+
+    def run_threshold_sweep(self, strategy_class, thresholds, max_positions=10, avg_threshold=0.10, parallel=True,
+                            workers=None, tf_filter=None, use_cache=True, **strategy_kwargs) -> Dict[float, pd.DataFrame]:
+        """
+        Same results as calling run() once per pump/dump threshold (check_current_candle
+        is not used by the vectorized workers), but every pair is loaded and its
+        candidates sorted once; see process_single_pair_threshold_sweep.
+        Returns {threshold: trades DataFrame}.
+        """
+        files = [str(p) for p in storage.list_datasets(self.data_dir, tf_filter)]
+        thresholds = list(thresholds)
+        if not files:
+            print("❌ No data files found.")
+            return {t: pd.DataFrame() for t in thresholds}
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        num_workers = workers if workers else 8
+        print(f"🚀 Threshold sweep on {len(files)} pairs: {thresholds}")
+        worker_kwargs = dict(strategy_kwargs, use_cache=use_cache)
+        tasks = [(f, strategy_class, thresholds, worker_kwargs) for f in files]
+
+        if parallel:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                results = list(executor.map(process_single_pair_threshold_sweep, tasks))
+        else:
+            results = [process_single_pair_threshold_sweep(t) for t in tasks]
+
+        out = {}
+        for threshold in thresholds:
+            all_trades = [trade for res in results for trade in res[threshold]]
+            if max_positions > 1:
+                all_trades = self._apply_pyramid_strategy(all_trades, max_positions, avg_threshold)
+            print(f"   📊 Threshold {threshold}: {len(all_trades)} trades")
+            out[threshold] = self._trades_frame(all_trades)
+        return out
+
+    def run_batch(self, strategy_class, combinations, parallel=True, workers=None, tf_filter=None,
+                  use_cache=True, tasks_per_worker=2, journal=None, retries=3, backoff=5.0,
+                  pairs=None) -> List[pd.DataFrame]:
+        """
+        Many parameter combinations of one SignalStrategy in a single process pool.
+
+        combinations: list of run() keyword dicts (strategy kwargs plus optional
+        max_positions / avg_threshold, defaults as in run()).
+        Tasks are (pair x block of combinations): a pair's bars are decoded once
+        per block (see process_pair_combinations) and blocks are only split
+        when there are too few pairs to keep every worker busy.
+        journal: optional sweep_journal.SweepJournal. The (combination, pair)
+        trades of every finished task are committed to it at once, and those
+        already in it are not computed again.
+        Failed tasks are retried up to `retries` times on a fresh pool after
+        backoff * 2**attempt seconds (transient errors). A pair still failing
+        after that is left out, like run() skips a broken pair: its
+        (combination, pair) failures stay in the journal and the affected
+        frames list it in frame.attrs['failed_pairs'].
+        pairs: optional subset of the universe (dataset paths as listed by
+        storage.list_datasets), e.g. for low-fidelity evaluations.
+        Returns one trades DataFrame per combination, in input order (same trades
+        as calling run() for each; check_current_candle is not used by the
+        vectorized workers).
+        """
+        if not (isinstance(strategy_class, type) and issubclass(strategy_class, SignalStrategy)) \
+                or issubclass(strategy_class, (MultiTimeframeStrategy, CrossSectionalStrategy)):
+            raise TypeError(f"run_batch needs a pair-major SignalStrategy, got {strategy_class}")
+
+        files = [str(p) for p in (pairs if pairs is not None else storage.list_datasets(self.data_dir, tf_filter))]
+        combinations = [dict(c) for c in combinations]
+        engine_params = [(c.pop('max_positions', 10), c.pop('avg_threshold', 0.10)) for c in combinations]
+        if not files or not combinations:
+            print("❌ No data files found." if not files else "❌ No combinations.")
+            return [pd.DataFrame() for _ in combinations]
+
+        import math
+        import time
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        num_workers = workers if workers else (os.cpu_count() or 8)
+        blocks = max(1, min(len(combinations), math.ceil(num_workers * tasks_per_worker / len(files))))
+        block_size = math.ceil(len(combinations) / blocks)
+        indexed = list(enumerate(combinations))
+        per_combination: List[List[Trade]] = [[] for _ in combinations]
+
+        pending = {f: indexed for f in files}
+        if journal is not None:
+            keys = [journal.combo_key(strategy_class, c) for c in combinations]
+            done = journal.load(keys, files)
+            for f in files:
+                for idx, key in enumerate(keys):
+                    if (key, f) in done:
+                        per_combination[idx].extend(done[(key, f)])
+                pending[f] = [(idx, c) for idx, c in indexed if (keys[idx], f) not in done]
+            resumed = len(files) * len(combinations) - sum(len(todo) for todo in pending.values())
+            if resumed:
+                print(f"📓 Journal: {resumed} (combination, pair) results resumed")
+
+        tasks = [(f, strategy_class, todo[i:i + block_size], use_cache)
+                 for f, todo in pending.items() for i in range(0, len(todo), block_size)]
+        print(f"🧮 Batch: {len(combinations)} combinations x {len(files)} pairs -> {len(tasks)} tasks "
+              f"({'parallel, ' + str(num_workers) + ' workers' if parallel else 'serial'})")
+
+        def collect(task, result):
+            if journal is not None:
+                journal.save(task[0], {keys[idx]: trades for idx, trades in result.items()})
+            for idx, trades in result.items():
+                per_combination[idx].extend(trades)
+
+        failed_pairs: List[List[str]] = [[] for _ in combinations]
+        attempt = 0
+        while tasks:
+            failed = []
+            if parallel:
+                with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                    futures = {executor.submit(process_pair_combinations, t): t for t in tasks}
+                    for i, f in enumerate(as_completed(futures)):
+                        try:
+                            collect(futures[f], f.result())
+                        except Exception as e:
+                            failed.append((futures[f], e))
+                        if (i + 1) % 20 == 0:
+                            print(f"   👉 Progress: {i + 1}/{len(tasks)} ({(i + 1) / len(tasks) * 100:.1f}%)", flush=True)
+            else:
+                for t in tasks:
+                    try:
+                        collect(t, process_pair_combinations(t))
+                    except Exception as e:
+                        failed.append((t, e))
+
+            for (f, _, todo, _), e in failed:
+                print(f"⚠️  Batch task failed ({os.path.basename(f)}, {len(todo)} combinations): {e!r}")
+                if journal is not None:
+                    journal.record_failure(f, [keys[idx] for idx, _ in todo], repr(e))
+            tasks = [t for t, _ in failed]
+            if tasks:
+                if attempt >= retries:
+                    for f, _, todo, _ in tasks:
+                        print(f"❌ Skipping {os.path.basename(f)} for {len(todo)} combinations after {retries} retries")
+                        for idx, _ in todo:
+                            failed_pairs[idx].append(f)
+                    break
+                delay = backoff * 2 ** attempt
+                print(f"🔁 Retrying {len(tasks)} tasks in {delay:.0f}s (attempt {attempt + 1}/{retries})")
+                time.sleep(delay)
+                attempt += 1
+
+        frames = []
+        for trades, (max_positions, avg_threshold), failed_here in zip(per_combination, engine_params, failed_pairs):
+            if max_positions > 1:
+                trades = self._apply_pyramid_strategy(trades, max_positions, avg_threshold)
+            frame = self._trades_frame(trades)
+            frame.attrs['failed_pairs'] = failed_here
+            frames.append(frame)
+        return frames
+
+    def run_cross_sectional(self, strategy_class, max_positions=10, capital=None, position_fraction=None,
+                            parallel=True, workers=None, tf_filter=None, use_cache=True, **strategy_kwargs) -> pd.DataFrame:
+        """
+        Time-major backtest of a CrossSectionalStrategy over the whole universe.
+
+        Pairs are scored in parallel (spill_pair_candidates); their time-sorted
+        candidate files are then k-way merged, one row group per pair in memory,
+        into one stream and replayed bar timestamp by bar timestamp:
+          - positions whose exit bar is before the timestamp are closed first
+          - candidates of pairs already in a position are dropped (one per pair)
+          - the rest are ranked by score, the best top_n are entered while fewer
+            than max_positions are open globally (and, with capital, cash allows)
+        Capital model: with capital=None every entry bets exit_params().bet_size.
+        Otherwise equity starts at `capital`, each entry bets position_fraction of
+        the realized equity (or bet_size), needs that much free cash, and its PnL
+        is realized at its exit. A trade that never exits holds its slot to the end.
+        Use one timeframe (tf_filter) so timestamps are comparable across pairs.
+        """
+        files = [str(p) for p in storage.list_datasets(self.data_dir, tf_filter)]
+        if not files:
+            print("❌ No data files found.")
+            return pd.DataFrame()
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        num_workers = workers if workers else 8
+        print(f"🌐 Cross-sectional backtest on {len(files)} pairs (max_positions={max_positions}, capital={capital})")
+        worker_kwargs = dict(strategy_kwargs, use_cache=use_cache)
+        tasks = [(f, strategy_class, worker_kwargs) for f in files]
+
+        # Candidates are spilled per pair and streamed back batch by batch, so the
+        # parent holds one record batch per pair, however dense the score is
+        spill = tempfile.TemporaryDirectory(prefix="cross_sectional_")
+        tasks = [task + (spill.name,) for task in tasks]
+        if parallel:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                paths = [p for p in executor.map(spill_pair_candidates, tasks) if p]
+        else:
+            paths = [p for p in map(spill_pair_candidates, tasks) if p]
+        streams = [iter_candidates(p) for p in paths]
+        print(f"📊 Candidates of {len(paths)} pairs spilled to {spill.name}")
+
+        strategy = strategy_class(**strategy_kwargs)
+        bet_size = strategy.exit_params().bet_size
+        sign = 1 if strategy.ascending else -1
+        equity = capital
+        committed = 0.0
+        open_heap = []   # (exit_ts, seq, candidate, bet)
+        held = set()
+        seq = itertools.count()
+        trades = []
+
+        def close(candidate, bet):
+            nonlocal equity, committed
+            held.discard(candidate.symbol)
+            if candidate.exit_ts == NEVER_EXITS:
+                return
+            pnl_usd = bet * candidate.pnl_pct
+            if equity is not None:
+                equity += pnl_usd
+                committed -= bet
+            trades.append(Trade(
+                symbol=candidate.symbol,
+                entry_time=candidate.entry_time,
+                exit_time=candidate.exit_time,
+                type=candidate.exit_type,
+                entry_price=candidate.entry_price,
+                exit_price=candidate.exit_price,
+                pnl_percent=candidate.pnl_pct,
+                pnl_usd=pnl_usd,
+                duration_min=0,
+            ))
+
+        merged = heapq.merge(*streams, key=lambda c: c.ts)
+        for ts, group in itertools.groupby(merged, key=lambda c: c.ts):
+            while open_heap and open_heap[0][0] < ts:
+                _, _, candidate, bet = heapq.heappop(open_heap)
+                close(candidate, bet)
+
+            eligible = [c for c in group if c.symbol not in held]
+            eligible.sort(key=lambda c: (sign * c.score, c.symbol))
+            for candidate in eligible[:strategy.top_n]:
+                if len(open_heap) >= max_positions:
+                    break
+                bet = bet_size
+                if equity is not None:
+                    if position_fraction:
+                        bet = equity * position_fraction
+                    if bet <= 0 or equity - committed < bet:
+                        break
+                    committed += bet
+                heapq.heappush(open_heap, (candidate.exit_ts, next(seq), candidate, bet))
+                held.add(candidate.symbol)
+
+        while open_heap:
+            _, _, candidate, bet = heapq.heappop(open_heap)
+            close(candidate, bet)
+
+        spill.cleanup()
+        trades.sort(key=lambda t: (pd.Timestamp(t.entry_time), t.symbol))
+        if equity is not None:
+            print(f"💰 Final equity: {equity:.2f} (start {capital:.2f})")
+        print(f"✅ Final trades: {len(trades)}")
+        return self._trades_frame(trades)
+
     def _apply_pyramid_strategy(self, trades: List[Trade], max_positions: int, avg_threshold: float) -> List[Trade]:
         """
         Pyramid/Averaging strategy:
@@ -524,12 +885,167 @@ class BacktestEngine:
 import polars as pl
 from datetime import timedelta
 
+EXIT_SCAN_WINDOW = 256  # first forward-scan window of find_exit (bars); grows x4 per window
+
+def find_exit(entry_idx: int, arr_high, arr_low, arr_close, exits: "ExitParams") -> Optional[Tuple[int, str, float]]:
+    """
+    Exit of a trade entered at the close of bar entry_idx: (exit bar, type, price),
+    or None if it never exits. Depends only on the entry bar and the exit params,
+    so callers may cache it across signal sets (see simulate_entries).
+    The bars after the entry are scanned in growing windows, so the cost follows
+    the holding period, not the remaining history (dense signals stay ~linear).
+    """
+    max_idx = len(arr_close)
+    tp_pct = exits.tp
+    sl_pct = exits.sl
+    tsl = exits.tsl
+    side = exits.side
+
+    # Execute Entry
+    entry_price = arr_close[entry_idx]
+
+    # Calculate TP/SL Prices based on Side
+    if side == 'SHORT':
+        tp_price = entry_price * (1 - tp_pct)
+        sl_price = entry_price * (1 + sl_pct)
+    else: # LONG
+        tp_price = entry_price * (1 + tp_pct)
+        sl_price = entry_price * (1 - sl_pct)
+
+    # Best price seen so far (entry included) for the trailing SL
+    best = entry_price
+    start = entry_idx + 1
+    window = EXIT_SCAN_WINDOW
+    while start < max_idx:
+        end = min(start + window, max_idx)
+        search_slice_high = arr_high[start:end]
+        search_slice_low = arr_low[start:end]
+
+        # SL/TP Hits Logic (SL wins a same-candle tie)
+        if side == 'SHORT':
+            sl_hits = np.flatnonzero(search_slice_high >= sl_price)
+            tp_hits = np.flatnonzero(search_slice_low <= tp_price)
+        else:
+            sl_hits = np.flatnonzero(search_slice_low <= sl_price)
+            tp_hits = np.flatnonzero(search_slice_high >= tp_price)
+        first_sl_idx = sl_hits[0] if len(sl_hits) > 0 else None
+        first_tp_idx = tp_hits[0] if len(tp_hits) > 0 else None
+        if first_sl_idx is not None and (first_tp_idx is None or first_sl_idx <= first_tp_idx):
+            local_exit_idx, exit_type, exit_price = int(first_sl_idx), "SL", sl_price
+        elif first_tp_idx is not None:
+            local_exit_idx, exit_type, exit_price = int(first_tp_idx), "TP", tp_price
+        else:
+            local_exit_idx = None
+
+        # --- TRAILING SL OVERRIDE ---
+        if tsl > 0:
+            # Trigger on a candle uses the best price seen TILL the previous candle
+            if side == 'SHORT':
+                best_history = np.minimum.accumulate(np.concatenate([[best], search_slice_low]))
+                triggers = best_history[:-1] * (1 + tsl)
+                tsl_hits = np.flatnonzero(search_slice_high >= triggers)
+            else: # LONG
+                best_history = np.maximum.accumulate(np.concatenate([[best], search_slice_high]))
+                triggers = best_history[:-1] * (1 - tsl)
+                tsl_hits = np.flatnonzero(search_slice_low <= triggers)
+            if len(tsl_hits) > 0 and (local_exit_idx is None or tsl_hits[0] < local_exit_idx):
+                local_exit_idx, exit_type, exit_price = int(tsl_hits[0]), "TSL", triggers[tsl_hits[0]]
+            best = best_history[-1]
+
+        if local_exit_idx is not None:
+            return start + local_exit_idx, exit_type, exit_price
+        start = end
+        window *= 4
+
+    return None # Never exits
+
+
+def simulate_entries(entry_indices, highs, lows, closes, times, exits: "ExitParams", symbol: str,
+                     exit_cache: Optional[Dict[int, Optional[Tuple[int, str, float]]]] = None) -> List[Trade]:
+    """
+    Jump-ahead trade simulation over sorted candidate entry bars.
+    Enters at the close of each candidate while flat, exits on the first static
+    SL/TP (SL wins a same-candle tie) or trailing SL hit, resumes after the exit.
+    exit_cache: find_exit results by entry bar, shared by calls with the same
+    bars and exit params (e.g. nested threshold levels of a sweep).
+    """
+    entries = np.asarray(entry_indices, dtype=np.int64)
+    arr_high = np.asarray(highs)
+    arr_low = np.asarray(lows)
+    arr_close = np.asarray(closes)
+    arr_time = times
+    if exit_cache is None:
+        exit_cache = {}
+
+    completed_trades = []
+    pos = 0
+
+    while pos < len(entries):
+        # 1. Next Signal while flat
+        entry_idx = int(entries[pos])
+
+        # 2. Find Exit (cached per entry bar)
+        if entry_idx not in exit_cache:
+            exit_cache[entry_idx] = find_exit(entry_idx, arr_high, arr_low, arr_close, exits)
+        found = exit_cache[entry_idx]
+        if found is None:
+            break # Never exits
+        real_exit_idx, exit_type, exit_price = found
+
+        entry_price = arr_close[entry_idx]
+        if exits.side == 'SHORT':
+            pnl_pct = (entry_price - exit_price) / entry_price
+        else:
+            pnl_pct = (exit_price - entry_price) / entry_price
+
+        completed_trades.append(Trade(
+            symbol=symbol,
+            entry_time=str(arr_time[entry_idx]),
+            exit_time=str(arr_time[real_exit_idx]),
+            type=exit_type,
+            entry_price=entry_price,
+            exit_price=exit_price,
+            pnl_percent=pnl_pct,
+            pnl_usd=exits.bet_size * pnl_pct,
+            duration_min=0,
+            pump_percent=0.0 # Can extract if needed
+        ))
+
+        # Jump to after exit
+        pos = int(np.searchsorted(entries, real_exit_idx + 1))
+
+    return completed_trades
+
+
+def simulate_exits(signals, highs, lows, closes, times, exits: "ExitParams", symbol: str) -> List[Trade]:
+    """simulate_entries over a boolean signal array (shared by the vectorized workers)."""
+    return simulate_entries(np.flatnonzero(np.asarray(signals, dtype=bool)), highs, lows, closes, times, exits, symbol)
+
+
+def _time_values(df: pl.DataFrame) -> list:
+    if 'open_time' in df.columns:
+        return df['open_time'].to_list()
+    if 'ts_1s' in df.columns:
+        return df['ts_1s'].to_list()
+    # Fallback for unexpected schema
+    return [str(x) for x in range(len(df))]
+
+
+def _display_symbol(p) -> str:
+    # .../raw/BTCUSDT/5s (dir) -> BTCUSDT_5s ; .../BTCUSDT_5s.parquet (file) -> BTCUSDT_5s
+    if p.is_dir():
+        return f"{p.parent.name}_{p.name}"
+    return p.name.replace('.parquet', '')
+
+
 def process_single_pair_polars(args):
     """
     Turbo Worker using Polars for everything.
     args: (filepath, strategy_class, check_current_candle, strategy_kwargs)
     """
     filepath, strategy_class, check_current_candle, strategy_kwargs = args
+    strategy_kwargs = dict(strategy_kwargs)
+    use_cache = strategy_kwargs.pop('use_cache', True)
     
     try:
         # 1. Instantiate Strategy
@@ -537,14 +1053,13 @@ def process_single_pair_polars(args):
         
         # 2. Load Data (Handle Directory or File)
         import pathlib
-        import polars as pl
         p = pathlib.Path(filepath)
         
         df = None
         if p.is_dir():
             # Load directory -> Merge -> Pandas (VectorizedStrategy expects Pandas)
-            # Ensure unique and sorted
-            df_source = pl.scan_parquet(str(p / "*.parquet")).collect().unique(subset=["ts_1s"]).sort("ts_1s").to_pandas()
+            # Memory-mapped hot cache if fresh; else parquet (sorted/unique guaranteed on write)
+            df_source = hot_cache.load_bars(p, use_cache=use_cache).to_pandas()
             if hasattr(strategy, 'process_data'):
                 df = strategy.process_data(df_source)
             else:
@@ -554,178 +1069,357 @@ def process_single_pair_polars(args):
                      df = strategy.process_file(filepath)
         else:
             # File
-            if hasattr(strategy, 'process_file'):
+            if hasattr(strategy, 'process_data') and use_cache and hot_cache.is_fresh(p):
+                df = strategy.process_data(hot_cache.load_bars(p).to_pandas())
+            elif hasattr(strategy, 'process_file'):
                 df = strategy.process_file(filepath)
 
         if df is None or df.is_empty(): return []
         
-        if df is None or df.is_empty(): return []
-        
-        # Add row number/index for iteration
-        df = df.with_row_count("index")
-        
-        # Convert to Numpy for fast filtering/jumping
-        # We need: index, low, high, open_time, entry_signal, close
-        arr_signals = df['entry_signal'].to_numpy()
-        arr_high = df['high'].to_numpy()
-        arr_low = df['low'].to_numpy()
-        arr_close = df['close'].to_numpy()
-        
-        # Handle Time Column
-        if 'open_time' in df.columns:
-            arr_time = df['open_time'].to_list()
-        elif 'ts_1s' in df.columns:
-            arr_time = df['ts_1s'].to_list()
-        else:
-            # Fallback for unexpected schema
-            arr_time = [str(x) for x in range(len(df))]
- 
-        
-        completed_trades = []
-        curr_idx = 0
-        max_idx = len(df)
-        
-        tp_pct = strategy.tp
-        sl_pct = strategy.sl
-        bet_size = getattr(strategy, 'bet_size', 7.0)
-        
-        # Get Side (Default to SHORT if not specified, but usually it is)
-        side = getattr(strategy, 'side', 'SHORT')
-        
-        # Determine Symbol Name Helper
-        # If filepath is .../raw/BTCUSDT/5s (dir), we want BTCUSDT_5s
-        # If filepath is .../BTCUSDT_5s.parquet (file), we want BTCUSDT_5s
-        display_symbol = os.path.basename(filepath).replace('.parquet', '')
-        if p.is_dir():
-             # filepath is .../SYMBOL/TF
-             tf_part = p.name
-             sym_part = p.parent.name
-             display_symbol = f"{sym_part}_{tf_part}"
-
-        while curr_idx < max_idx:
-            # 1. Find Next Signal
-            future_signals = arr_signals[curr_idx:]
-            true_indices = np.where(future_signals)[0]
-            
-            if len(true_indices) == 0:
-                break # No more signals
-            
-            # Global Index of next signal
-            entry_idx = curr_idx + true_indices[0]
-            
-            # Execute Entry
-            entry_price = arr_close[entry_idx]
-            entry_time = arr_time[entry_idx]
-            
-            # Calculate TP/SL Prices based on Side
-            if side == 'SHORT':
-                tp_price = entry_price * (1 - tp_pct)
-                sl_price = entry_price * (1 + sl_pct)
-            else: # LONG
-                tp_price = entry_price * (1 + tp_pct)
-                sl_price = entry_price * (1 - sl_pct)
-            
-            # 2. Find Exit
-            # Scan slice: [entry_idx + 1 : ]
-            if entry_idx + 1 >= max_idx:
-                break
-                
-            search_slice_high = arr_high[entry_idx+1:]
-            search_slice_low = arr_low[entry_idx+1:]
-            
-            # SL/TP Hits Logic
-            if side == 'SHORT':
-                sl_hits = np.where(search_slice_high >= sl_price)[0]
-                tp_hits = np.where(search_slice_low <= tp_price)[0]
-            else:
-                sl_hits = np.where(search_slice_low <= sl_price)[0]
-                tp_hits = np.where(search_slice_high >= tp_price)[0]
-            
-            first_sl_idx = sl_hits[0] if len(sl_hits) > 0 else 999999999
-            first_tp_idx = tp_hits[0] if len(tp_hits) > 0 else 999999999
-            
-            # Default Exit Info (Static)
-            if first_sl_idx <= first_tp_idx:
-                local_exit_idx = first_sl_idx
-                exit_type = "SL"
-                exit_price = sl_price
-            else:
-                local_exit_idx = first_tp_idx
-                exit_type = "TP"
-                exit_price = tp_price
-                
-            # --- TRAILING SL OVERRIDE ---
-            if strategy.tsl > 0:
-                # 1. Calculate 'Best Price' history including entry_price
-                if side == 'SHORT':
-                    prices_to_track = np.concatenate([[entry_price], arr_low[entry_idx+1:]])
-                    best_history = np.minimum.accumulate(prices_to_track)
-                else: # LONG
-                    prices_to_track = np.concatenate([[entry_price], arr_high[entry_idx+1:]])
-                    best_history = np.maximum.accumulate(prices_to_track)
+        exits = ExitParams(
+            side=getattr(strategy, 'side', 'SHORT'),
+            tp=strategy.tp,
+            sl=strategy.sl,
+            tsl=strategy.tsl,
+            bet_size=getattr(strategy, 'bet_size', 7.0),
+        )
+        return simulate_exits(
+            df['entry_signal'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy(),
+            df['close'].to_numpy(), _time_values(df), exits, _display_symbol(p),
+        )
 
-                # 2. Trigger Level at any step depends on the best price seen TILL PREVIOUS step
-                # We use a loop or shifted array for precision. Vectorized shift:
-                # trigger_levels[i] corresponds to candle entry_idx + i
-                # It should use best_history[i-1]
-                
-                for step_idx in range(1, len(best_history)):
-                    # real_idx is the candle we are checking for EXIT
-                    real_idx = entry_idx + step_idx
-                    if real_idx >= max_idx: break
-                    
-                    prev_best = best_history[step_idx - 1]
-                    
-                    if side == 'SHORT':
-                        current_trigger = prev_best * (1 + strategy.tsl)
-                        hit = arr_high[real_idx] >= current_trigger
-                    else: # LONG
-                        current_trigger = prev_best * (1 - strategy.tsl)
-                        hit = arr_low[real_idx] <= current_trigger
-                    
-                    if hit:
-                        # step_idx is relative to entry_idx. 
-                        # matching with local_exit_idx (which is relative to entry_idx+1)
-                        search_slice_idx = step_idx - 1
-                        if search_slice_idx < local_exit_idx:
-                            local_exit_idx = search_slice_idx
-                            exit_type = "TSL"
-                            exit_price = current_trigger
-                        break # Found first TSL hit for this trade
-
-            if local_exit_idx == 999999999:
-                break # Never exits
-                
-            if side == 'SHORT':
-                pnl_pct = (entry_price - exit_price) / entry_price
-            else:
-                pnl_pct = (exit_price - entry_price) / entry_price
-                
-            real_exit_idx = (entry_idx + 1) + local_exit_idx
-            exit_time = arr_time[real_exit_idx]
-            
-            pnl_usd = bet_size * pnl_pct
-            
-            completed_trades.append(Trade(
-                symbol=display_symbol,
-                entry_time=str(entry_time),
-                exit_time=str(exit_time),
-                type=exit_type,
-                entry_price=entry_price,
-                exit_price=exit_price,
-                pnl_percent=pnl_pct,
-                pnl_usd=pnl_usd,
-                duration_min=0,
-                pump_percent=0.0 # Can extract if needed
+    except Exception as e:
+        print(f"Error Polars {filepath}: {e}")
+        return []
+
+
+# Columns every signal run needs besides the strategy's own
+EXIT_COLUMNS = ('high', 'low', 'close')
+TIME_COLUMNS = ('ts_1s', 'open_time')
+
+def evaluate_signals(strategy: SignalStrategy, bars: pl.DataFrame) -> np.ndarray:
+    """Runs strategy.signals on projected bars; returns a bool array with warm-up masked."""
+    result = strategy.signals(bars)
+    if isinstance(result, pl.Expr):
+        result = bars.select(result.fill_null(False)).to_series()
+    if isinstance(result, pl.Series):
+        result = result.fill_null(False).to_numpy()
+    signals = np.array(result, dtype=bool)
+    if len(signals) != bars.height:
+        raise ValueError(f"{type(strategy).__name__}.signals returned {len(signals)} values for {bars.height} bars")
+    signals[:strategy.warmup_bars] = False
+    return signals
+
+def process_single_pair_signals(args):
+    """
+    Worker for SignalStrategy: loads only the declared columns (hot cache or parquet),
+    evaluates the pure signal function and simulates exits.
+    args: (filepath, strategy_class, check_current_candle, strategy_kwargs)
+    """
+    filepath, strategy_class, check_current_candle, strategy_kwargs = args
+    strategy_kwargs = dict(strategy_kwargs)
+    use_cache = strategy_kwargs.pop('use_cache', True)
+
+    try:
+        import pathlib
+        strategy = strategy_class(**strategy_kwargs)
+        p = pathlib.Path(filepath)
+
+        columns = list(dict.fromkeys([*strategy.required_columns, *EXIT_COLUMNS, *TIME_COLUMNS]))
+        bars = hot_cache.load_bars(p, use_cache=use_cache, columns=columns)
+        if bars.is_empty():
+            return []
+        if strategy.feature_columns:
+            bars = features.attach_features(p, bars, strategy.feature_columns)
+
+        signals = evaluate_signals(strategy, bars)
+        if not signals.any():
+            return []
+
+        return simulate_exits(
+            signals, bars['high'].to_numpy(), bars['low'].to_numpy(), bars['close'].to_numpy(),
+            _time_values(bars), strategy.exit_params(), _display_symbol(p),
+        )
+
+    except Exception as e:
+        print(f"Error Signal {filepath}: {e}")
+        return []
+
+def process_symbol_multi_tf(args):
+    """
+    Worker for MultiTimeframeStrategy: one symbol, every required timeframe loaded once.
+    args: ({tf: dataset path}, strategy_class, check_current_candle, strategy_kwargs)
+    """
+    datasets, strategy_class, check_current_candle, strategy_kwargs = args
+    strategy_kwargs = dict(strategy_kwargs)
+    use_cache = strategy_kwargs.pop('use_cache', True)
+
+    try:
+        import pathlib
+        strategy = strategy_class(**strategy_kwargs)
+
+        # Union of the columns each TF is needed for (a TF may be both base and context)
+        needed: Dict[str, List[str]] = {}
+        for tf in strategy.base_timeframes:
+            needed.setdefault(tf, []).extend([*strategy.required_columns, *EXIT_COLUMNS, *TIME_COLUMNS])
+        for tf, columns in strategy.context_columns.items():
+            needed.setdefault(tf, []).extend(columns)
+        missing = [tf for tf in needed if tf not in datasets]
+        if missing:
+            symbol = storage.dataset_id(next(iter(datasets.values())))[0] if datasets else "?"
+            print(f"⚠️ Skipping {symbol}: missing timeframes {', '.join(missing)}")
+            return []
+        frames = {tf: hot_cache.load_bars(pathlib.Path(datasets[tf]), use_cache=use_cache,
+                                          columns=list(dict.fromkeys(columns)))
+                  for tf, columns in needed.items()}
+
+        contexts = {}
+        for tf in strategy.context_columns:
+            bars = frames[tf]
+            ctx = strategy.context(tf, bars)
+            ctx = ctx if isinstance(ctx, pl.DataFrame) else bars.select(ctx)
+            contexts[tf] = ctx.with_columns(bars[storage.TS_COL]) if storage.TS_COL not in ctx.columns else ctx
+
+        trades = []
+        for base_tf in strategy.base_timeframes:
+            bars = frames[base_tf]
+            if bars.is_empty():
+                continue
+            for tf, ctx in contexts.items():
+                bars = align_context(bars, base_tf, ctx, tf)
+
+            signals = evaluate_signals(strategy, bars)
+            if not signals.any():
+                continue
+            trades.extend(simulate_exits(
+                signals, bars['high'].to_numpy(), bars['low'].to_numpy(), bars['close'].to_numpy(),
+                _time_values(bars), strategy.exit_params(), _display_symbol(pathlib.Path(datasets[base_tf])),
             ))
-            
-            # Jump to after exit
-            curr_idx = real_exit_idx + 1
-            
-        return completed_trades
+        return trades
 
     except Exception as e:
-        print(f"Error Polars {filepath}: {e}")
+        print(f"Error MTF {datasets}: {e}")
         return []
 
+def process_single_pair_threshold_sweep(args):
+    """
+    Worker for a monotone threshold sweep of a VectorizedStrategy-like strategy
+    (one that exposes signal_config()). One ThresholdLadder per pair answers every
+    threshold by binary search; exits are computed once per entry bar and reused
+    across the nested levels.
+    args: (filepath, strategy_class, thresholds, strategy_kwargs)
+    Returns {threshold: [Trade, ...]}.
+    """
+    filepath, strategy_class, thresholds, strategy_kwargs = args
+    strategy_kwargs = dict(strategy_kwargs)
+    use_cache = strategy_kwargs.pop('use_cache', True)
+
+    try:
+        import pathlib
+        strategy = strategy_class(**strategy_kwargs)
+        config = strategy.signal_config()
+        p = pathlib.Path(filepath)
+
+        columns = list(dict.fromkeys([*strategy.required_columns, *EXIT_COLUMNS, *TIME_COLUMNS]))
+        bars = hot_cache.load_bars(p, use_cache=use_cache, columns=columns)
+        if bars.is_empty():
+            return {t: [] for t in thresholds}
+        if strategy.feature_columns:
+            bars = features.attach_features(p, bars, strategy.feature_columns)
+
+        signal_columns = [c for c in (*strategy.required_columns, *strategy.feature_columns) if c in bars.columns]
+        signal_features = SignalFeatures(bars.select(signal_columns).to_pandas(),
+                                         ema_kernel=getattr(strategy, 'ema_kernel', 'pandas'))
+        ladder = ThresholdLadder(signal_features,
+                                 config.cond, config.ema, config.marubozu, min(thresholds))
+
+        highs, lows, closes = bars['high'].to_numpy(), bars['low'].to_numpy(), bars['close'].to_numpy()
+        times, exits, symbol = _time_values(bars), strategy.exit_params(), _display_symbol(p)
+        exit_cache = {}
+        out = {}
+        for threshold in thresholds:
+            entries = ladder.entries(threshold)
+            entries = entries[entries >= strategy.warmup_bars]
+            out[threshold] = simulate_entries(entries, highs, lows, closes, times, exits, symbol, exit_cache)
+        return out
+
+    except Exception as e:
+        print(f"Error Sweep {filepath}: {e}")
+        return {t: [] for t in thresholds}
+
+NEVER_EXITS = np.iinfo(np.int64).max
+
+class Candidate(NamedTuple):
+    """One scored bar of one pair, its exit already resolved on the pair's own bars."""
+    ts: int                 # bar time, epoch microseconds (merge key)
+    score: float
+    symbol: str
+    entry_time: str
+    entry_price: float
+    exit_ts: int            # NEVER_EXITS if the trade never closes
+    exit_time: str
+    exit_type: str
+    exit_price: float
+    pnl_pct: float
+
+def evaluate_scores(strategy: CrossSectionalStrategy, bars: pl.DataFrame) -> np.ndarray:
+    """Runs strategy.score on projected bars; float array, NaN where there is no candidate (warm-up included)."""
+    result = strategy.score(bars)
+    if isinstance(result, pl.Expr):
+        result = bars.select(result.cast(pl.Float64)).to_series()
+    if isinstance(result, pl.Series):
+        result = result.cast(pl.Float64).fill_null(np.nan).to_numpy()
+    scores = np.array(result, dtype=np.float64)
+    if len(scores) != bars.height:
+        raise ValueError(f"{type(strategy).__name__}.score returned {len(scores)} values for {bars.height} bars")
+    scores[:strategy.warmup_bars] = np.nan
+    return scores
+
+CANDIDATE_BATCH_ROWS = 64 * 1024  # row group of a spilled candidate file = rows the merge holds per pair
+
+def pair_candidates(filepath, strategy_class, strategy_kwargs) -> pl.DataFrame:
+    """
+    Scores one pair and resolves the exit of every candidate bar up front (an
+    exit only depends on the pair's own bars; find_exit scans only the holding
+    period, so a score on every bar stays ~linear). Columns are Candidate's fields,
+    sorted by time.
+    """
+    import pathlib
+    strategy_kwargs = dict(strategy_kwargs)
+    use_cache = strategy_kwargs.pop('use_cache', True)
+    strategy = strategy_class(**strategy_kwargs)
+    p = pathlib.Path(filepath)
+    empty = pl.DataFrame(schema=dict(zip(Candidate._fields, [pl.Int64, pl.Float64, pl.Utf8, pl.Utf8, pl.Float64,
+                                                             pl.Int64, pl.Utf8, pl.Utf8, pl.Float64, pl.Float64])))
+
+    columns = list(dict.fromkeys([*strategy.required_columns, *EXIT_COLUMNS, *TIME_COLUMNS]))
+    bars = hot_cache.load_bars(p, use_cache=use_cache, columns=columns)
+    if bars.is_empty():
+        return empty
+    if strategy.feature_columns:
+        bars = features.attach_features(p, bars, strategy.feature_columns)
+
+    scores = evaluate_scores(strategy, bars)
+    rows = np.flatnonzero(~np.isnan(scores))
+    if not len(rows):
+        return empty
+
+    time_col = next(c for c in TIME_COLUMNS if c in bars.columns)
+    epochs = bars[time_col].dt.epoch('us').to_numpy()
+    highs, lows, closes = bars['high'].to_numpy(), bars['low'].to_numpy(), bars['close'].to_numpy()
+    times, exits, symbol = _time_values(bars), strategy.exit_params(), _display_symbol(p)
+
+    exit_ts = np.full(len(rows), NEVER_EXITS, dtype=np.int64)
+    exit_time, exit_type = [""] * len(rows), [""] * len(rows)
+    exit_price = np.full(len(rows), np.nan)
+    for k, row in enumerate(rows):
+        found = find_exit(int(row), highs, lows, closes, exits)
+        if found is not None:
+            exit_idx, exit_type[k], exit_price[k] = found
+            exit_ts[k], exit_time[k] = epochs[exit_idx], str(times[exit_idx])
+    entry_price = closes[rows].astype(np.float64)
+    if exits.side == 'SHORT':
+        pnl_pct = (entry_price - exit_price) / entry_price
+    else:
+        pnl_pct = (exit_price - entry_price) / entry_price
+
+    return pl.DataFrame({
+        'ts': epochs[rows].astype(np.int64),
+        'score': scores[rows],
+        'symbol': [symbol] * len(rows),
+        'entry_time': [str(times[r]) for r in rows],
+        'entry_price': entry_price,
+        'exit_ts': exit_ts,
+        'exit_time': exit_time,
+        'exit_type': exit_type,
+        'exit_price': exit_price,
+        'pnl_pct': pnl_pct,
+    }, schema=empty.schema)
+
+def process_pair_candidates(args):
+    """
+    Worker for CrossSectionalStrategy (in-memory): pair_candidates as a list.
+    args: (filepath, strategy_class, strategy_kwargs)
+    Returns [Candidate, ...] sorted by time.
+    """
+    filepath, strategy_class, strategy_kwargs = args
+    try:
+        return [Candidate(*row) for row in pair_candidates(filepath, strategy_class, strategy_kwargs).iter_rows()]
+    except Exception as e:
+        print(f"Error Cross-Sectional {filepath}: {e}")
+        return []
+
+def spill_pair_candidates(args):
+    """
+    Worker for run_cross_sectional: writes pair_candidates to spill_dir as parquet
+    (row groups of CANDIDATE_BATCH_ROWS), so only paths go back to the parent.
+    args: (filepath, strategy_class, strategy_kwargs, spill_dir)
+    Returns the file path, or None without candidates.
+    """
+    filepath, strategy_class, strategy_kwargs, spill_dir = args
+    try:
+        frame = pair_candidates(filepath, strategy_class, strategy_kwargs)
+        if frame.is_empty():
+            return None
+        import pathlib
+        path = os.path.join(spill_dir, f"{_display_symbol(pathlib.Path(filepath))}.parquet")
+        frame.write_parquet(path, row_group_size=CANDIDATE_BATCH_ROWS)
+        return path
+    except Exception as e:
+        print(f"Error Cross-Sectional {filepath}: {e}")
+        return None
+
+def iter_candidates(path, batch_rows: int = CANDIDATE_BATCH_ROWS):
+    """Candidates of a spilled file in time order, one record batch in memory at a time."""
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows):
+        for row in pl.from_arrow(batch).iter_rows():
+            yield Candidate(*row)
+
+def process_pair_combinations(args):
+    """
+    Worker for BacktestEngine.run_batch: one pair, many parameter combinations.
+    The bars are decoded once; VectorizedStrategy-like strategies (signal_config())
+    also share one SignalFeatures per EMA kernel, so EMAs and masks are computed
+    once for all combinations, and exits are cached per exit parameter set.
+    args: (filepath, strategy_class, [(combination index, strategy_kwargs), ...], use_cache)
+    Returns {combination index: [Trade, ...]}; errors propagate so that
+    run_batch can retry the task instead of taking it as "no trades".
+    """
+    filepath, strategy_class, combinations, use_cache = args
+    out = {idx: [] for idx, _ in combinations}
+
+    import pathlib
+    p = pathlib.Path(filepath)
+    strategies = [(idx, strategy_class(**kwargs)) for idx, kwargs in combinations]
+
+    columns = list(dict.fromkeys([c for _, s in strategies for c in s.required_columns] + [*EXIT_COLUMNS, *TIME_COLUMNS]))
+    bars = hot_cache.load_bars(p, use_cache=use_cache, columns=columns)
+    if bars.is_empty():
+        return out
+    feature_columns = list(dict.fromkeys(c for _, s in strategies for c in s.feature_columns))
+    if feature_columns:
+        bars = features.attach_features(p, bars, feature_columns)
+
+    highs, lows, closes = bars['high'].to_numpy(), bars['low'].to_numpy(), bars['close'].to_numpy()
+    times, symbol = _time_values(bars), _display_symbol(p)
+    shared_features: Dict[str, SignalFeatures] = {}
+    exit_caches: Dict[Tuple, Dict] = {}
+
+    for idx, strategy in strategies:
+        if hasattr(strategy, 'signal_config'):
+            kernel = getattr(strategy, 'ema_kernel', 'pandas')
+            if kernel not in shared_features:
+                signal_columns = [c for c in (*strategy.required_columns, *strategy.feature_columns) if c in bars.columns]
+                shared_features[kernel] = SignalFeatures(bars.select(signal_columns).to_pandas(), ema_kernel=kernel)
+            signals = shared_features[kernel].signal(strategy.signal_config()).copy()
+            signals[:strategy.warmup_bars] = False
+        else:
+            signals = evaluate_signals(strategy, bars)
 
+        exits = strategy.exit_params()
+        exit_cache = exit_caches.setdefault((exits.side, exits.tp, exits.sl, exits.tsl), {})
+        trades = simulate_entries(np.flatnonzero(signals), highs, lows, closes, times, exits, symbol, exit_cache)
+        # pnl_usd follows each combination's own bet size (the exit cache is bet-independent)
+        out[idx] = trades
+    return out
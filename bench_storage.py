@@ -0,0 +1,133 @@
+"""
+Storage profile benchmark: default vs compact parquet bars.
+
+Builds synthetic weekly 5s bars (random walk on a 0.0001 tick, summed qty volume)
+for a handful of symbols, writes them with both profiles via src.storage and
+reports disk footprint and load time of read_bars per dataset: cold (files
+evicted from the OS page cache with posix_fadvise DONTNEED before each pass,
+Linux) and warm (best of --repeat passes from the page cache).
+
+Usage:
+    python bench_storage.py
+    python bench_storage.py --symbols 20 --weeks 4 --tf 5s
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import polars as pl
+
+sys.path.append(os.getcwd())
+
+from src import storage, utils_date
+
+
+def make_week(start: datetime, seconds: int, every: int, rng) -> pl.DataFrame:
+    n = seconds // every
+    steps = rng.integers(-3, 4, size=(n, 4)).cumsum(axis=0)
+    base = 25_000 + steps[:, 0]
+    opens = base
+    closes = base + steps[:, 1] % 7 - 3
+    highs = np.maximum(opens, closes) + np.abs(steps[:, 2]) % 5
+    lows = np.minimum(opens, closes) - np.abs(steps[:, 3]) % 5
+    # Summed qty: 0.001 step plus the float noise a group_by sum leaves behind
+    volume = rng.integers(1, 500_000, size=n) * 0.001 + rng.integers(1, 500, size=n) * 0.001
+
+    ts = pl.datetime_range(start, start + timedelta(seconds=every * (n - 1)), f"{every}s", eager=True, time_unit="us")
+    return pl.DataFrame({
+        "ts_1s": ts.dt.replace_time_zone("Europe/Istanbul"),
+        "open": opens / 10_000.0,
+        "high": highs / 10_000.0,
+        "low": lows / 10_000.0,
+        "close": closes / 10_000.0,
+        "volume": volume,
+    })
+
+
+def dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*.parquet"))
+
+
+def evict(path: Path) -> bool:
+    """Drops the parquet files under path from the page cache; False where unsupported."""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for f in path.rglob("*.parquet"):
+        fd = os.open(f, os.O_RDONLY)
+        try:
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def load_all(datasets) -> Tuple[int, float]:
+    t0 = time.perf_counter()
+    rows = sum(storage.read_bars(d).height for d in datasets)
+    return rows, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--tf", type=str, default="5s", help="Bar size in seconds, e.g. 5s, 15s")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    every = int(args.tf.rstrip("s"))
+    rng = np.random.default_rng(42)
+    week_end = utils_date.get_last_completed_week_end().replace(tzinfo=None)
+    weeks = [(week_end - timedelta(weeks=args.weeks - i), week_end - timedelta(weeks=args.weeks - i - 1)) for i in range(args.weeks)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        roots = {p: Path(tmp) / p for p in storage.PROFILES}
+
+        print(f"Generating {args.symbols} symbols x {args.weeks} weeks of {args.tf} bars...")
+        for s in range(args.symbols):
+            frames = [make_week(start, 7 * 86400, every, rng) for start, _ in weeks]
+            for profile, root in roots.items():
+                tf_dir = root / f"SYM{s}USDT" / args.tf
+                tf_dir.mkdir(parents=True, exist_ok=True)
+                for (start, end), df in zip(weeks, frames):
+                    name = f"{utils_date.format_filename_ts(start)}_to_{utils_date.format_filename_ts(end)}.parquet"
+                    # Synthetic tick 0.0001, as symbols.price_decimals would report
+                    storage.write_bars(df, tf_dir / name, profile=profile, price_decimals=4)
+
+        rows = None
+        print(f"\n{'Profile':<10} | {'Disk (MB)':>10} | {'Cold (s)':>9} | {'Warm (s)':>9} | Rows")
+        print("-" * 58)
+        for profile, root in roots.items():
+            datasets = sorted(d for d in root.glob(f"*/{args.tf}"))
+            cold = float("inf")
+            for _ in range(args.repeat):
+                if not evict(root):
+                    break
+                rows, elapsed = load_all(datasets)
+                cold = min(cold, elapsed)
+            warm = float("inf")
+            for _ in range(args.repeat):
+                rows, elapsed = load_all(datasets)
+                warm = min(warm, elapsed)
+            cold_s = f"{cold:>9.3f}" if cold != float("inf") else f"{'n/a':>9}"
+            print(f"{profile:<10} | {dir_size(root) / 1e6:>10.2f} | {cold_s} | {warm:>9.3f} | {rows:,}")
+
+        # Equality check: compact must widen back to the default schema
+        d_default = next(roots["default"].glob(f"*/{args.tf}"))
+        d_compact = roots["compact"] / d_default.parent.name / args.tf
+        a, b = storage.read_bars(d_default), storage.read_bars(d_compact)
+        exact = a.drop("volume").equals(b.drop("volume"))
+        vol_rel = ((a["volume"] - b["volume"]).abs() / a["volume"]).max()
+        print(f"\nSchema equal: {a.schema == b.schema} | ts/OHLC exact: {exact} | volume max rel diff: {vol_rel:.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Fused EMA-chain kernel.
+
+VectorizedStrategy's reference path runs pandas ewm ten times in float64 and
+keeps ten full-length EMA Series plus the chained mask temporaries. This kernel
+walks `close` once, in chunks, evaluating every span of the chain per chunk,
+and emits only the packed pair bitmasks (the ema_bull / ema_bear layout of
+signal_batch.EMA_PAIRS). Peak memory is O(chunk x spans), whatever the length.
+
+Inside a chunk the recurrence y[t] = (1 - a) y[t-1] + a x[t] is evaluated in
+blocks of BLOCK bars as one matrix product with the lower-triangular decay
+matrix, then the block ends are carried forward. Prices are shifted by the
+chunk's first close first (the EMA is shift-equivariant), so float32 keeps its
+precision for the fast - slow differences the masks compare.
+
+Tolerance (relative to the pandas float64 reference):
+    float64: EMA values agree to ~1e-11 relative; mask bits only differ where
+             fast / slow is within FLOAT64_TOLERANCE of its threshold
+             (none observed on 500k-bar series).
+    float32: EMA values agree to ~1e-6 relative (~1e-5 when the price moves by
+             orders of magnitude inside one chunk); mask bits only differ where
+             fast / slow is within FLOAT32_TOLERANCE of its threshold (observed
+             <= 1.3e-6, i.e. a few dozen near-flat bars in 500k). The chain
+             tolerances are 1e-7 / 1e-6, so use float32 for screening sweeps.
+The first slow - 1 bars of a pair are False, as with min_periods=span.
+NaN closes are not supported (bars never contain them).
+
+Usage:
+    bull, bear = ema_chain_bits(df['close'].to_numpy(), dtype=np.float32)
+"""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from conditions.signal_batch import BEAR_THRESHOLD_PCT, BULL_THRESHOLD_PCT, EMA_PAIRS, EMA_PERIODS
+
+BLOCK = 64
+CHUNK = 1 << 14                 # multiple of BLOCK; shorter chunks keep float32 shifts small
+FLOAT64_TOLERANCE = 1e-12
+FLOAT32_TOLERANCE = 1e-5
+KERNELS = {"fused64": np.float64, "fused32": np.float32}
+
+
+def _decay_matrices(periods: Sequence[int], dtype) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per span: L[k, j] = a (1-a)^(k-j) for j <= k (block response to its inputs),
+    P[k] = (1-a)^(k+1) (response to the previous block's last value), D = (1-a)^BLOCK.
+    """
+    alphas = np.array([1.0 / (1.0 + (p - 1) / 2.0) for p in periods])
+    decay = 1.0 - alphas
+    k = np.arange(BLOCK)
+    lag = k[:, None] - k[None, :]
+    powers = decay[:, None, None] ** np.maximum(lag, 0)[None]
+    lower = np.where(lag >= 0, alphas[:, None, None] * powers, 0.0)
+    carry = decay[:, None] ** (k + 1)[None]
+    return lower.astype(dtype), carry.astype(dtype), decay ** BLOCK
+
+
+def _chunk_emas(x: np.ndarray, last: np.ndarray, lower: np.ndarray, carry: np.ndarray, block_decay: np.ndarray) -> np.ndarray:
+    """EMAs (spans, len(x)) of one chunk continuing from `last` (spans,); len(x) % BLOCK == 0."""
+    blocks = x.reshape(-1, BLOCK)
+    # Block-local responses assuming a zero start: (spans, nblocks, BLOCK)
+    local = np.matmul(blocks[None], lower.transpose(0, 2, 1))
+
+    # Carry the true value at each block end across blocks (short loop: len(x) / BLOCK steps).
+    # Always float64: with float32 the slow spans would accumulate one rounding per block.
+    n_blocks = blocks.shape[0]
+    ends = local[:, :, -1].astype(np.float64)
+    starts = np.empty((len(last), n_blocks))
+    prev = last.astype(np.float64)
+    for b in range(n_blocks):
+        starts[:, b] = prev
+        prev = ends[:, b] + block_decay * prev
+
+    local += carry[:, None, :] * starts[:, :, None].astype(x.dtype)
+    return local.reshape(len(last), -1)
+
+
+def _iter_chunks(closes: np.ndarray, dtype, chunk: int):
+    """Yields (start, stop, ref, emas - ref) per chunk; emas shape (spans, stop - start)."""
+    lower, carry, block_decay = _decay_matrices(EMA_PERIODS, dtype)
+    chunk = max(BLOCK, chunk - chunk % BLOCK)
+
+    # pandas starts every EMA at the first close; carried in float64 between chunks
+    last = np.full(len(EMA_PERIODS), closes[0])
+    for start in range(0, len(closes), chunk):
+        stop = min(start + chunk, len(closes))
+        ref = closes[start]
+        x = closes[start:stop] - ref
+        pad = (-len(x)) % BLOCK
+        if pad:
+            x = np.concatenate([x, np.full(pad, x[-1])])
+
+        emas = _chunk_emas(x.astype(dtype), last - ref, lower, carry, block_decay)
+        emas = emas[:, :stop - start]
+        last = emas[:, -1].astype(np.float64) + ref
+        yield start, stop, ref, emas
+
+
+def chain_emas(closes: np.ndarray, dtype=np.float64, chunk: int = CHUNK) -> np.ndarray:
+    """All EMAs (len(EMA_PERIODS), len(closes)) without min_periods masking; for verification."""
+    closes = np.asarray(closes, dtype=np.float64)
+    out = np.empty((len(EMA_PERIODS), len(closes)))
+    if len(closes):
+        for start, stop, ref, emas in _iter_chunks(closes, np.dtype(dtype), chunk):
+            out[:, start:stop] = emas.astype(np.float64) + ref
+    return out
+
+
+def ema_chain_bits(closes: np.ndarray, dtype=np.float64, chunk: int = CHUNK) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (ema_bull, ema_bear) uint16 bitmasks of the EMA chain over `closes`
+    (bit k = signal_batch.EMA_PAIRS[k] with the VectorizedStrategy tolerances).
+    """
+    dtype = np.dtype(dtype)
+    closes = np.asarray(closes, dtype=np.float64)
+    n = len(closes)
+    bull = np.zeros(n, dtype=np.uint16)
+    bear = np.zeros(n, dtype=np.uint16)
+    if n == 0:
+        return bull, bear
+
+    slot = {p: i for i, p in enumerate(EMA_PERIODS)}
+    bull_tol = dtype.type(BULL_THRESHOLD_PCT)
+    bear_tol = dtype.type(BEAR_THRESHOLD_PCT)
+    for start, stop, ref, emas in _iter_chunks(closes, dtype, chunk):
+        t = np.arange(start, stop)
+        for k, (fast, slow) in enumerate(EMA_PAIRS):
+            fast_ema, slow_ema = emas[slot[fast]], emas[slot[slow]]
+            # (fast - ref) - (slow - ref): the shift cancels exactly
+            diff = fast_ema - slow_ema
+            level = slow_ema + dtype.type(ref)
+            valid = t >= slow - 1
+            bull[start:stop] |= ((diff > level * bull_tol) & valid).astype(np.uint16) << k
+            bear[start:stop] |= ((diff < -(level * bear_tol)) & valid).astype(np.uint16) << k
+    return bull, bear
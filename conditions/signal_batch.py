@@ -0,0 +1,238 @@
+"""
+Batched signal evaluation for VectorizedStrategy sweeps.
+
+A grid over (cond, threshold, ema, marubozu) re-runs VectorizedStrategy.process_data
+once per combination, recomputing the same EMAs and chain comparisons every time.
+Here the shared pieces are computed once per pair and reused across configs:
+
+    - the ten EMAs (only the periods any config needs)
+    - the adjacent fast>slow / fast<slow masks of the EMA chain
+    - pump% ((close - open) / open) and the marubozu ratio
+    - per-(cond, threshold), per-ema and per-marubozu masks
+
+Results are bit-for-bit identical to process_data's entry_signal.
+
+Frames that carry the materialized feature columns (src/features.py:
+change_pct, marubozu_ratio, ema_bull, ema_bear) skip the EMAs entirely and
+every ema filter becomes a bitwise AND on the packed pair bits.
+
+Threshold sweeps go through ThresholdLadder: the marubozu/EMA-qualified rows
+are sorted once by pump% and every threshold is a binary search (the rows of
+3% are a prefix of the rows of 2%).
+
+Usage:
+    configs = [SignalConfig("pump", 0.02, "all_bull"), SignalConfig("dump", 0.015, "none")]
+    matrix = evaluate_signals(df, configs)        # bool (len(configs), len(df))
+    indices = signal_indices(df, configs)         # one int64 array per config
+    ladder = ThresholdLadder(SignalFeatures(df), "pump", "all_bull", 0.8)
+    rows = ladder.entries(0.02)                   # == signal_indices for threshold 0.02
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+EMA_PERIODS = [9, 20, 50, 100, 200, 300, 500, 1000, 2000, 5000]
+SMALL_PERIODS = [9, 20, 50, 100, 200]
+BIG_PERIODS = [300, 500, 1000, 2000, 5000]
+
+# Adjacent (fast, slow) pairs of the chain; bit k of ema_bull / ema_bear is pair k
+EMA_PAIRS = list(zip(EMA_PERIODS[:-1], EMA_PERIODS[1:]))
+MATERIALIZED_COLUMNS = ("change_pct", "marubozu_ratio", "ema_bull", "ema_bear")
+
+# Same tolerances as VectorizedStrategy.check_chain_optimized
+BULL_THRESHOLD_PCT = 0.00001 / 100.0
+BEAR_THRESHOLD_PCT = 0.0001 / 100.0
+
+
+@dataclass(frozen=True)
+class SignalConfig:
+    cond: str = "pump"          # pump | dump
+    threshold: float = 0.02     # pump_threshold or dump_threshold (fraction)
+    ema: str = "none"           # none | all_bull | small_bear | big_bull_small_bear ...
+    marubozu: float = 0.80
+
+    @classmethod
+    def from_strategy_kwargs(cls, **kwargs) -> "SignalConfig":
+        """Maps VectorizedStrategy constructor kwargs to the signal-relevant subset."""
+        cond = kwargs.get("cond", "pump").lower()
+        threshold = kwargs.get("dump_threshold" if cond == "dump" else "pump_threshold", 0.02)
+        return cls(cond, threshold, kwargs.get("ema", "none").lower(), kwargs.get("marubozu_threshold", 0.80))
+
+
+def ema_segments(ema: str) -> List[Tuple[List[int], bool]]:
+    """EMA filter name -> list of (chain periods, bullish) segments that must all hold."""
+    ema = ema.lower()
+    if ema == "none":
+        return []
+    if "big_" in ema and "_small_" in ema:
+        parts = ema.split('_')  # ['big', 'bull', 'small', 'bear']
+        return [(BIG_PERIODS, parts[1] == "bull"), (SMALL_PERIODS, parts[3] == "bull")]
+    # NB: process_data selects periods with `"all" in ema`, which also matches
+    # "sm-all_*", so small_bull/small_bear check the full 10-EMA chain there.
+    # Mirrored here so batch results equal the logged single-config runs.
+    if ema in ("all_bull", "all_bear", "small_bull", "small_bear"):
+        return [(EMA_PERIODS, ema.endswith("bull"))]
+    if ema in ("big_bull", "big_bear"):
+        return [(BIG_PERIODS, ema.endswith("bull"))]
+    # process_data treats unknown filters as "no filter"
+    return []
+
+
+def ema_filter_bits(ema: str) -> Tuple[int, int]:
+    """EMA filter name -> (ema_bull mask, ema_bear mask) of the pair bits that must all be set."""
+    bull = bear = 0
+    for periods, bullish in ema_segments(ema):
+        for fast, slow in zip(periods[:-1], periods[1:]):
+            bit = 1 << EMA_PAIRS.index((fast, slow))
+            if bullish:
+                bull |= bit
+            else:
+                bear |= bit
+    return bull, bear
+
+
+class SignalFeatures:
+    """Lazily computed, memoised building blocks shared by every config of one pair."""
+
+    def __init__(self, df: pd.DataFrame, emas: Optional[Dict[int, np.ndarray]] = None, ema_kernel: str = "pandas"):
+        """
+        emas: precomputed EMA arrays by period (e.g. continued from a previous week's state).
+        ema_kernel: "pandas" (reference) or "fused64" / "fused32" (conditions/ema_kernel.py),
+        which computes only the packed chain masks.
+        """
+        self.n = len(df)
+        self.ema_kernel = ema_kernel
+        self._emas: Dict[int, np.ndarray] = dict(emas or {})
+        self._pairs: Dict[Tuple[int, int, bool], np.ndarray] = {}
+        self._cache: Dict[Tuple, np.ndarray] = {}
+        self._bits: Dict[bool, np.ndarray] = {}
+
+        if all(c in df.columns for c in MATERIALIZED_COLUMNS):
+            self.closes = df['close'] if 'close' in df.columns else None
+            self.pump_pct = df['change_pct'].to_numpy()
+            self.marubozu_ratio = df['marubozu_ratio'].to_numpy()
+            self._bits = {True: df['ema_bull'].to_numpy(), False: df['ema_bear'].to_numpy()}
+            return
+
+        self.closes = df['close']
+        opens = df['open'].to_numpy()
+        close = self.closes.to_numpy()
+        total_range = df['high'].to_numpy() - df['low'].to_numpy()
+        self.pump_pct = (close - opens) / opens
+        body_size = np.abs(close - opens)
+        valid_range = total_range > 0
+        self.marubozu_ratio = np.zeros(self.n)
+        self.marubozu_ratio[valid_range] = body_size[valid_range] / total_range[valid_range]
+
+    def ema(self, period: int) -> np.ndarray:
+        if period not in self._emas:
+            self._emas[period] = self.closes.ewm(span=period, adjust=False, min_periods=period).mean().to_numpy()
+        return self._emas[period]
+
+    def pair_mask(self, fast: int, slow: int, bullish: bool) -> np.ndarray:
+        """fast EMA above (bullish) / below (bearish) slow EMA with the chain tolerance."""
+        key = (fast, slow, bullish)
+        if key not in self._pairs:
+            val_fast, val_slow = self.ema(fast), self.ema(slow)
+            if bullish:
+                self._pairs[key] = val_fast > val_slow * (1 + BULL_THRESHOLD_PCT)
+            else:
+                self._pairs[key] = val_fast < val_slow * (1 - BEAR_THRESHOLD_PCT)
+        return self._pairs[key]
+
+    def ema_bits(self, bullish: bool) -> np.ndarray:
+        """Pair masks packed into uint16 (bit k = EMA_PAIRS[k] holds)."""
+        if bullish not in self._bits and self.ema_kernel != "pandas":
+            from conditions.ema_kernel import KERNELS, ema_chain_bits
+            self._bits = dict(zip((True, False), ema_chain_bits(self.closes.to_numpy(), KERNELS[self.ema_kernel])))
+        if bullish not in self._bits:
+            bits = np.zeros(self.n, dtype=np.uint16)
+            for k, (fast, slow) in enumerate(EMA_PAIRS):
+                bits |= self.pair_mask(fast, slow, bullish).astype(np.uint16) << k
+            self._bits[bullish] = bits
+        return self._bits[bullish]
+
+    def ema_filter(self, ema: str) -> np.ndarray:
+        key = ("ema", ema)
+        if key not in self._cache:
+            mask = np.ones(self.n, dtype=bool)
+            if self._bits or self.ema_kernel != "pandas":
+                # Materialized regime: one AND per direction instead of the EMAs
+                for bullish, required in zip((True, False), ema_filter_bits(ema)):
+                    if required:
+                        mask &= (self.ema_bits(bullish) & required) == required
+            else:
+                for periods, bullish in ema_segments(ema):
+                    for fast, slow in zip(periods[:-1], periods[1:]):
+                        mask &= self.pair_mask(fast, slow, bullish)
+            self._cache[key] = mask
+        return self._cache[key]
+
+    def trigger(self, cond: str, threshold: float) -> np.ndarray:
+        key = ("trigger", cond, threshold)
+        if key not in self._cache:
+            if cond == "dump":
+                self._cache[key] = self.pump_pct < -threshold
+            else:
+                self._cache[key] = self.pump_pct > threshold
+        return self._cache[key]
+
+    def marubozu(self, threshold: float) -> np.ndarray:
+        key = ("marubozu", threshold)
+        if key not in self._cache:
+            self._cache[key] = self.marubozu_ratio >= threshold
+        return self._cache[key]
+
+    def signal(self, config: SignalConfig) -> np.ndarray:
+        return self.trigger(config.cond, config.threshold) & self.marubozu(config.marubozu) & self.ema_filter(config.ema)
+
+
+def evaluate_signals(df: pd.DataFrame, configs: Sequence[SignalConfig]) -> np.ndarray:
+    """Boolean matrix (len(configs), len(df)); row k is config k's entry_signal."""
+    features = SignalFeatures(df)
+    out = np.empty((len(configs), len(df)), dtype=bool)
+    for k, config in enumerate(configs):
+        out[k] = features.signal(config)
+    return out
+
+
+def signal_indices(df: pd.DataFrame, configs: Sequence[SignalConfig]) -> List[np.ndarray]:
+    """Row indices of each config's signals; avoids materialising the full matrix."""
+    features = SignalFeatures(df)
+    return [np.flatnonzero(features.signal(config)) for config in configs]
+
+
+class ThresholdLadder:
+    """
+    Candidate rows of one (cond, ema, marubozu) sorted by signal strength
+    (pump% for pump, -pump% for dump), strongest first.
+
+    entries(t) is the strength > t prefix, found by binary search and returned
+    in time order; identical to signal_indices for SignalConfig(cond, t, ema, marubozu).
+    """
+
+    def __init__(self, features: SignalFeatures, cond: str = "pump", ema: str = "none",
+                 marubozu: float = 0.80, min_threshold: float = -np.inf):
+        strength = -features.pump_pct if cond == "dump" else features.pump_pct
+        qualified = features.marubozu(marubozu) & features.ema_filter(ema) & (strength > min_threshold)
+        rows = np.flatnonzero(qualified)
+        order = np.argsort(-strength[rows], kind="stable")
+        self.rows = rows[order]
+        # Ascending keys for searchsorted: strength > t  <=>  -strength < -t
+        self._keys = -strength[rows][order]
+        self.min_threshold = min_threshold
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def count(self, threshold: float) -> int:
+        if threshold < self.min_threshold:
+            raise ValueError(f"Ladder built for thresholds >= {self.min_threshold}, got {threshold}")
+        return int(np.searchsorted(self._keys, -threshold, side="left"))
+
+    def entries(self, threshold: float) -> np.ndarray:
+        """Signal rows for this threshold, sorted by time."""
+        return np.sort(self.rows[:self.count(threshold)])
@@ -0,0 +1,146 @@
+"""
+Incremental (O(1) per bar) evaluation of VectorizedStrategy signals.
+
+For live / paper trading: feed bars one by one and get the same entry_signal
+process_data would produce over the full history, without recomputing EMAs.
+
+Exactness: the EMA recurrence mirrors pandas' ewm(span, adjust=False,
+min_periods=span).mean() step for step (alpha from the centre of mass, the
+normalising division and the constant-series shortcut), so replaying a parquet
+file gives bit-identical signals to process_data / signal_batch.
+
+State is a handful of floats per EMA; snapshot() returns a JSON-serialisable
+dict and StreamingSignalEngine.restore(state) resumes from it.
+
+Usage:
+    engine = StreamingSignalEngine([SignalConfig("pump", 0.02, "all_bull")])
+    for bar in stream:
+        signals = engine.update(bar.open, bar.high, bar.low, bar.close)   # one bool per config
+"""
+
+import math
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from conditions.signal_batch import BEAR_THRESHOLD_PCT, BULL_THRESHOLD_PCT, SignalConfig, ema_segments
+
+
+class StreamingSignalEngine:
+    __slots__ = (
+        "configs", "periods", "_min_periods", "_factor", "_new_wt",
+        "_weighted", "_old_wt", "_nobs", "_started", "_pairs", "_config_pairs",
+    )
+
+    def __init__(self, configs: Sequence[SignalConfig]):
+        self.configs = list(configs)
+
+        # Adjacent (fast, slow, bullish) comparisons any config needs, evaluated once per bar
+        pairs = []
+        config_pairs = []
+        for config in self.configs:
+            needed = []
+            for periods, bullish in ema_segments(config.ema):
+                for fast, slow in zip(periods[:-1], periods[1:]):
+                    key = (fast, slow, bullish)
+                    if key not in pairs:
+                        pairs.append(key)
+                    needed.append(pairs.index(key))
+            config_pairs.append(needed)
+        self._config_pairs = config_pairs
+
+        self.periods = sorted({p for fast, slow, _ in pairs for p in (fast, slow)})
+        slot = {p: i for i, p in enumerate(self.periods)}
+        self._pairs = [(slot[fast], slot[slow], bullish) for fast, slow, bullish in pairs]
+
+        # pandas: com = (span - 1) / 2, alpha = 1 / (1 + com); adjust=False -> new_wt = alpha
+        alphas = [1.0 / (1.0 + (p - 1) / 2.0) for p in self.periods]
+        self._factor = [1.0 - a for a in alphas]
+        self._new_wt = alphas
+        self._min_periods = list(self.periods)
+
+        n = len(self.periods)
+        self._weighted = [math.nan] * n
+        self._old_wt = [1.0] * n
+        self._nobs = [0] * n
+        self._started = False
+
+    # ------------------------------------------------------------------
+    def _update_emas(self, close: float) -> List[float]:
+        weighted, old_wt, nobs = self._weighted, self._old_wt, self._nobs
+        is_observation = close == close
+        out = []
+        for k in range(len(weighted)):
+            if not self._started:
+                weighted[k] = close
+                nobs[k] = int(is_observation)
+                old_wt[k] = 1.0
+            else:
+                nobs[k] += is_observation
+                w = weighted[k]
+                if w == w:
+                    old_wt[k] *= self._factor[k]
+                    if is_observation:
+                        # pandas skips the update on constant series to avoid drift
+                        if w != close:
+                            w = old_wt[k] * w + self._new_wt[k] * close
+                            w /= (old_wt[k] + self._new_wt[k])
+                            weighted[k] = w
+                        old_wt[k] = 1.0
+                elif is_observation:
+                    weighted[k] = close
+            out.append(weighted[k] if nobs[k] >= self._min_periods[k] else math.nan)
+        self._started = True
+        return out
+
+    def update(self, open: float, high: float, low: float, close: float) -> List[bool]:
+        """Consumes one bar; returns entry_signal for every config."""
+        emas = self._update_emas(close)
+
+        pair_ok = []
+        for fast, slow, bullish in self._pairs:
+            if bullish:
+                pair_ok.append(emas[fast] > emas[slow] * (1 + BULL_THRESHOLD_PCT))
+            else:
+                pair_ok.append(emas[fast] < emas[slow] * (1 - BEAR_THRESHOLD_PCT))
+
+        pump_pct = (close - open) / open
+        total_range = high - low
+        marubozu_ratio = abs(close - open) / total_range if total_range > 0 else 0.0
+
+        signals = []
+        for config, needed in zip(self.configs, self._config_pairs):
+            if config.cond == "dump":
+                hit = pump_pct < -config.threshold
+            else:
+                hit = pump_pct > config.threshold
+            signals.append(bool(hit and marubozu_ratio >= config.marubozu and all(pair_ok[i] for i in needed)))
+        return signals
+
+    # ------------------------------------------------------------------
+    def snapshot(self) -> Dict:
+        return {
+            "configs": [[c.cond, c.threshold, c.ema, c.marubozu] for c in self.configs],
+            "weighted": list(self._weighted),
+            "old_wt": list(self._old_wt),
+            "nobs": list(self._nobs),
+            "started": self._started,
+        }
+
+    @classmethod
+    def restore(cls, state: Dict) -> "StreamingSignalEngine":
+        engine = cls([SignalConfig(*c) for c in state["configs"]])
+        engine._weighted = list(state["weighted"])
+        engine._old_wt = list(state["old_wt"])
+        engine._nobs = list(state["nobs"])
+        engine._started = state["started"]
+        return engine
+
+    def replay(self, df: pd.DataFrame) -> np.ndarray:
+        """Feeds a whole frame; bool matrix (len(configs), len(df)) for verification."""
+        out = np.zeros((len(self.configs), len(df)), dtype=bool)
+        rows = zip(df['open'].tolist(), df['high'].tolist(), df['low'].tolist(), df['close'].tolist())
+        for i, (o, h, l, c) in enumerate(rows):
+            out[:, i] = self.update(o, h, l, c)
+        return out
@@ -4,19 +4,22 @@ Vektörel EMA + Pump + Marubozu Stratejisi
 Bu sınıf, piyasa verilerini vektörel (toplu) şekilde işleyerek hızlı backtest yapılmasını sağlar.
 
 GELECEKTEKİ AGENTLAR İÇİN KRİTİK KURALLAR (USER DIRECTIVE):
-1. Google Sheets API kararlılığı için toplu deneyler (batch) her zaman sıralı (sequential) yürütülmelidir. 
+1. Toplu deneyler (batch) BacktestEngine.run_batch ile paralel yürütülür; Google Sheets'e sonuçlar results_db üzerinden toplu gönderilir.
 2. Tek bir backtest koşturulurken pairlar 8 çekirdek ile paralel işlenmelidir (Hız için).
 3. Strateji hesaplamaları Pandas kütüphanesi ile vektörel yapılmalıdır.
 4. SIDES (LONG/SHORT) ve TRIGGER CONDITIONS (PUMP/DUMP) tamamen bağımsızdır.
 5. Google Sheets loglarına 'VECTORIZED' kelimesi yazılmamalıdır.
 """
 
-from backtest_framework import Strategy
+from backtest_framework import SignalStrategy
+from conditions.signal_batch import MATERIALIZED_COLUMNS, SignalConfig, SignalFeatures, ema_segments
+from conditions.streaming_signals import StreamingSignalEngine
+from src import storage
 import pandas as pd
 import numpy as np
 import polars as pl
 
-class VectorizedStrategy(Strategy):
+class VectorizedStrategy(SignalStrategy):
     """
     Vektörel Strateji Sınıfı
     ------------------------
@@ -34,7 +37,8 @@ class VectorizedStrategy(Strategy):
     # BÖLÜM 1: BAŞLATMA (INITIALIZATION)
     # =========================================================================
     def __init__(self, tp=0.04, sl=0.02, tsl=0.0, bet_size=7.0, side="SHORT", cond="pump",
-                 pump_threshold=0.02, dump_threshold=0.02, marubozu_threshold=0.80, ema="none", **kwargs):
+                 pump_threshold=0.02, dump_threshold=0.02, marubozu_threshold=0.80, ema="none",
+                 ema_kernel="pandas", **kwargs):
         """
         Strateji konfigürasyonunu ayarlar.
         
@@ -54,23 +58,61 @@ class VectorizedStrategy(Strategy):
         self.dump_threshold = dump_threshold  # % Drop threshold
         self.marubozu_threshold = marubozu_threshold  # Marubozu eşiği
         self.ema = ema.lower()                # EMA durumu (bull/bear/none)
+        self.ema_kernel = ema_kernel          # pandas (referans) | fused64 | fused32 (conditions/ema_kernel.py)
         
         # EMA Periyotları - Her zaman hesaplanır (filter "none" olsa bile)
         self.periods = [9, 20, 50, 100, 200, 300, 500, 1000, 2000, 5000]
+
+        # Canlı akış için artımlı sinyal motoru (ilk on_candle çağrısında kurulur)
+        self.signal_engine = None
     
     # =========================================================================
-    # BÖLÜM 2: DOSYA OKUMA
+    # BÖLÜM 2: SİNYAL PROTOKOLÜ (ENGINE VERİYİ YÜKLER)
+    # =========================================================================
+    required_columns = ('open', 'high', 'low', 'close')
+    # Ingest'te hazırlanmış kolonlar varsa EMA'lar hiç hesaplanmaz (bit maskesi AND)
+    feature_columns = MATERIALIZED_COLUMNS
+
+    @property
+    def warmup_bars(self):
+        # En uzun EMA dolmadan (min_periods) zincir zaten False; sadece bildiriyoruz
+        periods = [p for chain, _ in ema_segments(self.ema) for p in chain]
+        return max(periods) - 1 if periods else 0
+
+    @staticmethod
+    def canonical_params(params):
+        """Sonuç anahtarı (results_db.run_params) için: kullanılmayan eşik atılır, metinler küçük harf."""
+        params = dict(params)
+        cond = str(params.get('cond', 'pump')).lower()
+        params['cond'] = cond
+        params['ema'] = str(params.get('ema', 'none')).lower()
+        params.pop('dump_threshold' if cond == 'pump' else 'pump_threshold', None)
+        return params
+
+    def signal_config(self):
+        return SignalConfig.from_strategy_kwargs(
+            cond=self.cond, pump_threshold=self.pump_threshold, dump_threshold=self.dump_threshold,
+            ema=self.ema, marubozu_threshold=self.marubozu_threshold)
+
+    def signals(self, bars):
+        """Saf sinyal fonksiyonu: process_data ile birebir aynı entry_signal (dosya okumaz)."""
+        columns = [c for c in (*self.required_columns, *self.feature_columns) if c in bars.columns]
+        return SignalFeatures(bars.select(columns).to_pandas(), ema_kernel=self.ema_kernel).signal(self.signal_config())
+
+    # =========================================================================
+    # BÖLÜM 3: DOSYA OKUMA (ESKİ TURBO YOLU)
     # =========================================================================
     def process_file(self, filepath):
         # Dosyayı okur ve veri işleme fonksiyonuna gönderir
+        # (compact profilde yazılmış dosyalar storage tarafından genişletilir)
         try:
-            df = pd.read_parquet(filepath)
+            df = storage.read_bars(filepath).to_pandas()
             return self.process_data(df)
         except Exception:
             return None
 
     # =========================================================================
-    # BÖLÜM 3: ANA İŞLEME FONKSİYONU
+    # BÖLÜM 4: ANA İŞLEME FONKSİYONU
     # =========================================================================
     def process_data(self, df):
         """
@@ -217,11 +259,20 @@ class VectorizedStrategy(Strategy):
             return None
 
     # =========================================================================
-    # BÖLÜM 4: MUM MUM İŞLEME (KULLANILMIYOR)
+    # BÖLÜM 5: MUM MUM İŞLEME (CANLI / PAPER)
     # =========================================================================
     def on_candle(self, timestamp, open, high, low, close):
         """
-        Tek mum işleme fonksiyonu.
-        Vektörel modda kullanılmıyor - sadece uyumluluk için var.
+        Tek mum işleme fonksiyonu (canlı/paper akış için).
+        Backtest vektörel yoldan (process_data) yapılır; burada aynı sinyal
+        StreamingSignalEngine ile mum başına O(1) hesaplanır ve process_data ile birebir aynıdır.
+        Durum kaydetme/geri yükleme: self.signal_engine.snapshot() / StreamingSignalEngine.restore(state)
         """
-        pass
+        if self.signal_engine is None:
+            self.signal_engine = StreamingSignalEngine([self.signal_config()])
+
+        signal = self.signal_engine.update(open, high, low, close)[0]
+        self.conditions = {'entry_signal': signal}
+        if signal:
+            return {'type': self.side, 'tp': self.tp, 'sl': self.sl}
+        return None
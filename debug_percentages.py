@@ -1,49 +1,29 @@
 
-import subprocess
-import json
-import re
+from backtest_framework import BacktestEngine
+from main import DATA_ROOT, BacktestConfig, run_backtest
+from results_db import ResultsDB
 
-def get_backtest_stats(tp, sl):
-    cmd = [
-        ".venv/bin/python", "main.py",
-        "--strategy", "vectorized",
-        "--side", "SHORT",
-        "--pump", "2.0",
-        "--tp", str(tp),
-        "--sl", str(sl),
-        "--marubozu", "0.8",
-        "--ema", "none",
-        "--no-sheets"
-    ]
+def get_backtest_stats(engine, db, tp, sl):
+    config = BacktestConfig(
+        strategy="vectorized", side="SHORT", pump=2.0, tp=tp, sl=sl, marubozu=0.8, ema="none",
+        no_sheets=True, results_csv=None, verbose=False,
+    )
     print(f"Running backtest TP={tp}, SL={sl}...")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = run_backtest(config, engine, db)
     
-    # Extract total trades and weekly counts from output
-    total_trades = 0
-    weekly_counts = []
-    
-    # regex for "Total Trades: (\d+)"
-    total_match = re.search(r"Total Trades: (\d+)", result.stdout)
-    if total_match:
-        total_trades = int(total_match.group(1))
-        
-    # extract weekly table rows
-    # format: "11/01-18/01     | 1562     | $8.82"
-    lines = result.stdout.split('\n')
-    for line in lines:
-        if "/" in line and "|" in line:
-            parts = line.split('|')
-            if len(parts) >= 2:
-                try:
-                    count = int(parts[1].strip())
-                    weekly_counts.append(count)
-                except: pass
+    # Total trades and weekly (IST) counts from the run summary (src/analytics.py)
+    total_trades = result.total_trades
+    weekly_counts = [w['trades'] for w in result.summary['weekly_stats']] if result.summary else []
                 
     return total_trades, weekly_counts
 
 def main():
-    t1, w1 = get_backtest_stats(3.0, 7.0)
-    t2, w2 = get_backtest_stats(6.0, 4.0)
+    engine = BacktestEngine(data_dir=DATA_ROOT)
+    db = ResultsDB()
+    # Both runs share one process pool
+    with engine.shared_pool(8):
+        t1, w1 = get_backtest_stats(engine, db, 3.0, 7.0)
+        t2, w2 = get_backtest_stats(engine, db, 6.0, 4.0)
     
     print(f"\nResults Comparison:")
     print(f"BT 1 (3/7): Total={t1}, Weekly={w1}")
@@ -4,7 +4,7 @@ Binance Backtest Ana Çalıştırıcı (main.py)
 Bu dosya backtest süreçlerini başlatır, parametreleri yönetir ve sonuçları Google Sheets'e loglar.
 
 GELECEKTEKİ AGENTLAR İÇİN KRİTİK KURALLAR (USER DIRECTIVE):
-1. SEQUENTIAL BATCHING: Toplu deneyler (loop) Google Sheets API limitleri için MUTLAKA tek tek (sequential) çalıştırılmalıdır.
+1. BATCHING: Toplu deneyler BacktestEngine.run_batch ile (kombinasyon x pair) görevleri olarak paralel çalışabilir; Sheets'e yazım sonuç DB'si üzerinden toplu (results_db.py sync) yapılır, run başına API çağrısı yapılmamalıdır.
 2. INTERNAL PARALLELISM: Tek bir backtest çalışırken pairlar MUTLAKA 8 çekirdek (CPU core) ile paralel işlenmelidir.
 3. STRATEGY CHOICE: Her zaman 'vectorized' stratejisi kullanılmalıdır.
 4. DATA LOGIC: Strateji hesaplamalarında her zaman Pandas kullanılmalıdır.
@@ -14,24 +14,111 @@ Kullanım:
     python main.py --strategy pump_short --tp 4 --sl 2
     python main.py --strategy ema_pump --tp 8 --sl 3 --side LONG --pump 2
     python main.py --help
+
+Programatik kullanım (grid sürücüleri aynı süreç içinde çağırır, main.py alt süreç olarak başlatılmaz):
+    from main import BacktestConfig, run_backtest
+    result = run_backtest(BacktestConfig(tp=4, sl=2, no_sheets=True, results_csv=None))
+    result.summary, result.trades
 """
 
 import sys
 import os
 import argparse
+from dataclasses import dataclass, fields
+from typing import Dict, Optional
 
 # Add current directory to path
 sys.path.append(os.getcwd())
 
 from conditions.vectorized_strategy import VectorizedStrategy
 from backtest_framework import BacktestEngine
-import pandas as pd
+from results_db import ResultsDB, run_key, run_params, sync_to_sheets
+from src import analytics
 import pandas as pd
 
 # Use local processed data
 DATA_ROOT = os.path.join(os.getcwd(), "data", "processed")
 
 
+@dataclass
+class BacktestConfig:
+    """Bir backtest koşusunun parametreleri; alan isimleri CLI argümanlarıyla aynıdır (yüzdeler CLI'daki gibi: tp=4 -> %4)."""
+    strategy: str = 'vectorized'
+    tp: float = 4.0
+    sl: float = 2.0
+    side: str = 'SHORT'
+    cond: str = 'pump'
+    pump: float = 2.0
+    dump: float = 2.0
+    tsl: float = 0.0
+    marubozu: float = 0.80
+    bet: float = 7.0
+    workers: int = 8
+    max_pos: int = 1
+    avg_thresh: float = 0.0
+    no_sheets: bool = False
+    serial: bool = False
+    tf: Optional[str] = None
+    ema: str = 'none'
+    # CLI dışı seçenekler: sürücüler CSV yazmaz, ayrıntılı raporu kapatabilir
+    results_csv: Optional[str] = "backtest_results_pump.csv"
+    verbose: bool = True
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "BacktestConfig":
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in vars(args).items() if k in names})
+
+    def strategy_name(self) -> str:
+        """Sheets'e yazılan isim (sheets.py'deki regex ile uyumlu olmalı)."""
+        ema_str = f"EMA:{self.ema.title()}"
+        maru_str = f"M:{self.marubozu}"
+        target_str = f"TP:{self.tp}% SL:{self.sl}%"
+        tsl_str = f"TSL:{self.tsl}%" if self.tsl > 0 else "TSL:OFF"
+        # Show only the threshold being USED
+        if self.cond == "pump":
+            cond_val_str = f"Pump:{self.pump}%"
+        else:
+            cond_val_str = f"Dump:{self.dump}%"
+        return f"[{self.side}] {self.cond.upper()} {ema_str} {cond_val_str} {target_str} {tsl_str} {maru_str}"
+
+    def run_kwargs(self) -> Dict:
+        """engine.run parametreleri (yüzdeler ondalığa çevrilir); sonuç DB anahtarı da bunlardan üretilir."""
+        return dict(
+            cond=self.cond,
+            max_positions=self.max_pos,
+            avg_threshold=self.avg_thresh / 100.0,
+            pump_threshold=self.pump / 100.0,
+            dump_threshold=self.dump / 100.0,
+            marubozu_threshold=self.marubozu,
+            tp=self.tp / 100.0,
+            sl=self.sl / 100.0,
+            tsl=self.tsl / 100.0,
+            bet_size=self.bet,
+            side=self.side,
+            ema=self.ema,
+            tf_filter=self.tf
+        )
+
+
+@dataclass
+class RunResult:
+    """run_backtest çıktısı: işlemler, özet (işlem yoksa None) ve sonuç DB anahtarı."""
+    config: BacktestConfig
+    strategy_name: str
+    params: Dict
+    trades: pd.DataFrame
+    summary: Optional[Dict] = None
+
+    @property
+    def run_key(self) -> str:
+        return run_key(self.params)
+
+    @property
+    def total_trades(self) -> int:
+        return len(self.trades)
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Modüler Backtest Sistemi",
@@ -101,51 +188,23 @@ def parse_args():
     return parser.parse_args()
 
 
-def main():
-    args = parse_args()
-    
-    if not os.path.exists(DATA_ROOT):
-        print(f"❌ Data path not found: {DATA_ROOT}")
-        return
-
-    # Initialize Engine
-    engine = BacktestEngine(data_dir=DATA_ROOT)
-    
-    # Convert percentages to decimals
-    TP_PCT = args.tp / 100.0
-    SL_PCT = args.sl / 100.0
-    PUMP_THRESHOLD = args.pump / 100.0
-    DUMP_THRESHOLD = args.dump / 100.0
-    MARUBOZU_THRESHOLD = args.marubozu
-    BET_SIZE = args.bet
-    MAX_POSITIONS = args.max_pos
-    AVG_THRESHOLD = args.avg_thresh / 100.0
-    SIDE = args.side
-    
-    # Build strategy name for logging
-    ema_str = f"EMA:{args.ema.title()}"
-    maru_str = f"M:{args.marubozu}"
-    target_str = f"TP:{args.tp}% SL:{args.sl}%"
-    tsl_str = f"TSL:{args.tsl}%" if args.tsl > 0 else "TSL:OFF"
-    
-    # Show only the threshold being USED
-    if args.cond == "pump":
-        cond_val_str = f"Pump:{args.pump}%"
-    else:
-        cond_val_str = f"Dump:{args.dump}%"
+def run_backtest(config: BacktestConfig, engine: Optional[BacktestEngine] = None,
+                 db: Optional[ResultsDB] = None) -> RunResult:
+    """
+    Tek bir backtest koşusu: engine.run, özet, sonuç DB kaydı ve (no_sheets değilse) Sheets sync.
+    Sürücüler aynı engine/db nesnelerini tekrar kullanır (engine.shared_pool ile havuz da paylaşılır).
+    """
+    engine = engine or BacktestEngine(data_dir=DATA_ROOT)
+    db = db or ResultsDB()
+    strategy_name = config.strategy_name()
 
-    STRATEGY_NAME_LOG = f"[{args.side}] {args.cond.upper()} {ema_str} {cond_val_str} {target_str} {tsl_str} {maru_str}"
-    
-    # If using specific EMA logic hardcoded in strategy, we might want to append it.
-    # For now, this covers the CLI args.
-    
     # === STRATEGY SELECTION ===
-    if args.strategy == 'vectorized':
+    if config.strategy == 'vectorized':
         # FAST: Vectorized EMA + Pump + Marubozu (Polars/Turbo mode)
         SELECTED_CONDITIONS = VectorizedStrategy
         SELECTED_ACTION = None
         check_current_candle = False
-    elif args.strategy == 'pump_short':
+    elif config.strategy == 'pump_short':
         # Simple pump-based strategy
         SELECTED_CONDITIONS = PumpShortStrategy
         SELECTED_ACTION = None  # PumpShortStrategy handles entry internally
@@ -156,119 +215,105 @@ def main():
         SELECTED_ACTION = evaluate_action
         check_current_candle = False
 
-    print("=" * 50)
-    print("🚀 MODULAR BACKTEST SYSTEM")
-    print("=" * 50)
-    print(f"Strategy:    {args.strategy}")
-    print(f"Side:        {SIDE}")
-    print(f"TP:          {args.tp}%")
-    print(f"SL:          {args.sl}%")
-    print(f"Pump:        {args.pump}%")
-    print(f"Bet Size:    ${BET_SIZE}")
-    print(f"Max Pos:     {MAX_POSITIONS}")
-    print(f"Parallel:    {not args.serial}")
-    print("=" * 50)
-    
+    if config.verbose:
+        print("=" * 50)
+        print("🚀 MODULAR BACKTEST SYSTEM")
+        print("=" * 50)
+        print(f"Strategy:    {config.strategy}")
+        print(f"Side:        {config.side}")
+        print(f"TP:          {config.tp}%")
+        print(f"SL:          {config.sl}%")
+        print(f"Pump:        {config.pump}%")
+        print(f"Bet Size:    ${config.bet}")
+        print(f"Max Pos:     {config.max_pos}")
+        print(f"Parallel:    {not config.serial}")
+        print("=" * 50)
+
+    # Sonuç veritabanı anahtarı (results_db.run_params) bu parametrelerden üretilir
+    RUN_PARAMS = config.run_kwargs()
+    params = run_params(VectorizedStrategy, **RUN_PARAMS)
+
     # Run backtest
     results = engine.run(
         SELECTED_CONDITIONS, 
         action_func=SELECTED_ACTION,
-        cond=args.cond,
-        max_positions=MAX_POSITIONS,
-        avg_threshold=AVG_THRESHOLD,
-        pump_threshold=PUMP_THRESHOLD, 
-        dump_threshold=DUMP_THRESHOLD,
-        marubozu_threshold=MARUBOZU_THRESHOLD, 
-        tp=TP_PCT, 
-        sl=SL_PCT, 
-        tsl=args.tsl / 100.0,
-        bet_size=BET_SIZE,
-        side=SIDE,
-        ema=args.ema,
-        parallel=not args.serial,
+        parallel=not config.serial,
+        workers=config.workers,
         check_current_candle=check_current_candle,
-        tf_filter=args.tf
+        **RUN_PARAMS
     )
     
     if results.empty:
         print("\n❌ No trades generated.")
-        return
+        # Tamamlanan koşular dizinine yine de eklenir (grid sürücüleri tekrar koşmasın)
+        db.mark_completed(params)
+        return RunResult(config, strategy_name, params, results)
 
     # === ANALYSIS ===
-    print("\n📊 RESULTS")
-    print("-" * 50)
-    
-    total_trades = len(results)
-    wins = len(results[results['pnl_usd'] > 0])
-    losses = len(results[results['pnl_usd'] <= 0])
-    win_rate = (wins / total_trades) * 100
-    
-    total_pnl = results['pnl_usd'].sum()
-    avg_pnl = results['pnl_usd'].mean()
+    # Tüm kırılımlar (TF, IST haftası, sembol) tek Polars group-by ile hesaplanır (src/analytics.py)
+    stats = analytics.summarize_trades(results)
+    total_trades, wins = stats['total_trades'], stats['wins']
     
-    print(f"Total Trades: {total_trades}")
-    print(f"Win Rate:     {win_rate:.2f}% ({wins} W / {losses} L)")
-    print(f"Total PnL:    ${total_pnl:.2f}")
-    print(f"Avg PnL:      ${avg_pnl:.4f}")
-    
-    print("\n🏆 Top 5 Winners (by symbol):")
-    print(results.groupby('symbol')['pnl_usd'].sum().sort_values(ascending=False).head(5).to_string())
-    
-    print("\n💀 Top 5 Losers (by symbol):")
-    print(results.groupby('symbol')['pnl_usd'].sum().sort_values(ascending=False).tail(5).to_string())
-    print("-" * 50)
+    if config.verbose:
+        print("\n📊 RESULTS")
+        print("-" * 50)
+        print(f"Total Trades: {total_trades}")
+        print(f"Win Rate:     {stats['win_rate']:.2f}% ({wins} W / {total_trades - wins} L)")
+        print(f"Total PnL:    ${stats['total_pnl']:.2f}")
+        print(f"Avg PnL:      ${stats['avg_pnl']:.4f}")
+        
+        print("\n🏆 Top 5 Winners (by symbol):")
+        for symbol, pnl in stats['top_symbols']:
+            print(f"{symbol:<20} {pnl:>10.2f}")
+        
+        print("\n💀 Top 5 Losers (by symbol):")
+        for symbol, pnl in stats['bottom_symbols']:
+            print(f"{symbol:<20} {pnl:>10.2f}")
+
+        print("\n📅 Weekly (IST, Sunday 03:00):")
+        for week in stats['weekly_stats']:
+            print(f"{week['label']:<15} | {week['trades']:<8} | ${week['pnl']:.2f}")
+        print("-" * 50)
+    else:
+        print(f"📊 {strategy_name}: {total_trades} trades, WR {stats['win_rate']:.2f}%, PnL ${stats['total_pnl']:.2f}")
 
     # Save Results
-    results_csv = "backtest_results_pump.csv"
-    print(f"\n💾 Saving results to {results_csv}...")
-    results.to_csv(results_csv, index=False)
+    if config.results_csv:
+        print(f"\n💾 Saving results to {config.results_csv}...")
+        results.to_csv(config.results_csv, index=False)
+
+    # === RESULTS DB + GOOGLE SHEETS LOGGING ===
+    # Önce yerel veritabanına yazılır; Sheets sadece bu kayıtların kopyasıdır
+    summary_data = {
+        'strategy_name': strategy_name,
+        'tp_pct': RUN_PARAMS['tp'],
+        'sl_pct': RUN_PARAMS['sl'],
+        'max_pos': config.max_pos,
+        'avg_thresh': RUN_PARAMS['avg_threshold'],
+        'bet_size': config.bet,
+        **stats,
+    }
     
-    # Weekly stats skipped
-    weekly_stats = []
+    db.record(params, summary_data)
+    print(f"📒 Result stored in {db.path}")
 
-    # === GOOGLE SHEETS LOGGING ===
-    if not args.no_sheets:
+    if not config.no_sheets:
         print("☁️  Logging Analysis to Google Sheets...")
-        
-        # Calculate missing variables
-        # Convert entry_time to datetime if it's string
-        if not results.empty:
-            results['entry_time'] = pd.to_datetime(results['entry_time'])
-            overall_date_range = f"{results['entry_time'].min().strftime('%Y-%m-%d')} to {results['entry_time'].max().strftime('%Y-%m-%d')}"
-        else:
-            overall_date_range = "N/A"
-        tf_breakdown = results.groupby('symbol').agg({'pnl_usd': 'sum'}).to_dict() if not results.empty else {}
-        
-        # Calculate actual days from data
-        actual_days = (results['entry_time'].max() - results['entry_time'].min()).days + 1 if not results.empty else 0
-        
-        summary_data = {
-            'strategy_name': STRATEGY_NAME_LOG,
-            'tp_pct': TP_PCT,
-            'sl_pct': SL_PCT,
-            'max_pos': MAX_POSITIONS,
-            'avg_thresh': AVG_THRESHOLD,
-            'bet_size': BET_SIZE,
-            'total_trades': total_trades,
-            'win_rate': win_rate,
-            'total_pnl': total_pnl,
-            'avg_pnl': avg_pnl,
-            'best_trade': results['pnl_usd'].max(),
-            'worst_trade': results['pnl_usd'].min(),
-            'date_range': overall_date_range,
-            'weekly_stats': weekly_stats,
-            'tf_breakdown': tf_breakdown,
-            'total_days': actual_days
-        }
-        
-        try:
-            from sheets import log_analysis_to_sheet
-            log_analysis_to_sheet(summary_data)
-        except Exception as e:
-            print(f"⚠️ Sheets logging failed: {e}")
-    else:
+        sync_to_sheets(db)
+    elif config.verbose:
         print("⏭️  Skipping Google Sheets (--no-sheets)")
 
+    return RunResult(config, strategy_name, params, results, summary_data)
+
+
+def main():
+    config = BacktestConfig.from_args(parse_args())
+    
+    if not os.path.exists(DATA_ROOT):
+        print(f"❌ Data path not found: {DATA_ROOT}")
+        return
+
+    run_backtest(config)
     print("\n✅ Backtest complete!")
 
 
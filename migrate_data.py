@@ -13,6 +13,7 @@ Usage:
     python migrate_data.py
     python migrate_data.py --dry-run
     python migrate_data.py --workers 8
+    python migrate_data.py --profile compact
 """
 
 import argparse
@@ -20,9 +21,10 @@ import logging
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Tuple
-import polars as pl
 from tqdm import tqdm
 
+from src import storage, symbols
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -64,7 +66,7 @@ def get_symbol_timeframe_pairs() -> List[Tuple[str, str]]:
     return pairs
 
 
-def migrate_symbol_timeframe(symbol: str, timeframe: str, dry_run: bool = False) -> dict:
+def migrate_symbol_timeframe(symbol: str, timeframe: str, dry_run: bool = False, profile: str = "default") -> dict:
     """
     Migrates one symbol-timeframe combination.
     
@@ -72,6 +74,7 @@ def migrate_symbol_timeframe(symbol: str, timeframe: str, dry_run: bool = False)
         symbol: Symbol name (e.g., 'BTCUSDT')
         timeframe: Timeframe (e.g., '45s')
         dry_run: If True, only simulate without writing files
+        profile: Storage profile for the target file ('default' or 'compact')
     
     Returns:
         dict with status info: {'success': bool, 'rows': int, 'error': str}
@@ -100,10 +103,13 @@ def migrate_symbol_timeframe(symbol: str, timeframe: str, dry_run: bool = False)
         
         # Read and concatenate all weeks
         dfs = []
+        all_sorted = True
         for week_file in week_files:
             try:
-                df = pl.read_parquet(week_file)
+                metadata = storage.read_bar_metadata(week_file)
+                df = storage.read_bar_file(week_file, metadata)
                 dfs.append(df)
+                all_sorted = all_sorted and storage.is_sorted_on_write(week_file, metadata)
             except Exception as e:
                 logger.warning(f"Failed to read {week_file}: {e}")
                 continue
@@ -112,13 +118,10 @@ def migrate_symbol_timeframe(symbol: str, timeframe: str, dry_run: bool = False)
             result['error'] = 'No valid data frames'
             return result
         
-        # Concatenate and sort
-        combined_df = pl.concat(dfs)
-        combined_df = combined_df.sort("ts_1s")
-        
-        # Remove duplicates (just in case)
-        # Keep first occurrence of each timestamp
-        combined_df = combined_df.unique(subset=["ts_1s"], keep="first")
+        # Concatenate in week order.
+        # Weeks written by data_manager are already sorted/unique, so only legacy
+        # files pay for sort + unique (keep first occurrence of each timestamp).
+        combined_df = storage.concat_bars(dfs, trusted=all_sorted)
         
         result['rows'] = len(combined_df)
         
@@ -127,7 +130,8 @@ def migrate_symbol_timeframe(symbol: str, timeframe: str, dry_run: bool = False)
             TARGET_DIR.mkdir(parents=True, exist_ok=True)
             
             target_file = TARGET_DIR / f"{symbol}_{timeframe}.parquet"
-            combined_df.write_parquet(target_file)
+            price_decimals = symbols.price_decimals(symbol) if profile == "compact" else None
+            storage.write_bars(combined_df, target_file, profile=profile, price_decimals=price_decimals)
             
             logger.debug(f"Written {target_file}: {len(combined_df):,} rows")
         
@@ -140,19 +144,21 @@ def migrate_symbol_timeframe(symbol: str, timeframe: str, dry_run: bool = False)
     return result
 
 
-def run_migration(workers: int = 4, dry_run: bool = False):
+def run_migration(workers: int = 4, dry_run: bool = False, profile: str = "default"):
     """
     Runs the migration process.
     
     Args:
         workers: Number of parallel workers
         dry_run: If True, simulates without writing files
+        profile: Storage profile for written files ('default' or 'compact')
     """
     logger.info("Starting data migration...")
     logger.info(f"Source: {SOURCE_DIR}")
     logger.info(f"Target: {TARGET_DIR}")
     logger.info(f"Workers: {workers}")
     logger.info(f"Dry run: {dry_run}")
+    logger.info(f"Profile: {profile}")
     
     # Get all symbol-timeframe pairs
     pairs = get_symbol_timeframe_pairs()
@@ -172,7 +178,7 @@ def run_migration(workers: int = 4, dry_run: bool = False):
     with ThreadPoolExecutor(max_workers=workers) as executor:
         # Submit all tasks
         future_to_pair = {
-            executor.submit(migrate_symbol_timeframe, symbol, tf, dry_run): (symbol, tf)
+            executor.submit(migrate_symbol_timeframe, symbol, tf, dry_run, profile): (symbol, tf)
             for symbol, tf in pairs
         }
         
@@ -211,7 +217,7 @@ def run_migration(workers: int = 4, dry_run: bool = False):
             sample = next(r for r in results if r['success'])
             sample_file = TARGET_DIR / f"{sample['symbol']}_{sample['timeframe']}.parquet"
             
-            df = pl.read_parquet(sample_file)
+            df = storage.read_bars(sample_file)
             min_date = df["ts_1s"].min()
             max_date = df["ts_1s"].max()
             
@@ -244,6 +250,13 @@ def parse_args():
         help='Simulate migration without writing files'
     )
     
+    parser.add_argument(
+        '--profile',
+        choices=list(storage.PROFILES),
+        default='default',
+        help='Storage profile: default (Float64) or compact (scaled ints, int32 time)'
+    )
+    
     return parser.parse_args()
 
 
@@ -252,7 +265,7 @@ def main():
     args = parse_args()
     
     try:
-        run_migration(workers=args.workers, dry_run=args.dry_run)
+        run_migration(workers=args.workers, dry_run=args.dry_run, profile=args.profile)
     except KeyboardInterrupt:
         print("\n\n⚠️  Migration interrupted by user")
     except Exception as e:
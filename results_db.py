@@ -0,0 +1,225 @@
+"""
+Local results database for backtest runs (results_db.py)
+========================================================
+
+Batch drivers write every run summary here first (SQLite, one row per
+canonical parameter key); Google Sheets is only a downstream copy, pushed in
+bulk by a separate sync job, so compute never waits on the network.
+
+    meta/results.sqlite
+        runs(run_key PK, strategy_name, params JSON, summary JSON, created_at, synced_at)
+        completed(run_key PK, completed_at, trades)
+
+run_key is the canonical JSON of the run parameters (sorted keys, numbers
+normalized so 2, 2.0 and 2.00000000001 give the same key). For engine runs
+build the parameters with run_params(), which fills in the strategy and engine
+defaults, so a grid's display names and order never matter for dedup:
+
+    key = strategy_run_key(VectorizedStrategy, tp=0.04, sl=0.02, max_positions=1)
+    if key not in db.completed_keys(): ...
+
+The completed table is the completed-runs index: every recorded run plus runs
+that finished without trades (mark_completed), which have no sheet row.
+
+Sync (newest rows land on top of the sheet, as with log_analysis_to_sheet):
+    python results_db.py sync
+    python results_db.py status
+"""
+
+import argparse
+import inspect
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from src import config
+
+RESULTS_DB_FILE = config.META_DIR / "results.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_key       TEXT PRIMARY KEY,
+    strategy_name TEXT,
+    params        TEXT NOT NULL,
+    summary       TEXT NOT NULL,
+    created_at    TEXT NOT NULL,
+    synced_at     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_synced ON runs(synced_at);
+CREATE TABLE IF NOT EXISTS completed (
+    run_key      TEXT PRIMARY KEY,
+    completed_at TEXT NOT NULL,
+    trades       INTEGER
+);
+INSERT OR IGNORE INTO completed (run_key, completed_at) SELECT run_key, created_at FROM runs;
+"""
+
+# BacktestEngine.run arguments that change results (the rest are execution options)
+ENGINE_KEY_PARAMS = ("max_positions", "avg_threshold", "tf_filter")
+RUN_OPTIONS = {"parallel", "workers", "use_cache", "check_current_candle", "action_func"}
+
+
+def _normalize(value):
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(f"{float(value):.10g}")
+    if hasattr(value, 'item'):  # numpy scalars
+        return _normalize(value.item())
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return str(value)
+
+
+def run_key(params: Dict) -> str:
+    """Canonical key of a parameter dict (key order and number formatting do not matter)."""
+    return json.dumps(_normalize(params), sort_keys=True, separators=(",", ":"))
+
+
+def run_params(strategy_class, **run_kwargs) -> Dict:
+    """
+    Canonical parameters of BacktestEngine.run(strategy_class, **run_kwargs):
+    strategy constructor defaults filled in, execution options dropped, and the
+    strategy's own canonical_params(params) hook applied (e.g. unused thresholds).
+    """
+    from backtest_framework import BacktestEngine
+
+    engine_defaults = inspect.signature(BacktestEngine.run).parameters
+    engine = {name: run_kwargs.get(name, engine_defaults[name].default) for name in ENGINE_KEY_PARAMS}
+
+    params = {
+        name: p.default for name, p in inspect.signature(strategy_class.__init__).parameters.items()
+        if name != 'self' and p.default is not inspect.Parameter.empty
+    }
+    params.update({k: v for k, v in run_kwargs.items() if k not in RUN_OPTIONS and k not in ENGINE_KEY_PARAMS})
+    if hasattr(strategy_class, 'canonical_params'):
+        params = strategy_class.canonical_params(params)
+    return {"strategy": strategy_class.__name__, "params": params, "engine": engine}
+
+
+def strategy_run_key(strategy_class, **run_kwargs) -> str:
+    return run_key(run_params(strategy_class, **run_kwargs))
+
+
+def _json_default(o):
+    return o.item() if hasattr(o, 'item') else str(o)
+
+
+class ResultsDB:
+    """Run summaries keyed by run_key; safe to share between processes (SQLite WAL)."""
+
+    def __init__(self, path=None):
+        self.path = Path(path or RESULTS_DB_FILE)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30)
+
+    def record(self, params: Dict, summary: Dict, strategy_name: Optional[str] = None) -> str:
+        """Stores (or replaces) the result of a run; a replaced row is synced again. Returns its key."""
+        key = run_key(params)
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO completed (run_key, completed_at, trades) VALUES (?, ?, ?)",
+                         (key, now, summary.get('total_trades')))
+            conn.execute(
+                "INSERT INTO runs (run_key, strategy_name, params, summary, created_at, synced_at) "
+                "VALUES (?, ?, ?, ?, ?, NULL) "
+                "ON CONFLICT(run_key) DO UPDATE SET strategy_name=excluded.strategy_name, "
+                "summary=excluded.summary, created_at=excluded.created_at, synced_at=NULL",
+                (key, strategy_name or summary.get('strategy_name'), json.dumps(_normalize(params), sort_keys=True),
+                 json.dumps(summary, default=_json_default), now),
+            )
+        return key
+
+    def get(self, key: str) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT summary FROM runs WHERE run_key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def mark_completed(self, params: Dict, trades: int = 0) -> str:
+        """Adds a run without a result row (e.g. no trades) to the completed-runs index."""
+        key = run_key(params)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO completed (run_key, completed_at, trades) VALUES (?, ?, ?)",
+                         (key, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), trades))
+        return key
+
+    def completed_keys(self) -> Set[str]:
+        """Keys of every finished run; load once per sweep and test membership in O(1)."""
+        with closing(self._connect()) as conn:
+            return {k for (k,) in conn.execute("SELECT run_key FROM completed")}
+
+    def strategy_names(self) -> Set[str]:
+        with closing(self._connect()) as conn:
+            return {n for (n,) in conn.execute("SELECT strategy_name FROM runs WHERE strategy_name IS NOT NULL")}
+
+    def unsynced(self, limit: int = 500) -> List[Dict]:
+        """Oldest rows not pushed to Sheets yet: [{'run_key', 'created_at', 'summary'}]."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT run_key, created_at, summary FROM runs WHERE synced_at IS NULL "
+                "ORDER BY created_at, rowid LIMIT ?", (limit,)).fetchall()
+        return [{'run_key': k, 'created_at': t, 'summary': json.loads(s)} for k, t, s in rows]
+
+    def mark_synced(self, keys: Sequence[str]):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("UPDATE runs SET synced_at = ? WHERE run_key = ?", [(now, k) for k in keys])
+
+    def counts(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            total, pending = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(synced_at IS NULL), 0) FROM runs").fetchone()
+            (completed,) = conn.execute("SELECT COUNT(*) FROM completed").fetchone()
+        return {'runs': total, 'unsynced': pending, 'completed': completed}
+
+
+def sync(db: ResultsDB, push: Callable[[List[Dict]], None], batch_size: int = 200) -> int:
+    """
+    Pushes unsynced summaries to `push` (e.g. sheets.log_analyses_to_sheet) in
+    batches, oldest first, each stamped with its run time as 'timestamp'.
+    Rows are marked synced only after their batch succeeded; a failing push
+    stops the job and the rest is retried next time. Returns rows pushed.
+    """
+    pushed = 0
+    while True:
+        rows = db.unsynced(batch_size)
+        if not rows:
+            return pushed
+        push([dict(r['summary'], timestamp=r['created_at']) for r in rows])
+        db.mark_synced([r['run_key'] for r in rows])
+        pushed += len(rows)
+
+
+def sync_to_sheets(db: ResultsDB, batch_size: int = 200) -> int:
+    """sync() into Google Sheets; a failure is only reported, the rows stay queued for the next sync."""
+    try:
+        from sheets import log_analyses_to_sheet
+        pushed = sync(db, log_analyses_to_sheet, batch_size)
+        print(f"☁️  Synced {pushed} rows to Google Sheets")
+        return pushed
+    except Exception as e:
+        print(f"⚠️ Sheets sync failed, results kept in {db.path} (retry: python results_db.py sync): {e}")
+        return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local backtest results database")
+    parser.add_argument("command", choices=["sync", "status"])
+    parser.add_argument("--db", default=str(RESULTS_DB_FILE))
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    db = ResultsDB(args.db)
+    if args.command == "sync":
+        sync_to_sheets(db, args.batch_size)
+    print(f"📒 {db.counts()}")
@@ -1,6 +1,5 @@
 import sys
 import os
-import pandas as pd
 import time
 
 # Add current directory
@@ -10,7 +9,8 @@ from backtest_framework import BacktestEngine
 # from conditions.ema_chain import EmaChainConditions
 # from actions import evaluate_action
 from strategies.polars_ema_chain import PolarsEmaChain
-from sheets import log_analysis_to_sheet
+from sheets import SheetsWriter
+from src import analytics
 
 DATA_ROOT = os.path.join(os.getcwd(), "data", "processed")
 
@@ -81,6 +81,8 @@ def run_batch():
     print(f"🚀 Starting Grand Batch Backtest - {len(configs)} Variations...")
     print("-------------------------------------------------------------")
     
+    # Rows are coalesced: one insert per 10 results (or 60s), formatting applied once
+    writer = SheetsWriter(flush_rows=10, flush_seconds=60.0)
     for i, cfg in enumerate(configs):
         print(f"\n👉 [{i+1}/{len(configs)}] Running: {cfg['name']} ...")
         
@@ -111,46 +113,15 @@ def run_batch():
                 print("   ⚠️ No trades.")
                 continue
                 
-            # Stats
-            total_trades = len(results)
-            wins = len(results[results['pnl_usd'] > 0])
-            total_pnl = results['pnl_usd'].sum()
-            win_rate = (wins/total_trades)*100 if total_trades > 0 else 0
+            # Stats + weekly (IST) breakdown in one aggregation (src/analytics.py)
+            stats = analytics.summarize_trades(results)
             
-            print(f"   ✅ Trades: {total_trades}, PnL: ${total_pnl:.2f}, WR: {win_rate:.1f}%")
+            print(f"   ✅ Trades: {stats['total_trades']}, PnL: ${stats['total_pnl']:.2f}, WR: {stats['win_rate']:.1f}%")
             
             # Prepare Sheet Data
-            results['entry_time'] = pd.to_datetime(results['entry_time'])
-            start_date = results['entry_time'].min().strftime('%d.%m')
-            end_date = results['entry_time'].max().strftime('%d.%m')
-            date_range = f"({start_date}-{end_date})"
+            summary = {'strategy_name': cfg['name'], **stats}
             
-            weekly_stats = []
-            if not results.empty:
-                weekly_groups = results.set_index('entry_time').resample('W-MON')
-                for w_end, group in weekly_groups:
-                    w_start_ts = w_end - pd.Timedelta(days=6)
-                    label = f"{w_start_ts.strftime('%d.%m')}-{w_end.strftime('%d.%m')}"
-                    if not group.empty:
-                        weekly_stats.append({
-                            'label': label,
-                            'trades': len(group),
-                            'pnl': group['pnl_usd'].sum()
-                        })
-
-            summary = {
-                'strategy_name': cfg['name'],
-                'win_rate': win_rate,
-                'total_trades': total_trades,
-                'total_pnl': total_pnl,
-                'date_range': date_range,
-                'weekly_stats': weekly_stats
-            }
-            
-            log_analysis_to_sheet(summary)
-            
-            # Quota Safety Sleep
-            time.sleep(10)
+            writer.add(summary)
             
         except Exception as e:
             print(f"❌ Failed run {i+1}: {e}")
@@ -158,5 +129,7 @@ def run_batch():
             traceback.print_exc()
             time.sleep(5) # Wait on error too
 
+    writer.close()
+
 if __name__ == "__main__":
     run_batch()
@@ -1,24 +1,19 @@
-import subprocess
-import time
+from backtest_framework import BacktestEngine
+from main import DATA_ROOT, BacktestConfig, run_backtest
+from results_db import ResultsDB, sync_to_sheets
 
-def run_backtest(side, cond, tp, sl):
-    cmd = [
-        ".venv/bin/python", "main.py",
-        "--strategy", "vectorized",
-        "--side", side,
-        "--cond", cond,
-        "--pump", "2.0",
-        "--dump", "2.0",
-        "--tp", str(tp),
-        "--sl", str(sl),
-        "--marubozu", "0.8",
-        "--ema", "none"
-    ]
+def run_variation(engine, db, side, cond, tp, sl):
+    config = BacktestConfig(
+        strategy="vectorized", side=side, cond=cond, pump=2.0, dump=2.0, tp=tp, sl=sl, marubozu=0.8,
+        ema="none", no_sheets=True, results_csv=None, verbose=False,
+    )
     print(f"\n🚀 Running: SIDE={side} | COND={cond} | TP={tp}% | SL={sl}%")
-    result = subprocess.run(cmd)
-    if result.returncode != 0:
-        print(f"❌ Error in run: {side}/{cond}")
-    return result.returncode == 0
+    try:
+        run_backtest(config, engine, db)
+        return True
+    except Exception as e:
+        print(f"❌ Error in run: {side}/{cond}: {e}")
+        return False
 
 def main():
     # Test all variations
@@ -34,17 +29,17 @@ def main():
     
     print(f"🏁 Starting Cross-Study Backtest: {total} combinations")
     
-    for side in sides:
-        for cond in conds:
-            for tp in tps:
-                for sl in sls:
-                    count += 1
-                    print(f"[{count}/{total}]", end=" ")
-                    success = run_backtest(side, cond, tp, sl)
-                    if success:
-                        time.sleep(1) # Small cooldown for API
-                    else:
-                        print("⚠️ Skipping delay.")
+    engine = BacktestEngine(data_dir=DATA_ROOT)
+    db = ResultsDB()
+    with engine.shared_pool(8):
+        for side in sides:
+            for cond in conds:
+                for tp in tps:
+                    for sl in sls:
+                        count += 1
+                        print(f"[{count}/{total}]", end=" ")
+                        run_variation(engine, db, side, cond, tp, sl)
+    sync_to_sheets(db)
 
 if __name__ == "__main__":
     main()
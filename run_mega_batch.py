@@ -1,9 +1,6 @@
 import sys
 import os
-import pandas as pd
 import json
-import time
-from datetime import datetime
 import itertools
 
 import argparse
@@ -13,7 +10,9 @@ sys.path.append(os.getcwd())
 
 from backtest_framework import BacktestEngine
 from conditions.vectorized_strategy import VectorizedStrategy
-from sheets import log_analysis_to_sheet
+from results_db import ResultsDB, run_key, run_params
+from sweep_journal import SweepJournal
+from src import analytics
 
 DATA_ROOT = os.path.join(os.getcwd(), "data", "processed")
 PROGRESS_FILE = "mega_batch_progress.json"
@@ -59,126 +58,135 @@ def generate_combinations():
     # Total: 4 (Side/Cond pairs) * 5 (Thresholds) * 9 (EMA) * 10 (TP) * 10 (SL) * 2 (TSL) = 36,000
     return prioritized_grid
 
-def get_progress():
-    if os.path.exists(PROGRESS_FILE):
-        with open(PROGRESS_FILE, 'r') as f:
-            return json.load(f)
-    return {"completed_index": -1}
-
-def save_progress(index):
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump({"completed_index": index, "last_updated": str(datetime.now())}, f)
-
-
-def run_mega_batch():
+def combination_params(side, cond, thresh, ema, tp, sl, tsl):
+    """engine.run kwargs of one grid combination (cond argument handles the pump/dump logic in VectorizedStrategy)."""
+    return dict(
+        max_positions=1,
+        avg_threshold=0.0,
+        pump_threshold=abs(thresh)/100.0 if cond == "pump" else 0.02,
+        dump_threshold=abs(thresh)/100.0 if cond == "dump" else 0.02,
+        tp=tp/100.0,
+        sl=sl/100.0,
+        tsl=tsl/100.0,
+        bet_size=7.0,
+        side=side,
+        cond=cond,
+        ema=ema,
+    )
+
+def import_legacy_progress(db, combinations):
+    """
+    One-time migration of the old positional progress file (completed_index into
+    the grid of that time) into the completed-runs index, then renamed.
+    """
+    if not os.path.exists(PROGRESS_FILE):
+        return
+    with open(PROGRESS_FILE, 'r') as f:
+        completed_index = json.load(f).get("completed_index", -1)
+    for combo in combinations[:completed_index + 1]:
+        db.mark_completed(run_params(VectorizedStrategy, **combination_params(*combo)), trades=None)
+    os.replace(PROGRESS_FILE, PROGRESS_FILE + ".migrated")
+    print(f"📦 Imported {completed_index + 1} completed combinations from {PROGRESS_FILE}")
+
+
+def strategy_name(side, cond, thresh, ema, tp, sl, tsl):
+    """Display name for the log (must match the regex in sheets.py)."""
+    tsl_str = f"TSL:{tsl}%" if tsl > 0 else "TSL:OFF"
+    # Ensure threshold label matches sheets.py expected format (positive for pump, negative for dump)
+    cond_val_str = f"{cond.capitalize()}:{abs(thresh)}%"
+    return f"[{side}] {cond.upper()} EMA:{ema.title()} {cond_val_str} TP:{float(tp)}% SL:{float(sl)}% {tsl_str} M:0.8"
+
+def summarize(strat_name, tp, sl, results):
+    """Summary dict for the results DB / Sheets row of one combination (breakdowns: src/analytics.py)."""
+    return {
+        'strategy_name': strat_name,
+        'tp_pct': tp/100.0,
+        'sl_pct': sl/100.0,
+        'max_pos': 1,
+        'avg_thresh': 0.0,
+        'bet_size': 7.0,
+        **analytics.summarize_trades(results),
+    }
+
+def record_block(db, journal, block, frames):
+    """
+    Stores the finished combinations of a block and drops their journal partials.
+    A frame with failed_pairs is incomplete: it is not recorded and keeps its
+    partials, so the next run computes only the failed pairs. Returns how many
+    combinations were recorded.
+    """
+    finished = []
+    for (combo, key_params), results in zip(block, frames):
+        if results.attrs.get('failed_pairs'):
+            continue
+        finished.append(combination_params(*combo))
+        if results.empty:
+            db.mark_completed(key_params)
+            continue
+        side, cond, thresh, ema, tp, sl, tsl = combo
+        # Local store first; Sheets is synced separately (python results_db.py sync)
+        db.record(key_params, summarize(strategy_name(*combo), tp, sl, results))
+    journal.discard(journal.combo_key(VectorizedStrategy, p) for p in finished)
+    return len(finished)
+
+def run_mega_batch(block_size=200, workers=None):
     if not os.path.exists(DATA_ROOT):
         print(f"❌ Data path not found: {DATA_ROOT}")
         return
 
     engine = BacktestEngine(data_dir=DATA_ROOT)
+    db = ResultsDB()
     combinations = generate_combinations()
     total = len(combinations)
-    progress = get_progress()
-    start_idx = progress["completed_index"] + 1
-
-    print(f"🚀 Starting Mega Batch: {total} combinations.")
-    print(f"🔄 Resuming from index: {start_idx}")
-
-    for i in range(start_idx, total):
-        side, cond, thresh, ema, tp, sl, tsl = combinations[i]
-        
-        # Build Strategy Name for Log (Must match the regex in sheets.py)
-        tsl_str = f"TSL:{tsl}%" if tsl > 0 else "TSL:OFF"
-        # Ensure threshold label matches sheets.py expected format (positive for pump, negative for dump)
-        cond_val_str = f"{cond.capitalize()}:{abs(thresh)}%"
-        
-        strat_name = f"[{side}] {cond.upper()} EMA:{ema.title()} {cond_val_str} TP:{float(tp)}% SL:{float(sl)}% {tsl_str} M:0.8"
-        
-        print(f"\n👉 [{i+1}/{total}] Running: {strat_name}")
+    import_legacy_progress(db, combinations)
+    # Completed-runs index: skip by canonical key, whatever the grid order or definition
+    completed = db.completed_keys()
+
+    pending = []
+    for combo in combinations:
+        key_params = run_params(VectorizedStrategy, **combination_params(*combo))
+        if run_key(key_params) not in completed:
+            pending.append((combo, key_params))
+
+    # Sweep journal: finished (combination, pair) tasks survive crashes; drop leftovers of recorded runs
+    journal = SweepJournal()
+    journal.prune({journal.combo_key(VectorizedStrategy, combination_params(*combo)) for combo, _ in pending})
+
+    print(f"🚀 Starting Mega Batch: {total} combinations, {len(pending)} pending.")
+    print(f"⚡ Blocks of {block_size} combinations run concurrently over all pairs")
+
+    done = total - len(pending)
+    for start in range(0, len(pending), block_size):
+        block = pending[start:start + block_size]
+        print(f"\n👉 [{done + 1}-{done + len(block)}/{total}] {strategy_name(*block[0][0])} ...")
         
+        block_params = [combination_params(*combo) for combo, _ in block]
         try:
-            # Map parameters for engine.run
-            # cond argument in engine.run handles the pump/dump logic in VectorizedStrategy
-            results = engine.run(
-                VectorizedStrategy,
-                max_positions=1,
-                avg_threshold=0.0,
-                pump_threshold=abs(thresh)/100.0 if cond == "pump" else 0.02,
-                dump_threshold=abs(thresh)/100.0 if cond == "dump" else 0.02,
-                tp=tp/100.0,
-                sl=sl/100.0,
-                tsl=tsl/100.0,
-                bet_size=7.0,
-                side=side,
-                cond=cond,
-                ema=ema,
-                parallel=True,
-                workers=2
-            )
-
-            if results is None or results.empty:
-                print("   ⚠️ No trades.")
-                save_progress(i)
-                continue
-
-            # Calculate Stats
-            total_trades = len(results)
-            wins = len(results[results['pnl_usd'] > 0])
-            win_rate = (wins / total_trades) * 100 if total_trades > 0 else 0
-            total_pnl = results['pnl_usd'].sum()
-            avg_pnl = results['pnl_usd'].mean()
-            
-            # Skip weekly stats
-            date_range = f"({(pd.Timestamp.now() - pd.Timedelta(days=90)).strftime('%d.%m')}-{pd.Timestamp.now().strftime('%d.%m')})"
-            weekly_stats = []
-            
-            # Timeframe Breakdown
-            results['tf'] = results['symbol'].apply(lambda x: x.split('_')[-1] if '_' in x else 'Unknown')
-            tf_groups = results.groupby('tf')
-            tf_breakdown = {}
-            for tf, group in tf_groups:
-                tf_breakdown[tf] = {
-                    'trades': len(group),
-                    'pnl': group['pnl_usd'].sum()
-                }
-
-            # Prepare for Sheets
-            summary_data = {
-                'strategy_name': strat_name,
-                'tp_pct': tp/100.0,
-                'sl_pct': sl/100.0,
-                'max_pos': 1,
-                'avg_thresh': 0.0,
-                'bet_size': 7.0,
-                'total_trades': total_trades,
-                'win_rate': win_rate,
-                'total_pnl': total_pnl,
-                'avg_pnl': avg_pnl,
-                'best_trade': results['pnl_usd'].max(),
-                'worst_trade': results['pnl_usd'].min(),
-                'date_range': date_range,
-                'weekly_stats': weekly_stats,
-                'tf_breakdown': tf_breakdown,
-                'total_days': 90
-            }
-
-            print(f"   ✅ Trades: {total_trades}, PnL: ${total_pnl:.2f}, WR: {win_rate:.1f}%")
-            
-            log_analysis_to_sheet(summary_data)
-            save_progress(i)
-            
-            # API Limit protection
-            time.sleep(1)
-
+            # Failed tasks are retried with backoff inside run_batch; finished ones are journaled,
+            # pairs that keep failing are left out (frame.attrs['failed_pairs'], journal failures)
+            frames = engine.run_batch(VectorizedStrategy, block_params, parallel=True, workers=workers, journal=journal)
         except Exception as e:
-            print(f"❌ Error on combination {i}: {e}")
+            print(f"❌ Error on block starting at {done + 1}: {e} (finished pairs kept in {journal.path})")
             import traceback
             traceback.print_exc()
-            time.sleep(5)
+            continue
+
+        finished = record_block(db, journal, block, frames)
+        skipped = {p for f in frames for p in f.attrs.get('failed_pairs', [])}
+        if skipped:
+            print(f"   ⚠️  {len(skipped)} pairs left out after retries, {len(block) - finished} combinations "
+                  f"left pending (see: python sweep_journal.py status)")
+        done += len(block)
+        best = max(frames, key=lambda f: f['pnl_usd'].sum() if not f.empty else float('-inf'))
+        print(f"   ✅ Block done. Trades: {sum(len(f) for f in frames)}, best PnL: ${best['pnl_usd'].sum() if not best.empty else 0:.2f}")
+
+    print(f"\n📒 Results stored in {db.path}. Push to Google Sheets with: python results_db.py sync")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--test", action="store_true", help="Run only 3 combinations for testing")
+    parser.add_argument("--block", type=int, default=200, help="Combinations per concurrent block")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
     args = parser.parse_args()
     
     if args.test:
@@ -187,4 +195,4 @@ if __name__ == "__main__":
         original_gen = generate_combinations
         generate_combinations = lambda: original_gen()[:3]
         
-    run_mega_batch()
+    run_mega_batch(block_size=args.block, workers=args.workers)
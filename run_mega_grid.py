@@ -1,43 +1,66 @@
-import subprocess
 import time
 import sys
 import os
 
 # Add project root to path so we can import sheets.py
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-import sheets
+from backtest_framework import BacktestEngine
+from main import DATA_ROOT, BacktestConfig, run_backtest
+from results_db import ResultsDB, run_params, strategy_run_key, sync_to_sheets
+from conditions.vectorized_strategy import VectorizedStrategy
 
-def run_backtest(side, cond, ema, tp, sl, threshold):
+def run_variation(engine, db, side, cond, ema, tp, sl, threshold):
     """
-    Runs a single backtest variation using main.py
+    Runs a single backtest variation in-process (main.run_backtest)
     """
-    cmd = [
-        ".venv/bin/python", "main.py",
-        "--strategy", "vectorized",
-        "--side", side,
-        "--cond", cond,
-        "--ema", ema,
-        "--tp", str(tp),
-        "--sl", str(sl),
-        "--marubozu", "0.8",
-        "--workers", "8"  # Use 8 cores for speed
-    ]
-    
+    config = BacktestConfig(
+        strategy="vectorized", side=side, cond=cond, ema=ema, tp=tp, sl=sl, marubozu=0.8,
+        workers=8,  # Use 8 cores for speed
+        no_sheets=True,  # results go to the local results DB; synced once at the end
+        results_csv=None, verbose=False,
+    )
     # Use specific threshold arg based on condition
     if cond == "pump":
-        cmd.extend(["--pump", str(threshold)])
+        config.pump = threshold
     else:
-        cmd.extend(["--dump", str(threshold)])
+        config.dump = threshold
 
     print(f"\n🚀 Running: [{side}] {cond.upper()} {threshold}% | EMA:{ema} | TP:{tp}% | SL:{sl}%")
     
     try:
-        result = subprocess.run(cmd)
-        return result.returncode == 0
+        run_backtest(config, engine, db)
+        return True
     except Exception as e:
         print(f"❌ Execution error: {e}")
         return False
 
+def run_kwargs_for(side, cond, ema, tp, sl, threshold):
+    """Arguments main.run_backtest records for this grid point (see BacktestConfig.run_kwargs)."""
+    return dict(
+        side=side, cond=cond, ema=ema, tp=tp / 100.0, sl=sl / 100.0, tsl=0.0,
+        pump_threshold=threshold / 100.0, dump_threshold=threshold / 100.0, marubozu_threshold=0.8,
+        bet_size=7.0, max_positions=1, avg_threshold=0.0, tf_filter=None,
+    )
+
+def run_key_for(side, cond, ema, tp, sl, threshold):
+    """Canonical key of the run main.run_backtest records for these arguments."""
+    return strategy_run_key(VectorizedStrategy, **run_kwargs_for(side, cond, ema, tp, sl, threshold))
+
+def import_sheet_history(db, grid):
+    """
+    One-time import for a fresh results DB: grid points whose strategy name is
+    already in the Google Sheet (how this script used to dedup) are added to
+    the completed-runs index, so they are not run again.
+    """
+    import sheets
+    names = sheets.get_existing_strategies()
+    imported = 0
+    for point in grid:
+        if generate_strategy_name(*point) in names:
+            db.mark_completed(run_params(VectorizedStrategy, **run_kwargs_for(*point)))
+            imported += 1
+    return imported
+
 def generate_strategy_name(side, cond, ema, tp, sl, threshold):
     """
     Reconstructs the strategy name string to check against existing.
@@ -63,72 +86,64 @@ def main():
     
     total = len(sides) * len(conds) * len(emas) * len(tps) * len(sls)
     
-    print("🔍 Fetching existing completed runs from Google Sheets...")
-    existing_strategies = sheets.get_existing_strategies()
-    print(f"✅ Found {len(existing_strategies)} existing entries. Will skip duplicates.")
+    print("🔍 Fetching existing completed runs from the local results DB...")
+    db = ResultsDB()
+    existing_runs = db.completed_keys()
+    if not existing_runs:
+        # Empty index: carry over the runs already logged to Google Sheets
+        grid = [(side, cond, ema, tp, sl, threshold)
+                for side in sides for cond in conds for ema in emas for tp in tps for sl in sls]
+        print(f"📥 Imported {import_sheet_history(db, grid)} runs from Google Sheets into the results DB")
+        existing_runs = db.completed_keys()
+    print(f"✅ Found {len(existing_runs)} existing entries. Will skip duplicates.")
     
     count = 0
     skipped = 0
     
     print(f"🏁 Starting Smart Mega Grid Backtest: {total} combinations")
-    print(f"Parallelism: 8 cores per run | Execution: Sequential batches")
+    print(f"Parallelism: 8 cores per run (one shared pool) | Execution: in-process")
     
     start_time = time.time()
+    engine = BacktestEngine(data_dir=DATA_ROOT)
 
-    for side in sides:
-        for cond in conds:
-            for ema in emas:
-                for tp in tps:
-                    for sl in sls:
-                        count += 1
-                        
-                        # Check duplication
-                        # Construct expected name
-                        # We need to be careful about float formatting. 2.0 vs 2 ?
-                        # main.py args might be strings.
-                        # user sheets.py logic force floats 1 decimal.
-                        
-                        # Let's simple check:
-                        # Key params to check validity
-                        # Instead of exact string match (fragile), let's rely on loose check?
-                        # Or just reconstruct exact string.
-                        
-                        strat_name = generate_strategy_name(side, cond, ema, tp, sl, threshold)
-                        
-                        # Check if EXACT name exists
-                        if strat_name in existing_strategies:
-                             print(f"⏭️  Skipping [{count}/{total}] (Already exists): {strat_name}")
-                             skipped += 1
-                             continue
-
-                        # Also check slight variations due to spacing or float formatting
-                        # e.g. "2.0%" vs "2%"
-                        # This is tricky.
-                        # But since we just standardized the sheet, maybe it matches?
-                        # Let's try running.
-                        
-                        # PROGRESS TRACKING
-                        elapsed = time.time() - start_time
-                        # Adjusted average based on actual runs
-                        run_count = count - skipped
-                        avg_time = elapsed / run_count if run_count > 0 else 0
-                        remaining = avg_time * (total - count)
-                        
-                        print(f"\n--- [{count}/{total}] (Elapsed: {elapsed/60:.1f}m) ---")
-                        
-                        success = run_backtest(side, cond, ema, tp, sl, threshold)
-                        
-                        if success:
-                            # Add to local cache so we don't re-run if we restart script
-                            existing_strategies.add(strat_name)
-                            # Small delay to reduce Google Sheets API quota pressure
-                            time.sleep(1.5) 
-                        else:
-                            print(f"⚠️ Run failed. Continuing...")
-                            time.sleep(2)
+    with engine.shared_pool(8):
+        for side in sides:
+            for cond in conds:
+                for ema in emas:
+                    for tp in tps:
+                        for sl in sls:
+                            count += 1
+
+                            # Canonical parameter key: immune to display-name float formatting ("2.0%" vs "2%")
+                            key = run_key_for(side, cond, ema, tp, sl, threshold)
+                            strat_name = generate_strategy_name(side, cond, ema, tp, sl, threshold)
+                            if key in existing_runs:
+                                 print(f"⏭️  Skipping [{count}/{total}] (Already exists): {strat_name}")
+                                 skipped += 1
+                                 continue
+
+                            # PROGRESS TRACKING
+                            elapsed = time.time() - start_time
+                            # Adjusted average based on actual runs
+                            run_count = count - skipped
+                            avg_time = elapsed / run_count if run_count > 0 else 0
+                            remaining = avg_time * (total - count)
+
+                            print(f"\n--- [{count}/{total}] (Elapsed: {elapsed/60:.1f}m) ---")
+
+                            success = run_variation(engine, db, side, cond, ema, tp, sl, threshold)
+
+                            if success:
+                                # run_backtest recorded it under the same key; keep the in-memory set in step
+                                existing_runs.add(key)
+                            else:
+                                print(f"⚠️ Run failed. Continuing...")
 
     print(f"\n✅ Mega Grid Search Complete! Total time: {(time.time() - start_time)/60:.1f} minutes.")
     print(f"Skipped {skipped} existing runs.")
 
+    # One batched push for the whole grid (retry later with: python results_db.py sync)
+    sync_to_sheets(db)
+
 if __name__ == "__main__":
     main()
@@ -1,22 +1,19 @@
-import subprocess
-import time
+from backtest_framework import BacktestEngine
+from main import DATA_ROOT, BacktestConfig, run_backtest
+from results_db import ResultsDB, sync_to_sheets
 
-def run_backtest(tp, sl):
-    cmd = [
-        ".venv/bin/python", "main.py",
-        "--strategy", "vectorized",
-        "--side", "SHORT",
-        "--pump", "2.0",
-        "--tp", str(tp),
-        "--sl", str(sl),
-        "--marubozu", "0.8",
-        "--ema", "none"
-    ]
+def run_variation(engine, db, tp, sl):
+    config = BacktestConfig(
+        strategy="vectorized", side="SHORT", pump=2.0, tp=tp, sl=sl, marubozu=0.8, ema="none",
+        no_sheets=True, results_csv=None, verbose=False,
+    )
     print(f"\n🚀 Running: TP={tp}% | SL={sl}%")
-    result = subprocess.run(cmd)
-    if result.returncode != 0:
-        print(f"❌ Error in run: TP={tp}, SL={sl}")
-    return result.returncode == 0
+    try:
+        run_backtest(config, engine, db)
+        return True
+    except Exception as e:
+        print(f"❌ Error in run: TP={tp}, SL={sl}: {e}")
+        return False
 
 def main():
     # 6 TP values x 5 SL values = 30 combinations
@@ -28,17 +25,16 @@ def main():
     
     print(f"🏁 Starting Grid Backtest: {total} combinations")
     
-    for tp in tps:
-        for sl in sls:
-            count += 1
-            print(f"[{count}/{total}]", end=" ")
-            success = run_backtest(tp, sl)
-            if success:
-                # Small delay to ensure Google Sheets API doesn't hit weird locks 
-                # even though we are running sequentially
-                time.sleep(1) 
-            else:
-                print("⚠️ Skipping delay due to failure.")
+    engine = BacktestEngine(data_dir=DATA_ROOT)
+    db = ResultsDB()
+    # In-process runs share one process pool; Sheets gets one batched push at the end
+    with engine.shared_pool(8):
+        for tp in tps:
+            for sl in sls:
+                count += 1
+                print(f"[{count}/{total}]", end=" ")
+                run_variation(engine, db, tp, sl)
+    sync_to_sheets(db)
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,6 @@
-import subprocess
-import time
+from backtest_framework import BacktestEngine
+from main import DATA_ROOT, BacktestConfig, run_backtest
+from results_db import ResultsDB, sync_to_sheets
 
 def run_tsl_experiment():
     # Base parameters
@@ -18,31 +19,23 @@ def run_tsl_experiment():
     print(f"Params: {side} | Pump {pump}% | TP {tp}% | SL {sl}% | Maru {maru}")
     print("-" * 50)
     
-    for tsl in tsl_values:
-        print(f"\n▶️ Running variation: TSL {tsl}%")
-        
-        cmd = [
-            ".venv/bin/python", "main.py",
-            "--strategy", strategy,
-            "--side", side,
-            "--ema", ema,
-            "--pump", str(pump),
-            "--tp", str(tp),
-            "--sl", str(sl),
-            "--tsl", str(tsl),
-            "--marubozu", str(maru),
-            "--workers", "8"  # Use 8 cores for parallel pair processing
-        ]
-        
-        try:
-            # Running with shell=False for safety
-            subprocess.run(cmd, check=True)
-            print(f"✅ Variation TSL {tsl}% completed successfully.")
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Variation TSL {tsl}% failed: {e}")
-        
-        # Short cooldown to avoid API spikes
-        time.sleep(2)
+    engine = BacktestEngine(data_dir=DATA_ROOT)
+    db = ResultsDB()
+    with engine.shared_pool(8):  # Use 8 cores for parallel pair processing, one pool for all variations
+        for tsl in tsl_values:
+            print(f"\n▶️ Running variation: TSL {tsl}%")
+            
+            config = BacktestConfig(
+                strategy=strategy, side=side, ema=ema, pump=pump, tp=tp, sl=sl, tsl=float(tsl),
+                marubozu=maru, workers=8, no_sheets=True, results_csv=None, verbose=False,
+            )
+            try:
+                run_backtest(config, engine, db)
+                print(f"✅ Variation TSL {tsl}% completed successfully.")
+            except Exception as e:
+                print(f"❌ Variation TSL {tsl}% failed: {e}")
+
+    sync_to_sheets(db)
 
     print("\n" + "="*50)
     print("🎯 TOTAL EXPERIMENT COMPLETE 🎯")
@@ -79,8 +79,7 @@ YARDIMCI SCRIPTLER:
 
 import sys
 import os
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import time
 import pandas as pd
 from datetime import datetime
 import re
@@ -126,12 +125,149 @@ WEEKLY_START_COL = 29
 # MAIN LOGGING FUNCTION
 # =============================================================================
 
+def _open_worksheet():
+    """Authenticates and opens the target worksheet (MANUAL_SHEET_ID overrides the master sheet)."""
+    # Imported here so the row/writer logic stays importable without the Google client libraries
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    creds_path = DEFAULT_CREDS_PATH
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+    creds = ServiceAccountCredentials.from_json_keyfile_name(str(creds_path), scope)
+    client = gspread.authorize(creds)
+
+    manual_sheet_id = os.environ.get('MANUAL_SHEET_ID')
+    sheet_id = manual_sheet_id if manual_sheet_id else MASTER_SHEET_ID
+
+    sheet = client.open_by_key(sheet_id)
+    return sheet.worksheet(TARGET_WORKSHEET)
+
+def build_row(data):
+    """
+    Sheet row values (column A first) for one backtest summary; see
+    log_analysis_to_sheet for the keys. data['timestamp'] (optional) fills
+    column A, else the current time.
+    """
+    # ===== 1. PREPARE ROW DATA =====
+    row_data = {i: "" for i in range(1, 150)}  # Pre-initialize all columns
+    
+    # A: Timestamp
+    row_data[1] = data.get('timestamp') or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    # B: Strategy Name
+    row_data[2] = data.get('strategy_name', 'Unknown')
+    
+    # ===== 2. PARSE STRATEGY STRING =====
+    strategy_str = data.get('strategy_name', '')
+    
+    # EMA emoji mapping
+    ema_emoji_map = {
+        "big_bull": "🟢🟢", "big_bear": "🔴🔴", 
+        "all_bull": "🟢🟢🟢", "all_bear": "🔴🔴🔴",
+        "small_bull": "🟢", "small_bear": "🔴", 
+        "none": "⚪",
+        "big_bull_small_bear": "🟢🟢🔴", 
+        "big_bear_small_bull": "🔴🔴🟢"
+    }
+    
+    # C: Side
+    if "[SHORT]" in strategy_str: 
+        row_data[3] = "SHORT"
+    elif "[LONG]" in strategy_str: 
+        row_data[3] = "LONG"
+    
+    # D: Condition
+    if "PUMP" in strategy_str.upper(): 
+        row_data[4] = "pump"
+    elif "DUMP" in strategy_str.upper(): 
+        row_data[4] = "dump"
+    
+    # F: EMA (with emoji)
+    ema_match = re.search(r'EMA:(\S+)', strategy_str)
+    ema_raw = (ema_match.group(1).lower() if ema_match else "none")
+    # Normalize EMA variations
+    ema_raw = ema_raw.replace("big_bull_small_bull", "all_bull")\
+                     .replace("big_bear_small_bear", "all_bear")\
+                     .replace("small_bull_big_bull", "all_bull")\
+                     .replace("small_bear_big_bear", "all_bear")\
+                     .replace("small_bull_big_bear", "big_bear_small_bull")\
+                     .replace("small_bear_big_bull", "big_bull_small_bear")
+    emoji = ema_emoji_map.get(ema_raw, "")
+    row_data[6] = f"{emoji} {ema_raw}" if emoji else ema_raw
+
+    # E: Threshold (Pump or Dump value)
+    pump_match = re.search(r'Pump:(\d+\.?\d*)%', strategy_str)
+    dump_match = re.search(r'Dump:(\d+\.?\d*)%', strategy_str)
+    if pump_match: 
+        row_data[5] = f"{float(pump_match.group(1)):.1f}"
+    elif dump_match: 
+        row_data[5] = f"{-float(dump_match.group(1)):.1f}"
+
+    # G: TP%
+    tp_match = re.search(r'TP:(\d+\.?\d*)%?', strategy_str)
+    row_data[7] = tp_match.group(1) if tp_match else ""
+    
+    # H: SL%
+    sl_match = re.search(r'SL:(\d+\.?\d*)%?', strategy_str)
+    row_data[8] = sl_match.group(1) if sl_match else ""
+    
+    # I: TSL%
+    tsl_match = re.search(r'TSL:(\d+\.?\d*|OFF)', strategy_str)
+    row_data[9] = tsl_match.group(1) if tsl_match else "OFF"
+    
+    # J: Marubozu threshold
+    maru_match = re.search(r'M:(\d+\.?\d*)', strategy_str)
+    row_data[10] = maru_match.group(1) if maru_match else ""
+    
+    # K: Days
+    row_data[11] = str(data.get('total_days', 90))
+
+    # ===== 3. METRICS (L-P) =====
+    pnl = float(data.get('total_pnl', 0))
+    trades_count = int(data.get('total_trades', 0))
+    bet_size = float(data.get('bet_size', 7.0)) # Default to 7.0 as used in run_mega_batch.py
+    
+    # Commission calculation: Trades * BetSize * COMMISSION_RATE * 2 (Entry + Exit)
+    commission = trades_count * bet_size * COMMISSION_RATE * 2 
+    net_pnl = pnl - commission
+
+    row_data[12] = float(data.get('win_rate', 0)) # Win Rate (Raw value from summary_data)
+    if row_data[12] > 1.0: row_data[12] /= 100.0 # Standardize to 0-1 range
+    row_data[13] = trades_count                            # M: Trades
+    row_data[14] = round(pnl, 2)                           # N: PnL (Gross)
+    row_data[15] = round(commission, 2)                    # O: Commission ($)
+    row_data[16] = round(net_pnl, 2)                       # P: Net PnL ($)
+
+    # ===== 4. TIMEFRAME BREAKDOWN (Q-AB) =====
+    tf_breakdown = data.get('tf_breakdown', {})
+    for tf, col in TF_COLS.items():
+        stats = tf_breakdown.get(tf, {})
+        row_data[col] = int(stats.get('trades', 0))
+        row_data[col + 1] = float(stats.get('pnl', 0.0))
+
+    # ===== 5. WEEKLY STATS =====
+    weekly_stats = data.get('weekly_stats', [])
+    for i, week in enumerate(weekly_stats):
+        trades_col = WEEKLY_START_COL + (i * 2)
+        pnl_col = trades_col + 1
+        row_data[trades_col] = int(week.get('trades', 0))
+        row_data[pnl_col] = float(week.get('pnl', 0.0))
+    
+    # ===== 6. ROW VALUES =====
+    max_idx = max(row_data.keys())
+    final_values = [""] * max_idx
+    for k, v in row_data.items():
+        final_values[k - 1] = v
+        
+    return final_values
+
 def log_analysis_to_sheet(data, json_path=None):
     """
     Backtest sonuçlarını Google Sheets'e loglar.
     
     Args:
-        data (dict): Backtest özet verileri. Aşağıdaki anahtarları içermelidir:
+        data (dict): Backtest özet verileri (src.analytics.summarize_trades çıktısı + strateji alanları).
+            Aşağıdaki anahtarları içermelidir:
             - strategy_name (str): Strateji adı (regex ile parse edilir)
             - win_rate (float): Kazanma oranı (0-100 arası)
             - total_trades (int): Toplam işlem sayısı
@@ -166,159 +302,108 @@ def log_analysis_to_sheet(data, json_path=None):
         ✅ Logged row to Row 3.
     """
     try:
-        # ===== 1. AUTHENTICATION =====
-        creds_path = DEFAULT_CREDS_PATH
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_name(str(creds_path), scope)
-        client = gspread.authorize(creds)
-        
-        # ===== 2. OPEN SHEET =====
-        manual_sheet_id = os.environ.get('MANUAL_SHEET_ID')
-        sheet_id = manual_sheet_id if manual_sheet_id else MASTER_SHEET_ID
-        
-        sheet = client.open_by_key(sheet_id)
-        ws = sheet.worksheet(TARGET_WORKSHEET)
-        
-        # ===== 3. PREPARE ROW DATA =====
-        row_data = {i: "" for i in range(1, 150)}  # Pre-initialize all columns
-        
-        # A: Timestamp
-        row_data[1] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # B: Strategy Name
-        row_data[2] = data.get('strategy_name', 'Unknown')
-        
-        # ===== 4. PARSE STRATEGY STRING =====
-        strategy_str = data.get('strategy_name', '')
-        
-        # EMA emoji mapping
-        ema_emoji_map = {
-            "big_bull": "🟢🟢", "big_bear": "🔴🔴", 
-            "all_bull": "🟢🟢🟢", "all_bear": "🔴🔴🔴",
-            "small_bull": "🟢", "small_bear": "🔴", 
-            "none": "⚪",
-            "big_bull_small_bear": "🟢🟢🔴", 
-            "big_bear_small_bull": "🔴🔴🟢"
-        }
-        
-        # C: Side
-        if "[SHORT]" in strategy_str: 
-            row_data[3] = "SHORT"
-        elif "[LONG]" in strategy_str: 
-            row_data[3] = "LONG"
-        
-        # D: Condition
-        if "PUMP" in strategy_str.upper(): 
-            row_data[4] = "pump"
-        elif "DUMP" in strategy_str.upper(): 
-            row_data[4] = "dump"
-        
-        # F: EMA (with emoji)
-        ema_match = re.search(r'EMA:(\S+)', strategy_str)
-        ema_raw = (ema_match.group(1).lower() if ema_match else "none")
-        # Normalize EMA variations
-        ema_raw = ema_raw.replace("big_bull_small_bull", "all_bull")\
-                         .replace("big_bear_small_bear", "all_bear")\
-                         .replace("small_bull_big_bull", "all_bull")\
-                         .replace("small_bear_big_bear", "all_bear")\
-                         .replace("small_bull_big_bear", "big_bear_small_bull")\
-                         .replace("small_bear_big_bull", "big_bull_small_bear")
-        emoji = ema_emoji_map.get(ema_raw, "")
-        row_data[6] = f"{emoji} {ema_raw}" if emoji else ema_raw
-
-        # E: Threshold (Pump or Dump value)
-        pump_match = re.search(r'Pump:(\d+\.?\d*)%', strategy_str)
-        dump_match = re.search(r'Dump:(\d+\.?\d*)%', strategy_str)
-        if pump_match: 
-            row_data[5] = f"{float(pump_match.group(1)):.1f}"
-        elif dump_match: 
-            row_data[5] = f"{-float(dump_match.group(1)):.1f}"
-
-        # G: TP%
-        tp_match = re.search(r'TP:(\d+\.?\d*)%?', strategy_str)
-        row_data[7] = tp_match.group(1) if tp_match else ""
-        
-        # H: SL%
-        sl_match = re.search(r'SL:(\d+\.?\d*)%?', strategy_str)
-        row_data[8] = sl_match.group(1) if sl_match else ""
-        
-        # I: TSL%
-        tsl_match = re.search(r'TSL:(\d+\.?\d*|OFF)', strategy_str)
-        row_data[9] = tsl_match.group(1) if tsl_match else "OFF"
-        
-        # J: Marubozu threshold
-        maru_match = re.search(r'M:(\d+\.?\d*)', strategy_str)
-        row_data[10] = maru_match.group(1) if maru_match else ""
-        
-        # K: Days
-        row_data[11] = str(data.get('total_days', 90))
-
-        # ===== 5. METRICS (L-P) =====
-        pnl = float(data.get('total_pnl', 0))
-        trades_count = int(data.get('total_trades', 0))
-        bet_size = float(data.get('bet_size', 7.0)) # Default to 7.0 as used in run_mega_batch.py
-        
-        # Commission calculation: Trades * BetSize * COMMISSION_RATE * 2 (Entry + Exit)
-        commission = trades_count * bet_size * COMMISSION_RATE * 2 
-        net_pnl = pnl - commission
-
-        row_data[12] = float(data.get('win_rate', 0)) # Win Rate (Raw value from summary_data)
-        if row_data[12] > 1.0: row_data[12] /= 100.0 # Standardize to 0-1 range
-        row_data[13] = trades_count                            # M: Trades
-        row_data[14] = round(pnl, 2)                           # N: PnL (Gross)
-        row_data[15] = round(commission, 2)                    # O: Commission ($)
-        row_data[16] = round(net_pnl, 2)                       # P: Net PnL ($)
-
-        # ===== 6. TIMEFRAME BREAKDOWN (Q-AB) =====
-        tf_breakdown = data.get('tf_breakdown', {})
-        for tf, col in TF_COLS.items():
-            stats = tf_breakdown.get(tf, {})
-            row_data[col] = int(stats.get('trades', 0))
-            row_data[col + 1] = float(stats.get('pnl', 0.0))
-
-        # ===== 7. WEEKLY STATS =====
-        weekly_stats = data.get('weekly_stats', [])
-        for i, week in enumerate(weekly_stats):
-            trades_col = WEEKLY_START_COL + (i * 2)
-            pnl_col = trades_col + 1
-            row_data[trades_col] = int(week.get('trades', 0))
-            row_data[pnl_col] = float(week.get('pnl', 0.0))
-        
-        # ===== 8. INSERT ROW =====
-        max_idx = max(row_data.keys())
-        final_values = [""] * max_idx
-        for k, v in row_data.items():
-            final_values[k - 1] = v
-            
-        ws.insert_row(final_values, index=3, value_input_option='USER_ENTERED')
-        
-        # Apply formatting after insert
-        headers_r2 = ws.row_values(2)
-        apply_sheet_formatting(ws, headers_r2)
-        
-        print(f"✅ Logged row to Row 3 and applied formatting.")
+        # Shared writer: one authentication per process, formatting applied once
+        default_writer().push([data])
 
     except Exception as e:
         import traceback
         traceback.print_exc()
         print(f"❌ Failed to log: {e}")
 
+class SheetsWriter:
+    """
+    Buffered writer holding one authenticated worksheet.
+
+    Rows are queued by add() and written newest-on-top with a single insert_rows
+    once flush_rows are pending or the oldest pending row is flush_seconds old
+    (checked on add; flush()/close() write the rest). Conditional formatting is
+    applied once per writer, after its first successful insert, instead of per
+    row: its rules are added, not replaced, on every call.
+
+    API calls per flush: 1 (insert_rows), plus 2 the first time (row 2 headers +
+    formatting batch_update), plus 2 for authentication when the worksheet is first needed.
+    `worksheet` may be any object with insert_rows/row_values/id/spreadsheet (tests).
+    """
+    def __init__(self, flush_rows=100, flush_seconds=30.0, worksheet=None):
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._ws = worksheet
+        self._pending = []
+        self._first_pending_at = None
+        self._formatted = False
+        self.rows_written = 0
+
+    @property
+    def worksheet(self):
+        if self._ws is None:
+            self._ws = _open_worksheet()
+        return self._ws
+
+    def add(self, data):
+        """Queues one summary (see log_analysis_to_sheet); may flush."""
+        now = time.monotonic()
+        if not self._pending:
+            self._first_pending_at = now
+        self._pending.append(build_row(data))
+        if len(self._pending) >= self.flush_rows or now - self._first_pending_at >= self.flush_seconds:
+            self.flush()
+
+    def push(self, summaries):
+        """Writes summaries now (with anything queued); on API errors they are dropped again and the error raised."""
+        rows = [build_row(data) for data in summaries]
+        self._pending.extend(rows)
+        try:
+            self.flush()
+        except Exception:
+            del self._pending[len(self._pending) - len(rows):]
+            raise
+
+    def flush(self):
+        if not self._pending:
+            return
+        ws = self.worksheet
+        rows = self._pending[::-1]  # newest ends on Row 3
+        ws.insert_rows(rows, row=3, value_input_option='USER_ENTERED')
+        self._pending = []
+        self.rows_written += len(rows)
+        if not self._formatted:
+            apply_sheet_formatting(ws, ws.row_values(2))
+            self._formatted = True
+        print(f"✅ Logged {len(rows)} rows to Row 3.")
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_default_writer = None
+
+def default_writer():
+    """Process-wide writer used by log_analysis_to_sheet / log_analyses_to_sheet (one authentication per process)."""
+    global _default_writer
+    if _default_writer is None:
+        _default_writer = SheetsWriter()
+    return _default_writer
+
+def log_analyses_to_sheet(summaries):
+    """
+    Bulk version of log_analysis_to_sheet: all summaries in one insert_rows
+    (oldest first in, newest ends on Row 3). Raises on API errors so a sync job
+    can retry the batch.
+    """
+    default_writer().push(summaries)
+
 def get_existing_strategies():
     """
     Fetches the list of already processed strategy names from Row 3 onwards.
     Used by grid search scripts to avoid redundant runs.
     """
     try:
-        creds_path = DEFAULT_CREDS_PATH
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_name(str(creds_path), scope)
-        client = gspread.authorize(creds)
-        
-        manual_sheet_id = os.environ.get('MANUAL_SHEET_ID')
-        sheet_id = manual_sheet_id if manual_sheet_id else MASTER_SHEET_ID
-        
-        sheet = client.open_by_key(sheet_id)
-        ws = sheet.worksheet(TARGET_WORKSHEET)
+        ws = _open_worksheet()
         
         # Get all values from Column B (Strategy Name) starting Row 3
         # col_values(2) returns all values in Column B. 
@@ -505,26 +590,11 @@ if __name__ == "__main__":
         # For now, let's use a placeholder or try to infer.
         strat_name = os.path.basename(csv_path).replace('.csv', '').replace('backtest_results_', '').upper()
         
-        # Calculate summary
-        total_trades = len(df)
-        wins = len(df[df['pnl_usd'] > 0])
-        win_rate = (wins / total_trades) * 100 if total_trades > 0 else 0
-        total_pnl = df['pnl_usd'].sum()
-        
-        # TF Breakdown
-        df['tf'] = df['symbol'].apply(lambda x: x.split('_')[-1] if '_' in x else 'Unknown')
-        tf_groups = df.groupby('tf')
-        tf_summary = {}
-        for tf, group in tf_groups:
-            tf_summary[tf] = {'trades': len(group), 'pnl': group['pnl_usd'].sum()}
-            
+        # Calculate summary (overall, TF, IST-weekly breakdowns: src/analytics.py)
+        from src import analytics
         summary = {
             'strategy_name': f"[CLI] {strat_name}",
-            'total_trades': total_trades,
-            'win_rate': win_rate,
-            'total_pnl': total_pnl,
-            'tf_breakdown': tf_summary,
-            'total_days': 90
+            **analytics.summarize_trades(df),
         }
         
         log_analysis_to_sheet(summary)
@@ -0,0 +1,127 @@
+"""
+Standard breakdowns of a backtest's trades in one aggregation.
+
+The trades (BacktestEngine output, pandas or Polars) are grouped once by
+(symbol, IST week) - weeks start Sunday 03:00 Europe/Istanbul, as in
+utils_date.week_start_expr and the weekly data files. The small grouped frame
+is then rolled up into the overall, per-timeframe, per-week and per-symbol
+numbers, so no breakdown scans the trades again.
+
+summarize_trades() returns the keys that sheets.build_row reads:
+
+    total_trades, wins, win_rate (0-100), total_pnl, avg_pnl, best_trade,
+    worst_trade, date_range, total_days,
+    tf_breakdown   {tf: {'trades', 'pnl', 'win_rate'}}
+    weekly_stats   [{'label', 'week_start', 'week_num', 'trades', 'pnl'}] oldest first
+    top_symbols / bottom_symbols   [(symbol, pnl)] best / worst top_n
+
+Drivers add their own keys (strategy_name, tp_pct, ...) on top:
+
+    summary = {'strategy_name': name, **analytics.summarize_trades(results)}
+"""
+
+from datetime import timedelta
+from typing import Dict, Union
+
+import pandas as pd
+import polars as pl
+
+from src.utils_date import week_start_expr
+
+TRADE_COLUMNS = ["symbol", "entry_time", "pnl_usd"]
+
+
+def _trades_frame(trades: Union[pd.DataFrame, pl.DataFrame]) -> pl.DataFrame:
+    df = trades if isinstance(trades, pl.DataFrame) else pl.from_pandas(trades[TRADE_COLUMNS])
+    entry = pl.col("entry_time")
+    if df.schema["entry_time"] == pl.Utf8:
+        entry = entry.str.to_datetime()
+        dtype = df.select(entry).to_series().dtype
+    else:
+        dtype = df.schema["entry_time"]
+    # Engine times are UTC; naive values are taken as UTC
+    entry = entry.dt.replace_time_zone("UTC") if dtype.time_zone is None else entry.dt.convert_time_zone("UTC")
+    return df.select(
+        pl.col("symbol"),
+        entry.alias("entry_time"),
+        pl.col("pnl_usd").cast(pl.Float64),
+    )
+
+
+def _empty_summary() -> Dict:
+    return {
+        'total_trades': 0, 'wins': 0, 'win_rate': 0.0, 'total_pnl': 0.0, 'avg_pnl': 0.0,
+        'best_trade': 0.0, 'worst_trade': 0.0, 'date_range': "N/A", 'total_days': 0,
+        'tf_breakdown': {}, 'weekly_stats': [], 'top_symbols': [], 'bottom_symbols': [],
+    }
+
+
+def summarize_trades(trades: Union[pd.DataFrame, pl.DataFrame], top_n: int = 5) -> Dict:
+    """Overall, per-timeframe, per-IST-week and per-symbol stats of a trades frame."""
+    if trades is None or len(trades) == 0:
+        return _empty_summary()
+
+    df = _trades_frame(trades)
+    # The single pass over the trades: (symbol, week) cells
+    cells = (
+        df.group_by("symbol", week_start_expr("entry_time").alias("week"))
+        .agg(
+            pl.len().alias("trades"),
+            (pl.col("pnl_usd") > 0).sum().alias("wins"),
+            pl.col("pnl_usd").sum().alias("pnl"),
+            pl.col("pnl_usd").max().alias("best"),
+            pl.col("pnl_usd").min().alias("worst"),
+            pl.col("entry_time").min().alias("first"),
+            pl.col("entry_time").max().alias("last"),
+        )
+        .with_columns(
+            pl.when(pl.col("symbol").str.contains("_"))
+            .then(pl.col("symbol").str.split("_").list.last())
+            .otherwise(pl.lit("Unknown"))
+            .alias("tf")
+        )
+    )
+
+    totals = cells.select(
+        pl.col("trades").sum(), pl.col("wins").sum(), pl.col("pnl").sum(),
+        pl.col("best").max(), pl.col("worst").min(), pl.col("first").min(), pl.col("last").max(),
+    ).row(0, named=True)
+    total_trades = int(totals["trades"])
+
+    tf_breakdown = {
+        tf: {'trades': int(n), 'pnl': float(pnl), 'win_rate': wins / n * 100}
+        for tf, n, wins, pnl in cells.group_by("tf").agg(
+            pl.col("trades").sum(), pl.col("wins").sum(), pl.col("pnl").sum()
+        ).sort("tf").iter_rows()
+    }
+
+    weekly_stats = []
+    for week, n, pnl in cells.group_by("week").agg(pl.col("trades").sum(), pl.col("pnl").sum()).sort("week").iter_rows():
+        end = week + timedelta(days=7)
+        weekly_stats.append({
+            'label': f"{week:%d.%m}-{end:%d.%m}",
+            'week_start': week.isoformat(),
+            'week_num': week.isocalendar()[1],
+            'trades': int(n),
+            'pnl': float(pnl),
+        })
+
+    by_symbol = cells.group_by("symbol").agg(pl.col("pnl").sum()).sort(["pnl", "symbol"], descending=[True, False])
+    ranked = [(s, float(p)) for s, p in by_symbol.iter_rows()]
+
+    first, last = totals["first"], totals["last"]
+    return {
+        'total_trades': total_trades,
+        'wins': int(totals["wins"]),
+        'win_rate': totals["wins"] / total_trades * 100,
+        'total_pnl': float(totals["pnl"]),
+        'avg_pnl': float(totals["pnl"]) / total_trades,
+        'best_trade': float(totals["best"]),
+        'worst_trade': float(totals["worst"]),
+        'date_range': f"{first:%Y-%m-%d} to {last:%Y-%m-%d}",
+        'total_days': (last.date() - first.date()).days + 1,
+        'tf_breakdown': tf_breakdown,
+        'weekly_stats': weekly_stats,
+        'top_symbols': ranked[:top_n],
+        'bottom_symbols': ranked[::-1][:top_n],
+    }
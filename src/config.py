@@ -23,6 +23,21 @@ BINANCE_FAPI_BASE_URL = "https://fapi.binance.com"
 TIMEFRAMES = ["5s", "10s", "15s", "30s", "45s", "1m"]
 TARGET_DAYS = 90  # Number of days to look back
 
+# On-disk bar schema: "default" (Float64 OHLCV) or "compact" (see src/storage.py)
+# Readers widen compact files transparently, so both can coexist in raw/.
+STORAGE_PROFILE = "default"
+
+# Write per-bar feature sidecars (change_pct, marubozu, EMA-regime bits) at ingest (see src/features.py)
+MATERIALIZE_FEATURES = False
+
+# Symbol registry (meta/symbols.json) is refreshed from exchangeInfo after this many hours
+SYMBOL_REGISTRY_TTL_HOURS = 24
+
+# 404 negative cache (meta/missing_days.json, see src/miss_cache.py)
+MISS_CACHE_RECENT_DAYS = 2        # misses this close to the day may be "not published yet"
+MISS_CACHE_RECENT_TTL_HOURS = 6   # ...so they are retried soon
+MISS_CACHE_TTL_DAYS = 30          # older misses are stable; retried rarely
+
 # Ensure directories exist
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -10,7 +10,8 @@ import pytz
 import polars as pl
 from tqdm import tqdm
 
-from src import config, downloader, processor, utils_date
+from src import config, downloader, features, processor, storage, symbols, utils_date
+from src.miss_cache import MissCache
 from src.utils import setup_logging
 
 logger = logging.getLogger("data_manager")
@@ -59,10 +60,18 @@ def get_target_weeks() -> List[tuple]:
     weeks = list(utils_date.generate_weekly_ranges(start_scan, current_completed))
     return weeks
 
-def process_symbol_week(symbol: str, start_dt: datetime, end_dt: datetime) -> bool:
+def process_symbol_week(
+    symbol: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    registry: Optional[Dict] = None,
+    misses: Optional[MissCache] = None,
+) -> bool:
     """
     Downloads and processes ONE week for ONE symbol.
     Target file: raw/<SYMBOL>/<START>_to_<END>.parquet
+    Days outside the symbol's listing window (per registry) or cached as 404
+    (per misses) are not requested.
     """
     # 1. Prepare Directory
     symbol_dir = config.RAW_DATA_DIR / symbol
@@ -99,15 +108,16 @@ def process_symbol_week(symbol: str, start_dt: datetime, end_dt: datetime) -> bo
     for i in range(7):
         target_day = start_utc + timedelta(days=i)
         date_str = target_day.strftime("%Y-%m-%d") # UTC date string
+
+        if registry is not None and not symbols.has_data_on(symbol, target_day, registry):
+            continue # Before listing / after delisting: guaranteed 404
         
         # Download
         zip_name = f"{symbol}-aggTrades-{date_str}.zip"
         zip_path = config.DATA_DIR / "temp" / zip_name # Use a temp dir!
         zip_path.parent.mkdir(parents=True, exist_ok=True)
         
-        url = downloader.construct_binance_vision_url(symbol, date_str)
-        
-        if downloader.download_file(url, zip_path):
+        if downloader.download_day(symbol, date_str, zip_path, misses):
             csv_path = downloader.extract_zip(zip_path, zip_path.parent)
             if csv_path:
                 try:
@@ -143,7 +153,8 @@ def process_symbol_week(symbol: str, start_dt: datetime, end_dt: datetime) -> bo
     # 5. Concat and Save
     try:
         full_df = pl.concat(daily_dfs)
-        full_df = full_df.sort("ts_1s")
+        # Writers guarantee sorted + unique ts_1s so readers can skip sort/unique.
+        full_df = storage.ensure_sorted_unique(full_df)
         
         # User Optimization: Pre-calculate timeframes (5s, 10s... 1m)
         # Structure: raw/SYMBOL/TF/WEEK.parquet
@@ -152,6 +163,8 @@ def process_symbol_week(symbol: str, start_dt: datetime, end_dt: datetime) -> bo
         # We can optionally save 1s data too if needed, but config.TIMEFRAMES usually excludes 1s now?
         # If user wants 1s, add it to config.TIMEFRAMES.
         
+        # Compact profile scale: the symbol's tick size from the registry
+        price_decimals = symbols.price_decimals(symbol, registry) if config.STORAGE_PROFILE == "compact" else None
         for tf in config.TIMEFRAMES:
             # Create TF directory
             tf_dir = symbol_dir / tf
@@ -171,9 +184,18 @@ def process_symbol_week(symbol: str, start_dt: datetime, end_dt: datetime) -> bo
             
             try:
                 resampled_df = processor.resample_from_1s(full_df, tf)
-                resampled_df.write_parquet(tf_target_path)
+                storage.write_bars(resampled_df, tf_target_path, profile=config.STORAGE_PROFILE,
+                                   price_decimals=price_decimals)
             except Exception as e:
                 logger.error(f"Error resampling {symbol} {tf}: {e}")
+                continue
+
+            if config.MATERIALIZE_FEATURES:
+                try:
+                    features.materialize_week(tf_target_path)
+                except Exception as e:
+                    # Bars are written; backtests fall back to computing features from OHLC
+                    logger.error(f"Error materializing features {symbol} {tf}: {e}")
                 
         return True
         
@@ -181,7 +203,7 @@ def process_symbol_week(symbol: str, start_dt: datetime, end_dt: datetime) -> bo
         logger.error(f"Error saving {symbol} week: {e}")
         return False
 
-def run_manager():
+def run_manager(offline: bool = False):
     # 1. Init
     logger.info("Starting Data Manager")
     manifest = load_manifest()
@@ -192,19 +214,23 @@ def run_manager():
         logger.info("No new completed weeks to download.")
         return
 
-    symbols = downloader.get_params_usdt_futures_symbols()
+    # Registry keeps delisted symbols too, so backfilled weeks get the symbols
+    # that actually traded then (not just today's TRADING list).
+    registry = symbols.get_registry(offline=offline)
+    misses = MissCache()
     
     # 3. Process
     import pytz
     for start, end in weeks:
         logger.info(f"Processing Week: {start} to {end}")
+        week_symbols = symbols.active_symbols(start, end - timedelta(seconds=1), registry=registry)
         
         # Parallel Execution
         # Adjusted to 4 workers to prevent memory issues with large 1s dataframes
         with ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_symbol = {executor.submit(process_symbol_week, sym, start, end): sym for sym in symbols}
+            future_to_symbol = {executor.submit(process_symbol_week, sym, start, end, registry, misses): sym for sym in week_symbols}
             
-            for future in tqdm(as_completed(future_to_symbol), total=len(symbols), desc=f"Week {start.strftime('%Y-%m-%d')}"):
+            for future in tqdm(as_completed(future_to_symbol), total=len(week_symbols), desc=f"Week {start.strftime('%Y-%m-%d')}"):
                 sym = future_to_symbol[future]
                 try:
                     success = future.result()
@@ -216,10 +242,16 @@ def run_manager():
         # But some symbols always fail/don't exist.
         # We assume if the loop finished, the week is 'done'.)
         
+        misses.save()
         manifest['last_completed_week_end'] = end.isoformat()
         save_manifest(manifest)
         logger.info(f"Week completed and manifest updated: {end}")
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--offline", action="store_true", help="Use the cached symbol registry only")
+    args = parser.parse_args()
+
     setup_logging("data_manager")
-    run_manager()
+    run_manager(offline=args.offline)
@@ -6,38 +6,39 @@ from tqdm import tqdm
 from typing import List, Optional
 import time
 
-from src import config
+from src import config, symbols
+from src.miss_cache import MissCache
 from src.utils import setup_logging
 
 logger = setup_logging("downloader")
 
-def get_params_usdt_futures_symbols() -> List[str]:
-    """Fetches all active USDT-Margined Futures symbols."""
-    url = f"{config.BINANCE_FAPI_BASE_URL}/fapi/v1/exchangeInfo"
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        symbols = []
-        for s in data['symbols']:
-            if s['contractType'] == 'PERPETUAL' and s['quoteAsset'] == 'USDT' and s['status'] == 'TRADING':
-                symbols.append(s['symbol'])
-        
-        logger.info(f"Found {len(symbols)} active USDT-M Perpetual symbols.")
-        return symbols
-    except Exception as e:
-        logger.error(f"Failed to fetch symbols: {e}")
-        raise
+def get_params_usdt_futures_symbols(include_delisted: bool = False, offline: bool = False) -> List[str]:
+    """
+    USDT-Margined Perpetual symbols from the cached registry (src/symbols.py).
+    Refreshes from exchangeInfo when the cache is older than SYMBOL_REGISTRY_TTL_HOURS;
+    offline=True never touches the network.
+    """
+    registry = symbols.get_registry(offline=offline)
+    if include_delisted:
+        result = sorted(registry["symbols"])
+    else:
+        result = symbols.active_symbols(registry=registry)
 
-def download_file(url: str, local_path: Path) -> bool:
-    """Downloads a file from URL to local_path with progress bar."""
+    logger.info(f"Found {len(result)} {'' if include_delisted else 'active '}USDT-M Perpetual symbols.")
+    return result
+
+DOWNLOAD_OK = "ok"
+DOWNLOAD_MISSING = "missing"
+DOWNLOAD_ERROR = "error"
+
+def _download(url: str, local_path: Path) -> str:
+    """Downloads a file from URL to local_path with progress bar; returns a DOWNLOAD_* status."""
     try:
         with requests.get(url, stream=True, timeout=30) as r:
             if r.status_code == 404:
                 # Some days might be missing for new pairs, warn but don't fail hard
                 logger.warning(f"File not found (404): {url}")
-                return False
+                return DOWNLOAD_MISSING
             r.raise_for_status()
             
             total_size = int(r.headers.get('content-length', 0))
@@ -53,13 +54,34 @@ def download_file(url: str, local_path: Path) -> bool:
                 for data in r.iter_content(block_size):
                     size = f.write(data)
                     bar.update(size)
-        return True
+        return DOWNLOAD_OK
     except Exception as e:
         logger.error(f"Error downloading {url}: {e}")
         if local_path.exists():
             local_path.unlink()
+        return DOWNLOAD_ERROR
+
+def download_file(url: str, local_path: Path) -> bool:
+    """Downloads a file from URL to local_path with progress bar."""
+    return _download(url, local_path) == DOWNLOAD_OK
+
+def download_day(symbol: str, date_str: str, local_path: Path, misses: Optional[MissCache] = None) -> bool:
+    """
+    Downloads one daily aggTrades zip, consulting the 404 negative cache first.
+    404s are recorded in `misses`; transient errors are not.
+    """
+    if misses is not None and misses.is_missing(symbol, date_str):
+        logger.debug(f"Skipping {symbol} {date_str} - cached 404")
         return False
 
+    status = _download(construct_binance_vision_url(symbol, date_str), local_path)
+    if misses is not None:
+        if status == DOWNLOAD_MISSING:
+            misses.record(symbol, date_str)
+        elif status == DOWNLOAD_OK:
+            misses.forget(symbol, date_str)
+    return status == DOWNLOAD_OK
+
 def extract_zip(zip_path: Path, extract_to: Path) -> Optional[Path]:
     """Extracts zip file and returns path to the extracted CSV."""
     try:
@@ -0,0 +1,296 @@
+"""
+Signal-event index for cross-sectional queries.
+
+Every candidate bar of the universe (|change| and marubozu ratio above loose
+floors) is stored once with its features and EMA regime, sorted by time and
+partitioned by IST week (Sunday 03:00):
+
+    DATA_DIR/events/<YYYY-MM-DD>.parquet     one file per week start
+    DATA_DIR/events/_index.json              floors + build info
+
+Columns: timestamp (UTC), symbol, tf, open, close, change_pct (signed),
+marubozu_ratio, ema_bull, ema_bear. The EMA columns are the uint16 pair
+bitmasks of src/features.py (bit k = signal_batch.EMA_PAIRS[k] with the chain
+tolerance), so any VectorizedStrategy ema filter is a bitwise AND. Features come
+from conditions.signal_batch (or the materialized sidecars when present), so
+query results equal process_data's entry_signal.
+
+Queries only open the week files overlapping the time range and answer
+"pump>2% marubozu>=0.8 across the universe in week 40" without reading bars.
+
+Usage:
+    python -m src.event_index build --tf 5s
+    python -m src.event_index query --start 2024-10-06 --end 2024-10-13 --min-change 0.02 --ema all_bull
+"""
+
+import json
+import logging
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+import polars as pl
+from tqdm import tqdm
+
+from conditions.signal_batch import MATERIALIZED_COLUMNS, SignalFeatures, ema_filter_bits
+from src import config, features, hot_cache, storage, utils_date
+
+logger = logging.getLogger("event_index")
+
+EVENT_DIR = config.DATA_DIR / "events"
+MANIFEST_NAME = "_index.json"
+
+# Bars below these floors are not indexed; queries must stay at or above them.
+MIN_EVENT_CHANGE = 0.005
+MIN_EVENT_MARUBOZU = 0.5
+
+DIRECTIONS = ("pump", "dump", "both")
+
+EVENT_SCHEMA = {
+    "timestamp": pl.Datetime("us", "UTC"),
+    "symbol": pl.Utf8,
+    "tf": pl.Utf8,
+    "open": pl.Float64,
+    "close": pl.Float64,
+    "change_pct": pl.Float64,
+    "marubozu_ratio": pl.Float64,
+    "ema_bull": pl.UInt16,
+    "ema_bear": pl.UInt16,
+}
+
+
+def dataset_events(dataset: Path, min_change: float = MIN_EVENT_CHANGE,
+                   min_marubozu: float = MIN_EVENT_MARUBOZU, use_cache: bool = True) -> pl.DataFrame:
+    """Candidate bars of one dataset with their features and EMA bits (full history for the EMAs)."""
+    symbol, tf = storage.dataset_id(dataset)
+    bars = hot_cache.load_bars(dataset, use_cache=use_cache, columns=storage.PRICE_COLS)
+    if bars.is_empty():
+        return pl.DataFrame(schema=EVENT_SCHEMA)
+    bars = features.attach_features(dataset, bars, MATERIALIZED_COLUMNS)
+
+    signal_features = SignalFeatures(bars.drop(storage.TS_COL).to_pandas())
+    keep = (np.abs(signal_features.pump_pct) >= min_change) & (signal_features.marubozu_ratio >= min_marubozu)
+    rows = np.flatnonzero(keep)
+
+    return pl.DataFrame({
+        "timestamp": bars[storage.TS_COL].gather(rows).dt.convert_time_zone("UTC"),
+        "symbol": pl.Series([symbol] * len(rows), dtype=pl.Utf8),
+        "tf": pl.Series([tf] * len(rows), dtype=pl.Utf8),
+        "open": bars['open'].to_numpy()[rows],
+        "close": bars['close'].to_numpy()[rows],
+        "change_pct": signal_features.pump_pct[rows],
+        "marubozu_ratio": signal_features.marubozu_ratio[rows],
+        "ema_bull": pl.Series(signal_features.ema_bits(True)[rows], dtype=pl.UInt16),
+        "ema_bear": pl.Series(signal_features.ema_bits(False)[rows], dtype=pl.UInt16),
+    })
+
+
+def _week_file(week_start: datetime) -> str:
+    return f"{week_start:%Y-%m-%d}.parquet"
+
+
+def load_manifest(event_dir: Optional[Path] = None) -> Dict:
+    path = (event_dir or EVENT_DIR) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def build_index(data_dir: Optional[Union[str, Path]] = None, tf_filter: Optional[str] = None,
+                min_change: float = MIN_EVENT_CHANGE, min_marubozu: float = MIN_EVENT_MARUBOZU,
+                event_dir: Optional[Path] = None, workers: int = 4, use_cache: bool = True) -> int:
+    """
+    (Re)builds the index from every dataset; returns the number of events.
+    Written to a sibling directory first and swapped in, so readers never see a partial index.
+    """
+    data_dir = Path(data_dir) if data_dir else config.DATA_DIR
+    event_dir = event_dir or EVENT_DIR
+    datasets = storage.list_datasets(data_dir, tf_filter)
+    logger.info(f"Indexing signal events of {len(datasets)} datasets")
+
+    frames = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(dataset_events, d, min_change, min_marubozu, use_cache): d for d in datasets}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Event index"):
+            try:
+                df = future.result()
+            except Exception as e:
+                logger.error(f"Failed to index {futures[future]}: {e}")
+                continue
+            if not df.is_empty():
+                frames.append(df)
+
+    tmp_dir = event_dir.with_name(event_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    weeks = []
+    total = 0
+    if frames:
+        events = (
+            pl.concat(frames)
+            .with_columns(utils_date.week_start_expr("timestamp").alias("week"))
+            .sort(["timestamp", "symbol", "tf"])
+        )
+        total = events.height
+        for (week,), part in events.partition_by("week", as_dict=True, maintain_order=True).items():
+            name = _week_file(week)
+            part.drop("week").write_parquet(tmp_dir / name, statistics=True)
+            weeks.append(name)
+
+    manifest = {
+        "min_change": min_change,
+        "min_marubozu": min_marubozu,
+        "tf_filter": tf_filter,
+        "datasets": len(datasets),
+        "events": total,
+        "weeks": weeks,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(tmp_dir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=4)
+
+    if event_dir.exists():
+        shutil.rmtree(event_dir)
+    tmp_dir.rename(event_dir)
+    logger.info(f"Indexed {total} events in {len(weeks)} weeks -> {event_dir}")
+    return total
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _epoch_us(dt: datetime) -> int:
+    # Naive datetimes are IST, like the rest of the pipeline
+    if dt.tzinfo is None:
+        dt = utils_date.TZ_IST.localize(dt)
+    return (dt - _EPOCH) // timedelta(microseconds=1)
+
+
+def query(start: Optional[datetime] = None, end: Optional[datetime] = None,
+          symbols: Optional[Sequence[str]] = None, tfs: Optional[Sequence[str]] = None,
+          min_change: Optional[float] = None, direction: str = "pump",
+          min_marubozu: Optional[float] = None, ema: str = "none",
+          event_dir: Optional[Path] = None) -> pl.DataFrame:
+    """
+    Events in [start, end) matching the filters, sorted by time.
+
+    Same comparisons as process_data: pump change_pct > min_change, dump
+    change_pct < -min_change ("both": either), marubozu_ratio >= min_marubozu,
+    and every EMA pair the ema filter needs. Thresholds below the build floors
+    would silently miss bars, so they raise ValueError.
+    """
+    event_dir = event_dir or EVENT_DIR
+    manifest = load_manifest(event_dir)
+    if not manifest:
+        raise FileNotFoundError(f"No event index at {event_dir}; run `python -m src.event_index build`")
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {DIRECTIONS}, got {direction!r}")
+
+    min_change = manifest["min_change"] if min_change is None else min_change
+    min_marubozu = manifest["min_marubozu"] if min_marubozu is None else min_marubozu
+    if min_change < manifest["min_change"] or min_marubozu < manifest["min_marubozu"]:
+        raise ValueError(
+            f"Index floors are change>={manifest['min_change']}, marubozu>={manifest['min_marubozu']}; "
+            f"rebuild with lower floors to query change={min_change}, marubozu={min_marubozu}"
+        )
+
+    # Week partition pruning
+    start_us = _epoch_us(start) if start is not None else None
+    end_us = _epoch_us(end) if end is not None else None
+    week_us = 7 * 24 * 3600 * 1_000_000
+    files = []
+    for name in manifest["weeks"]:
+        week_start = _epoch_us(datetime.strptime(name[:10], "%Y-%m-%d") + timedelta(hours=3))
+        if end_us is not None and week_start >= end_us:
+            continue
+        if start_us is not None and week_start + week_us <= start_us:
+            continue
+        files.append(event_dir / name)
+    if not files:
+        return pl.DataFrame(schema=EVENT_SCHEMA)
+
+    change = pl.col("change_pct")
+    if direction == "pump":
+        predicate = change > min_change
+    elif direction == "dump":
+        predicate = change < -min_change
+    else:
+        predicate = (change > min_change) | (change < -min_change)
+    predicate = predicate & (pl.col("marubozu_ratio") >= min_marubozu)
+
+    epoch = pl.col("timestamp").dt.epoch("us")
+    if start_us is not None:
+        predicate = predicate & (epoch >= start_us)
+    if end_us is not None:
+        predicate = predicate & (epoch < end_us)
+    if symbols:
+        predicate = predicate & pl.col("symbol").is_in(list(symbols))
+    if tfs:
+        predicate = predicate & pl.col("tf").is_in(list(tfs))
+    for column, required in zip(("ema_bull", "ema_bear"), ema_filter_bits(ema)):
+        if required:
+            predicate = predicate & ((pl.col(column) & required) == required)
+
+    return pl.scan_parquet(files).filter(predicate).collect()
+
+
+def concurrent_signals(events: pl.DataFrame, every: str = "1m", min_symbols: int = 2) -> pl.DataFrame:
+    """Time buckets where at least min_symbols different symbols fired (e.g. same-minute pumps)."""
+    return (
+        events
+        .group_by(pl.col("timestamp").dt.truncate(every).alias("bucket"))
+        .agg(
+            pl.col("symbol").n_unique().alias("symbols"),
+            pl.len().alias("events"),
+            pl.col("symbol").unique(maintain_order=True).alias("symbol_list"),
+        )
+        .filter(pl.col("symbols") >= min_symbols)
+        .sort("bucket")
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Signal-event index")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_build = sub.add_parser("build", help="(Re)build the index from the bar universe")
+    p_build.add_argument("--data-dir", default=None)
+    p_build.add_argument("--tf", default=None)
+    p_build.add_argument("--min-change", type=float, default=MIN_EVENT_CHANGE)
+    p_build.add_argument("--min-marubozu", type=float, default=MIN_EVENT_MARUBOZU)
+    p_build.add_argument("--workers", type=int, default=4)
+
+    p_query = sub.add_parser("query", help="Query events (dates are IST)")
+    p_query.add_argument("--start", type=datetime.fromisoformat, default=None)
+    p_query.add_argument("--end", type=datetime.fromisoformat, default=None)
+    p_query.add_argument("--symbols", nargs="*", default=None)
+    p_query.add_argument("--tf", nargs="*", default=None)
+    p_query.add_argument("--min-change", type=float, default=None)
+    p_query.add_argument("--direction", choices=DIRECTIONS, default="pump")
+    p_query.add_argument("--min-marubozu", type=float, default=None)
+    p_query.add_argument("--ema", default="none")
+    p_query.add_argument("--concurrent", default=None, help="Bucket size (e.g. 1m): symbols firing together")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.cmd == "build":
+        build_index(args.data_dir, args.tf, args.min_change, args.min_marubozu, workers=args.workers)
+    else:
+        t0 = time.perf_counter()
+        result = query(args.start, args.end, args.symbols, args.tf, args.min_change,
+                       args.direction, args.min_marubozu, args.ema)
+        elapsed = (time.perf_counter() - t0) * 1000
+        if args.concurrent:
+            result = concurrent_signals(result, args.concurrent)
+        print(result)
+        print(f"{result.height} rows in {elapsed:.1f} ms")
@@ -0,0 +1,221 @@
+"""
+Materialized per-bar feature columns.
+
+Strategies recompute body size, range, change_pct, the marubozu ratio and ten
+EMAs from OHLC on every run. This optional ingest step stores them once, as a
+sidecar file next to every weekly bar file:
+
+    raw/SYMBOL/TF/<week>.parquet              bars
+    raw/SYMBOL/TF/_features/<week>.parquet    ts_1s + FEATURE_COLUMNS
+
+ema_bull / ema_bear are uint16 bitmasks of the adjacent EMA pairs
+(signal_batch.EMA_PAIRS, bit k = pair k) with the VectorizedStrategy chain
+tolerances, so any ema filter becomes a bitwise AND at backtest time.
+
+EMAs run over the whole history: each sidecar footer keeps the raw EMA values
+and observation count at the end of its week, and the next week continues from
+them (bit-identical to pandas ewm over the concatenated bars). A missing
+sidecar is recomputed together with every week after it.
+
+Enable during ingest with config.MATERIALIZE_FEATURES, or backfill:
+    python -m src.features build --data-dir /path/to/backtest_data --tf 5s
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pyarrow.parquet as pq
+from tqdm import tqdm
+
+from conditions.signal_batch import EMA_PERIODS, SignalFeatures
+from src import storage
+
+logger = logging.getLogger("features")
+
+FEATURE_DIRNAME = "_features"
+FEATURE_COLUMNS = ("body_size", "range_size", "change_pct", "marubozu_ratio", "ema_bull", "ema_bear")
+STATE_METADATA_KEY = b"binance_backtest.feature_state"
+
+
+def feature_path(bar_file: Union[str, Path]) -> Path:
+    p = Path(bar_file)
+    return p.parent / FEATURE_DIRNAME / p.name
+
+
+def _continued_emas(closes: np.ndarray, state: Optional[Dict]) -> Tuple[Dict[int, np.ndarray], Dict]:
+    """
+    pandas ewm(span, adjust=False, min_periods=span) continued from a previous state.
+
+    With adjust=False the whole recurrence state after an observation is the
+    raw weighted value, so prepending it as the first value reproduces the
+    continuous series exactly; min_periods is applied with the carried count.
+    """
+    nobs = state["nobs"] if state else 0
+    seen = nobs + np.arange(1, len(closes) + 1)
+    emas, raw_last = {}, {}
+    for period in EMA_PERIODS:
+        previous = state["ema"].get(str(period)) if state else None
+        series = closes if previous is None else np.r_[previous, closes]
+        raw = pd.Series(series).ewm(span=period, adjust=False).mean().to_numpy()
+        if previous is not None:
+            raw = raw[1:]
+        raw_last[str(period)] = float(raw[-1]) if len(raw) else previous
+        emas[period] = np.where(seen >= period, raw, np.nan)
+    return emas, {"ema": raw_last, "nobs": int(nobs + len(closes))}
+
+
+def compute_features(bars: pl.DataFrame, state: Optional[Dict] = None) -> Tuple[pl.DataFrame, Dict]:
+    """Feature columns for a block of bars following `state` (None: start of history); returns (features, new state)."""
+    closes = bars['close'].to_numpy()
+    emas, new_state = _continued_emas(closes, state)
+    features = SignalFeatures(bars.select(storage.PRICE_COLS).to_pandas(), emas=emas)
+
+    opens = bars['open'].to_numpy()
+    out = pl.DataFrame({
+        storage.TS_COL: bars[storage.TS_COL],
+        "body_size": np.abs(closes - opens),
+        "range_size": bars['high'].to_numpy() - bars['low'].to_numpy(),
+        "change_pct": features.pump_pct,
+        "marubozu_ratio": features.marubozu_ratio,
+        "ema_bull": pl.Series(features.ema_bits(True), dtype=pl.UInt16),
+        "ema_bear": pl.Series(features.ema_bits(False), dtype=pl.UInt16),
+    })
+    return out, new_state
+
+
+def read_state(path: Union[str, Path]) -> Optional[Dict]:
+    """EMA state stored in a sidecar footer (None if missing/unreadable)."""
+    try:
+        raw = (pq.read_schema(str(path)).metadata or {}).get(STATE_METADATA_KEY)
+    except Exception:
+        return None
+    return json.loads(raw) if raw else None
+
+
+def _write_features(features: pl.DataFrame, state: Dict, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = features.to_arrow()
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        STATE_METADATA_KEY: json.dumps(state).encode(),
+        storage.SORTED_METADATA_KEY: b"true",
+    })
+    tmp_path = path.with_suffix(".parquet.tmp")
+    pq.write_table(table, str(tmp_path), compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def materialize_dataset(dataset: Union[str, Path], force: bool = False) -> int:
+    """
+    Writes the missing sidecars of a raw/SYMBOL/TF directory (all of them if force).
+    Weeks are processed in order so the EMA state carries over; once one week is
+    recomputed every later week is too. Returns the number written.
+    """
+    state = None
+    written = 0
+    for f in storage.list_bar_files(dataset):
+        target = feature_path(f)
+        if not force:
+            stored = read_state(target) if target.exists() else None
+            if stored is not None:
+                state = stored
+                continue
+            force = True  # later states chain from this week
+        bars = storage.read_bar_file(f, columns=[storage.TS_COL, *storage.PRICE_COLS])
+        features, state = compute_features(bars, state)
+        _write_features(features, state, target)
+        written += 1
+    return written
+
+
+def materialize_week(bar_file: Union[str, Path]) -> int:
+    """
+    Ingest hook for a freshly written weekly bar file: continues from the
+    previous week's state (or fills the gap first) and, for a backfilled week,
+    recomputes the weeks after it.
+    """
+    bar_file = Path(bar_file)
+    feature_path(bar_file).unlink(missing_ok=True)  # leftover from an earlier version of the bars
+    return materialize_dataset(bar_file.parent)
+
+
+def load_features(dataset: Union[str, Path], columns: Optional[Sequence[str]] = None) -> Optional[pl.DataFrame]:
+    """
+    Feature columns of a whole dataset (ts_1s included), or None unless every
+    bar file has its sidecar. Legacy single-file datasets have no sidecars.
+    """
+    p = Path(dataset)
+    if not p.is_dir():
+        return None
+    files = [feature_path(f) for f in storage.list_bar_files(p)]
+    if not files or not all(f.exists() for f in files):
+        return None
+    wanted = None if columns is None else [storage.TS_COL, *[c for c in columns if c != storage.TS_COL]]
+    return pl.concat([pl.read_parquet(f, columns=wanted) for f in files], rechunk=False)
+
+
+def attach_features(dataset: Union[str, Path], bars: pl.DataFrame, columns: Sequence[str]) -> pl.DataFrame:
+    """bars plus the requested feature columns when materialized and aligned; bars unchanged otherwise."""
+    missing = [c for c in columns if c not in bars.columns]
+    if not missing or bars.is_empty():
+        return bars
+    features = load_features(dataset, missing)
+    if features is None or features.height != bars.height:
+        return bars
+    if not features[storage.TS_COL].equals(bars[storage.TS_COL], check_names=False):
+        logger.warning(f"Feature sidecars of {dataset} are out of sync with the bars; ignoring them")
+        return bars
+    return bars.hstack(features.drop(storage.TS_COL))
+
+
+def build(data_dir: Union[str, Path], tf_filter: Optional[str] = None, workers: int = 4, force: bool = False) -> int:
+    """Materializes features for every raw/SYMBOL/TF dataset; returns the number of sidecars written."""
+    datasets = [d for d in storage.list_datasets(data_dir, tf_filter) if d.is_dir()]
+    logger.info(f"Materializing features for {len(datasets)} datasets under {data_dir}")
+
+    written = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(materialize_dataset, d, force): d for d in datasets}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Features"):
+            try:
+                written += future.result()
+            except Exception as e:
+                logger.error(f"Failed to materialize {futures[future]}: {e}")
+
+    logger.info(f"Features: {written} weekly sidecars written")
+    return written
+
+
+def clear(data_dir: Union[str, Path], tf_filter: Optional[str] = None):
+    for dataset in storage.list_datasets(data_dir, tf_filter):
+        target = Path(dataset) / FEATURE_DIRNAME
+        if target.exists():
+            shutil.rmtree(target)
+
+
+if __name__ == "__main__":
+    from src import config
+    from src.utils import setup_logging
+    setup_logging("features")
+
+    parser = argparse.ArgumentParser(description="Materialized per-bar feature columns")
+    parser.add_argument("command", choices=["build", "clear"])
+    parser.add_argument("--data-dir", default=str(config.DATA_DIR), help="Directory containing raw/")
+    parser.add_argument("--tf", default=None, help="Only this timeframe (e.g. 5s)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--force", action="store_true", help="Recompute existing sidecars")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.data_dir, args.tf, args.workers, args.force)
+    else:
+        clear(args.data_dir, args.tf)
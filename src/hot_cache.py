@@ -0,0 +1,195 @@
+"""
+Memory-mapped Arrow IPC hot cache for the backtest universe.
+
+Each dataset (raw/SYMBOL/TF directory or legacy SYMBOL_TF.parquet) is converted
+once into an uncompressed Arrow IPC file:
+
+    <data_dir>/cache/SYMBOL/TF.arrow      (new layout)
+    <data_dir>/cache/SYMBOL_TF.arrow      (legacy layout)
+
+Workers memory-map it instead of decoding parquet, so no decompression or
+parquet decoding happens per run. The engine still converts what it needs
+(e.g. to pandas for SignalFeatures), which copies those columns.
+The IPC schema metadata stores (name, mtime_ns, size) of every source parquet;
+any change in the source listing makes the entry stale and readers fall back
+to parquet until the next build.
+
+Usage:
+    python -m src.hot_cache build --data-dir data/processed --tf 5s
+    python -m src.hot_cache status --data-dir data/processed
+    python -m src.hot_cache clear --data-dir data/processed
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import polars as pl
+import pyarrow as pa
+from tqdm import tqdm
+
+from src import storage
+
+logger = logging.getLogger("hot_cache")
+
+CACHE_DIRNAME = "cache"
+SOURCE_METADATA_KEY = b"binance_backtest.cache_sources"
+
+
+def cache_path(source: Union[str, Path]) -> Path:
+    """Cache file location for a dataset path."""
+    p = Path(source)
+    if p.is_dir():
+        # .../raw/SYMBOL/TF -> .../cache/SYMBOL/TF.arrow
+        return p.parent.parent.parent / CACHE_DIRNAME / p.parent.name / f"{p.name}.arrow"
+    # .../SYMBOL_TF.parquet -> .../cache/SYMBOL_TF.arrow
+    return p.parent / CACHE_DIRNAME / f"{p.stem}.arrow"
+
+
+def source_signature(source: Union[str, Path]) -> List[List]:
+    """(name, mtime_ns, size) of every parquet behind a dataset; stat calls only."""
+    signature = []
+    for f in storage.list_bar_files(source):
+        st = f.stat()
+        signature.append([f.name, st.st_mtime_ns, st.st_size])
+    return signature
+
+
+def _fresh_reader(source: Union[str, Path]) -> Optional[pa.ipc.RecordBatchFileReader]:
+    """Memory-mapped reader for the cache entry, or None if missing/stale."""
+    path = cache_path(source)
+    if not path.exists():
+        return None
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(str(path), "r"))
+        cached = json.loads((reader.schema.metadata or {}).get(SOURCE_METADATA_KEY, b"null"))
+    except Exception as e:
+        logger.warning(f"Unreadable cache entry {path}: {e}")
+        return None
+    return reader if cached == source_signature(source) else None
+
+
+def is_fresh(source: Union[str, Path]) -> bool:
+    """True if the cache entry exists and was built from the current source files."""
+    return _fresh_reader(source) is not None
+
+
+def build_entry(source: Union[str, Path], force: bool = False) -> bool:
+    """
+    Writes the IPC cache file for one dataset.
+    Returns True if a new file was written, False if it was already fresh / empty.
+    """
+    if not force and is_fresh(source):
+        return False
+
+    signature = source_signature(source)
+    df = storage.read_bars(source)
+    if df.is_empty():
+        return False
+
+    # One contiguous record batch so each column maps to a single buffer
+    table = df.rechunk().to_arrow()
+    metadata = dict(table.schema.metadata or {})
+    metadata[SOURCE_METADATA_KEY] = json.dumps(signature).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    path = cache_path(source)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".arrow.tmp")
+
+    options = pa.ipc.IpcWriteOptions(compression=None)
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            for batch in table.to_batches(max_chunksize=len(table)):
+                writer.write_batch(batch)
+
+    # Atomic swap: workers mapping the old file keep their view
+    os.replace(tmp_path, path)
+    return True
+
+
+def load_bars(source: Union[str, Path], use_cache: bool = True, columns: Optional[Sequence[str]] = None) -> pl.DataFrame:
+    """
+    Bars for a dataset: read from the memory-mapped cache when fresh (Arrow
+    buffers wrapped without decoding; a later to_pandas() still copies),
+    otherwise decoded from parquet via storage.read_bars.
+    columns: optional projection; names absent from the dataset are ignored.
+    """
+    reader = _fresh_reader(source) if use_cache else None
+    if reader is not None:
+        table = reader.read_all()
+        if columns is not None:
+            keep = [storage.TS_COL, *columns] if storage.TS_COL not in columns else list(columns)
+            table = table.select([c for c in keep if c in table.column_names])
+        df = pl.from_arrow(table, rechunk=False)
+        return df.set_sorted(storage.TS_COL) if storage.TS_COL in df.columns else df
+    return storage.read_bars(source, columns=columns)
+
+
+def load_arrays(source: Union[str, Path], columns: Sequence[str]) -> Optional[Dict[str, np.ndarray]]:
+    """
+    NumPy views over the memory-mapped cache columns (no copy for numeric columns).
+    None if the entry is missing or stale. Not used by the engine workers, which
+    need the whole frame for signals; for tools reading a few columns only.
+    """
+    reader = _fresh_reader(source)
+    if reader is None:
+        return None
+    table = reader.read_all()
+    return {c: table.column(c).chunk(0).to_numpy(zero_copy_only=False) for c in columns}
+
+
+def build(data_dir: Union[str, Path], tf_filter: Optional[str] = None, workers: int = 4, force: bool = False) -> int:
+    """Builds cache entries for the whole universe; returns the number written."""
+    datasets = storage.list_datasets(data_dir, tf_filter)
+    logger.info(f"Building hot cache for {len(datasets)} datasets under {data_dir}")
+
+    written = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(build_entry, d, force): d for d in datasets}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Caching"):
+            try:
+                written += int(future.result())
+            except Exception as e:
+                logger.error(f"Failed to cache {futures[future]}: {e}")
+
+    logger.info(f"Hot cache: {written} written, {len(datasets) - written} already fresh/empty")
+    return written
+
+
+def status(data_dir: Union[str, Path], tf_filter: Optional[str] = None) -> Dict[str, int]:
+    datasets = storage.list_datasets(data_dir, tf_filter)
+    fresh = sum(1 for d in datasets if is_fresh(d))
+    return {"datasets": len(datasets), "fresh": fresh, "stale_or_missing": len(datasets) - fresh}
+
+
+def clear(data_dir: Union[str, Path]):
+    root = Path(data_dir) / CACHE_DIRNAME
+    if root.exists():
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    from src.utils import setup_logging
+    setup_logging("hot_cache")
+
+    parser = argparse.ArgumentParser(description="Arrow IPC hot cache for backtest data")
+    parser.add_argument("command", choices=["build", "status", "clear"])
+    parser.add_argument("--data-dir", default=os.path.join(os.getcwd(), "data", "processed"))
+    parser.add_argument("--tf", default=None, help="Only this timeframe (e.g. 5s)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--force", action="store_true", help="Rebuild even if fresh")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.data_dir, args.tf, args.workers, args.force)
+    elif args.command == "status":
+        print(status(args.data_dir, args.tf))
+    else:
+        clear(args.data_dir)
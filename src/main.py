@@ -4,24 +4,33 @@ from tqdm import tqdm
 from datetime import datetime, timedelta, timezone
 from concurrent.futures import ThreadPoolExecutor
 
-from src import config, downloader, processor, utils
+from src import config, downloader, processor, symbols, utils
+from src.miss_cache import MissCache
 
 logger = utils.setup_logging("main")
 
-def run_pipeline(dry_run_symbol=None, dry_run_days=None):
+def run_pipeline(dry_run_symbol=None, dry_run_days=None, offline=False):
     """
     Main pipeline entry point.
     :param dry_run_symbol: If set, only process this specific symbol.
     :param dry_run_days: If set, only process the last N days.
+    :param offline: Use the cached symbol registry without hitting exchangeInfo.
     """
     logger.info("Starting Binance Futures Backtest Data Pipeline")
     
-    # 1. Fetch Symbols
+    # 1. Fetch Symbols (cached registry, see src/symbols.py)
     if dry_run_symbol:
-        symbols = [dry_run_symbol]
+        # Dry runs must not depend on exchangeInfo; an empty registry filters nothing
+        try:
+            registry = symbols.get_registry(offline=offline)
+        except Exception:
+            registry = {"symbols": {}}
+        symbol_list = [dry_run_symbol]
         logger.info(f"DRY RUN MODE: Processing only {dry_run_symbol}")
     else:
-        symbols = downloader.get_params_usdt_futures_symbols()
+        registry = symbols.get_registry(offline=offline)
+        symbol_list = symbols.active_symbols(registry=registry)
+        logger.info(f"Found {len(symbol_list)} active USDT-M Perpetual symbols.")
     
     # 2. Determine Date Range
     from datetime import timezone
@@ -36,22 +45,26 @@ def run_pipeline(dry_run_symbol=None, dry_run_days=None):
                                               datetime.combine(end_date, datetime.min.time())))
     date_list = [d.date() for d in date_list]
     
+    # Days that 404'd on a previous run are not requested again (see src/miss_cache.py)
+    misses = MissCache()
+    
     # 3. Process each symbol
-    for symbol in tqdm(symbols, desc="Processing Symbols"):
+    for symbol in tqdm(symbol_list, desc="Processing Symbols"):
         logger.info(f"Start processing {symbol}")
         
         daily_dfs = []
+        # Skip days before listing / after delisting instead of collecting 404s
+        symbol_days = [d for d in date_list if symbols.has_data_on(symbol, d, registry)]
         
-        for date_obj in tqdm(date_list, desc=f"Days for {symbol}", leave=False):
+        for date_obj in tqdm(symbol_days, desc=f"Days for {symbol}", leave=False):
             date_str = utils.format_date_to_string(date_obj)
-            url = downloader.construct_binance_vision_url(symbol, date_str)
             zip_filename = f"{symbol}-aggTrades-{date_str}.zip"
             zip_path = config.RAW_DATA_DIR / zip_filename
             
             # Download
             # Optimization: check if we already processed? No, we delete raw files.
             # Only download if we don't have it.
-            if not downloader.download_file(url, zip_path):
+            if not downloader.download_day(symbol, date_str, zip_path, misses):
                 # Download failed (e.g. 404 for new listing), skip this day
                 continue
             
@@ -72,6 +85,8 @@ def run_pipeline(dry_run_symbol=None, dry_run_days=None):
                 if csv_path.exists():
                     csv_path.unlink()
 
+        misses.save()
+        
         # Check if we have data
         if not daily_dfs:
             logger.warning(f"No data collected for {symbol}. Skipping.")
@@ -100,6 +115,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--symbol", help="Run for specific symbol only")
     parser.add_argument("--days", type=int, help="Number of days to process")
+    parser.add_argument("--offline", action="store_true", help="Use the cached symbol registry only")
     args = parser.parse_args()
     
-    run_pipeline(dry_run_symbol=args.symbol, dry_run_days=args.days)
+    run_pipeline(dry_run_symbol=args.symbol, dry_run_days=args.days, offline=args.offline)
@@ -0,0 +1,84 @@
+"""
+Persistent negative cache of aggTrades days that returned 404.
+
+    meta/missing_days.json
+    {
+        "BTCUSDT": {"2024-01-01": "2024-01-08T00:12:31+00:00", ...},   # day -> last checked (UTC)
+        ...
+    }
+
+Revalidation policy:
+  - A day that was missing while still recent (within MISS_CACHE_RECENT_DAYS of
+    the check) may simply not be published yet; it is retried after
+    MISS_CACHE_RECENT_TTL_HOURS.
+  - Older misses are stable (not listed yet / gap in the archive) and are
+    retried after MISS_CACHE_TTL_DAYS.
+"""
+
+import json
+import logging
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from src import config
+
+logger = logging.getLogger("miss_cache")
+
+MISS_CACHE_FILE = config.META_DIR / "missing_days.json"
+
+
+class MissCache:
+    """(symbol, UTC day) -> last 404 time. Thread-safe; call save() to persist."""
+
+    def __init__(self, path=None):
+        self.path = path or MISS_CACHE_FILE
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.entries: Dict[str, Dict[str, str]] = self._load()
+
+    def _load(self) -> Dict:
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load miss cache: {e}")
+        return {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                tmp = self.path.with_suffix(".json.tmp")
+                with open(tmp, 'w') as f:
+                    json.dump(self.entries, f, indent=4, sort_keys=True)
+                tmp.replace(self.path)
+                self._dirty = False
+            except Exception as e:
+                logger.error(f"Failed to save miss cache: {e}")
+
+    def is_missing(self, symbol: str, day: str, now: Optional[datetime] = None) -> bool:
+        """True if the day 404'd recently enough that it should not be requested again."""
+        checked = self.entries.get(symbol, {}).get(day)
+        if not checked:
+            return False
+        now = now or datetime.now(timezone.utc)
+        checked_at = datetime.fromisoformat(checked)
+        if checked_at.date() - date.fromisoformat(day) <= timedelta(days=config.MISS_CACHE_RECENT_DAYS):
+            ttl = timedelta(hours=config.MISS_CACHE_RECENT_TTL_HOURS)
+        else:
+            ttl = timedelta(days=config.MISS_CACHE_TTL_DAYS)
+        return now - checked_at < ttl
+
+    def record(self, symbol: str, day: str, now: Optional[datetime] = None):
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            self.entries.setdefault(symbol, {})[day] = now.isoformat()
+            self._dirty = True
+
+    def forget(self, symbol: str, day: str):
+        with self._lock:
+            if self.entries.get(symbol, {}).pop(day, None) is not None:
+                self._dirty = True
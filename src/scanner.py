@@ -1,96 +1,262 @@
-import polars as pl
-from pathlib import Path
-from tqdm import tqdm
-from typing import List, Dict
+"""
+Universe signal scanner.
+
+Builds ONE lazy query over every bar file (storage.scan_bar_files), derives
+symbol / timeframe from the file path, applies strategy.detect_signals as
+expressions and streams the signal rows straight to CSV or parquet.
+No per-row Python objects are created.
+
+Incremental mode keeps a watermark per SYMBOL/TF (last scanned ts_1s and the
+weekly files already seen) in meta/scanner_state.json and appends each run's
+new signals as one part file to DATA_DIR/signals/. Only new weekly files (plus
+the tail of the previous one as indicator warm-up) are read, so a weekly run
+costs the same however long the history gets.
+
+Usage:
+    python -m src.scanner
+    python -m src.scanner --tf 5s --format parquet
+    python -m src.scanner --incremental            # only new weeks, append to the store
+    python -m src.scanner --incremental --rebuild  # drop store + watermarks first
+"""
+
+import json
 import logging
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Union
 
-from src import config, strategy, utils
+import polars as pl
+
+from src import config, storage, strategy, utils
 
 logger = utils.setup_logging("scanner")
 
-def analyze_file(file_path: Path) -> List[Dict]:
-    """
-    Analyzes a single parquet file for signals.
-    Returns a list of signal events (dicts).
-    """
-    try:
-        df = pl.read_parquet(file_path)
-        if df.is_empty():
-            return []
-            
-        df = strategy.detect_signals(df)
-        
-        # Filter for signals
-        signal_df = df.filter(pl.col("signal_entry"))
-        
-        if signal_df.is_empty():
-            return []
-            
-        # Parse Symbol and Timeframe from filename (e.g., BTCUSDT_5s.parquet)
-        stem = file_path.stem # BTCUSDT_5s
-        parts = stem.split('_')
-        symbol = parts[0]
-        tf = parts[1]
-        
-        results = []
-        for row in signal_df.iter_rows(named=True):
-            results.append({
-                "symbol": symbol,
-                "timeframe": tf,
-                "timestamp": row['ts_1s'], # datetime
-                "open": row['open'],
-                "close": row['close'],
-                "change_pct": row['change_pct'],
-                "marubozu_ratio": row['marubozu_ratio']
-            })
-            
-        return results
-        
-    except Exception as e:
-        logger.error(f"Error scanning {file_path}: {e}")
-        return []
+# raw/SYMBOL/TF/<week>.parquet  |  <dir>/SYMBOL_TF.parquet
+_RAW_PATH_RE = r"([^/\\]+)[/\\]([^/\\]+)[/\\][^/\\]+\.parquet$"
+_LEGACY_PATH_RE = r"([^/\\_]+)_([^/\\_]+)\.parquet$"
+
 
-def run_scanner(parallel: bool = True):
+def dataset_files(data_dir: Union[str, Path], tf_filter: Optional[str] = None) -> List[Path]:
+    """All bar files of the universe (weekly files of every raw/SYMBOL/TF, or legacy files)."""
+    files = []
+    for dataset in storage.list_datasets(data_dir, tf_filter):
+        files.extend(storage.list_bar_files(dataset))
+    return files
+
+
+def scan_signals(files: List[Path], legacy: bool = False) -> pl.LazyFrame:
+    """Lazy signal query over the given bar files."""
+    pattern = _LEGACY_PATH_RE if legacy else _RAW_PATH_RE
+    time_col = storage.TS_COL
+
+    lf = storage.scan_bar_files(files)
+    return (
+        strategy.detect_signals(lf)
+        .filter(pl.col("signal_entry"))
+        .select(
+            pl.col("path").str.extract(pattern, 1).alias("symbol"),
+            pl.col("path").str.extract(pattern, 2).alias("timeframe"),
+            pl.col(time_col).alias("timestamp"),
+            "open", "close", "change_pct", "marubozu_ratio",
+        )
+        .sort("timestamp", maintain_order=True)
+    )
+
+
+def run_scanner(data_dir: Optional[Union[str, Path]] = None, tf_filter: Optional[str] = None,
+                fmt: str = "csv", output: Optional[Path] = None) -> Optional[Path]:
     """
-    Scans all files in data/processed and reports signals.
+    Scans the whole universe and streams the signal report to disk.
+    Default input: DATA_DIR (raw/SYMBOL/TF layout); while raw/ holds no datasets,
+    the legacy flat files in PROCESSED_DATA_DIR as before.
+    Default output: DATA_DIR/signals_report.csv (read by the Sheets/Excel exporters).
     """
-    files = list(config.PROCESSED_DATA_DIR.glob("*.parquet"))
+    if data_dir:
+        data_dir = Path(data_dir)
+    else:
+        data_dir = config.DATA_DIR if storage.list_datasets(config.DATA_DIR) else config.PROCESSED_DATA_DIR
+    legacy = not (data_dir / "raw").exists()
+    files = dataset_files(data_dir, tf_filter)
     logger.info(f"Found {len(files)} files to scan.")
-    
-    all_signals = []
-    
-    if parallel:
-        # CPU bound task -> ProcessPoolExecutor
-        with ProcessPoolExecutor() as executor:
-            futures = [executor.submit(analyze_file, f) for f in files]
-            for future in tqdm(as_completed(futures), total=len(files), desc="Scanning"):
-                res = future.result()
-                if res:
-                    all_signals.extend(res)
+    if not files:
+        print("No signals found matching criteria.")
+        return None
+
+    output = output or config.DATA_DIR / f"signals_report.{fmt}"
+    query = scan_signals(files, legacy=legacy)
+    if fmt == "parquet":
+        query.sink_parquet(output)
     else:
-        for f in tqdm(files, desc="Scanning"):
-            res = analyze_file(f)
-            if res:
-                all_signals.extend(res)
-                
-    logger.info(f"Scan complete. Found {len(all_signals)} potential entry signals.")
-    
-    if all_signals:
-        # Convert to DataFrame for nice display/saving
-        result_df = pl.DataFrame(all_signals)
-        # Sort by timestamp
-        result_df = result_df.sort("timestamp")
-        
-        output_csv = config.DATA_DIR / "signals_report.csv"
-        result_df.write_csv(output_csv)
-        logger.info(f"Report saved to {output_csv}")
-        
-        # Print sample
+        query.sink_csv(output)
+
+    # Small summary from the written report (not a rescan)
+    report = pl.scan_parquet(output) if fmt == "parquet" else pl.scan_csv(output, try_parse_dates=True)
+    total = report.select(pl.len()).collect().item()
+    logger.info(f"Scan complete. Found {total} potential entry signals. Report saved to {output}")
+
+    if total:
         print("\nTop 10 Recent Signals:")
-        print(result_df.tail(10))
+        print(report.tail(10).collect())
     else:
         print("No signals found matching criteria.")
+    return output
+
+
+# =============================================================================
+# Incremental scan (watermarks + append-only signal store)
+# =============================================================================
+STATE_FILE = config.META_DIR / "scanner_state.json"
+SIGNAL_STORE_DIR = config.DATA_DIR / "signals"
+
+# Bars of history re-read before the watermark for indicators in detect_signals.
+# The current conditions are single-bar, so none are needed.
+WARMUP_BARS = 0
+
+
+def load_state(path: Path = None) -> Dict:
+    path = path or STATE_FILE
+    if path.exists():
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load scanner state: {e}")
+    return {}
+
+
+def save_state(state: Dict, path: Path = None):
+    path = path or STATE_FILE
+    try:
+        tmp = path.with_suffix(".json.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=4, sort_keys=True)
+        tmp.replace(path)
+    except Exception as e:
+        logger.error(f"Failed to save scanner state: {e}")
+
+
+def _dataset_key(dataset: Path) -> str:
+    return f"{dataset.parent.name}/{dataset.name}"
+
+
+def _incremental_frames(dataset: Path, entry: Dict, warmup_bars: int):
+    """(signals LazyFrame, max-ts LazyFrame, new file names) for one raw/SYMBOL/TF dataset, or None."""
+    files = storage.list_bar_files(dataset)
+    seen = set(entry.get("files", []))
+    new_files = [f for f in files if f.name not in seen]
+    if not new_files:
+        return None
+
+    time_col = storage.TS_COL
+    bars = storage.scan_bar_files(new_files)
+    if warmup_bars and seen:
+        previous = [f for f in files if f.name in seen]
+        bars = pl.concat([storage.scan_bar_files(previous[-1:]).tail(warmup_bars), bars], how="diagonal_relaxed")
+
+    epoch = pl.col(time_col).dt.epoch("us")
+    watermark = entry.get("watermark_us")
+    signals = strategy.detect_signals(bars).filter(pl.col("signal_entry"))
+    if watermark is not None:
+        signals = signals.filter(epoch > watermark)
+    signals = signals.select(
+        pl.lit(dataset.parent.name).alias("symbol"),
+        pl.lit(dataset.name).alias("timeframe"),
+        pl.col(time_col).alias("timestamp"),
+        "open", "close", "change_pct", "marubozu_ratio",
+    )
+    max_ts = bars.select(pl.lit(_dataset_key(dataset)).alias("key"), epoch.max().alias("watermark_us"))
+    return signals, max_ts, [f.name for f in new_files]
+
+
+def run_incremental_scan(data_dir: Optional[Union[str, Path]] = None, tf_filter: Optional[str] = None,
+                         warmup_bars: int = WARMUP_BARS, store_dir: Optional[Path] = None,
+                         state_file: Optional[Path] = None) -> int:
+    """
+    Scans only weekly files not seen before and appends their signals to the store.
+    Returns the number of new signals.
+    """
+    data_dir = Path(data_dir) if data_dir else config.DATA_DIR
+    store_dir = store_dir or SIGNAL_STORE_DIR
+    state = load_state(state_file)
+
+    signal_frames, watermark_frames, new_files = [], [], {}
+    for dataset in storage.list_datasets(data_dir, tf_filter):
+        if not dataset.is_dir():
+            logger.warning(f"Incremental scan needs the raw/SYMBOL/TF layout; skipping {dataset}")
+            continue
+        key = _dataset_key(dataset)
+        frames = _incremental_frames(dataset, state.get(key, {}), warmup_bars)
+        if frames:
+            signal_frames.append(frames[0])
+            watermark_frames.append(frames[1])
+            new_files[key] = frames[2]
+
+    logger.info(f"Incremental scan: {len(new_files)} datasets with new weeks")
+    if not new_files:
+        return 0
+
+    signals, watermarks = pl.collect_all([
+        pl.concat(signal_frames, how="diagonal_relaxed").sort("timestamp", maintain_order=True),
+        pl.concat(watermark_frames),
+    ])
+
+    # Append-only: one part per run; written before the state so a crash only re-scans
+    if not signals.is_empty():
+        store_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        signals.write_parquet(store_dir / f"part-{stamp}.parquet")
+
+    for key, watermark_us in watermarks.iter_rows():
+        entry = state.setdefault(key, {"files": []})
+        entry["files"] = sorted(set(entry["files"]) | set(new_files[key]))
+        if watermark_us is not None:
+            entry["watermark_us"] = max(watermark_us, entry.get("watermark_us") or watermark_us)
+    save_state(state, state_file)
+
+    logger.info(f"Appended {signals.height} new signals to {store_dir}")
+    return signals.height
+
+
+def load_signals(store_dir: Optional[Path] = None) -> pl.LazyFrame:
+    """All stored signals (every part), lazily."""
+    store_dir = store_dir or SIGNAL_STORE_DIR
+    parts = sorted(store_dir.glob("part-*.parquet"))
+    if not parts:
+        return pl.LazyFrame()
+    return pl.scan_parquet(parts)
+
+
+def reset_incremental(store_dir: Optional[Path] = None, state_file: Optional[Path] = None):
+    store_dir = store_dir or SIGNAL_STORE_DIR
+    if store_dir.exists():
+        shutil.rmtree(store_dir)
+    (state_file or STATE_FILE).unlink(missing_ok=True)
+
 
 if __name__ == "__main__":
-    run_scanner()
+    import argparse
+    parser = argparse.ArgumentParser(description="Scan the bar universe for pump + marubozu signals")
+    parser.add_argument("--data-dir", default=None, help="Default: config.DATA_DIR (raw/ layout), else legacy files in config.PROCESSED_DATA_DIR")
+    parser.add_argument("--tf", default=None, help="Only this timeframe (e.g. 5s)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--incremental", action="store_true", help="Scan only new weeks into the signal store")
+    parser.add_argument("--rebuild", action="store_true", help="With --incremental: reset store and watermarks first")
+    args = parser.parse_args()
+
+    if args.incremental:
+        if args.rebuild:
+            reset_incremental()
+        run_incremental_scan(args.data_dir, args.tf)
+        # Full report from the store (no bar files are read)
+        stored = load_signals()
+        if stored.collect_schema().names():
+            report = config.DATA_DIR / f"signals_report.{args.format}"
+            query = stored.sort("timestamp", maintain_order=True)
+            if args.format == "parquet":
+                query.sink_parquet(report)
+            else:
+                query.sink_csv(report)
+            logger.info(f"Report saved to {report}")
+    else:
+        run_scanner(args.data_dir, args.tf, args.format)
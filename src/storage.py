@@ -0,0 +1,393 @@
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import polars as pl
+import pyarrow.parquet as pq
+
+logger = logging.getLogger("storage")
+
+TS_COL = "ts_1s"
+PRICE_COLS = ["open", "high", "low", "close"]
+VOLUME_COL = "volume"
+
+# Parquet key/value metadata written next to every bar file.
+# Readers trust this flag and skip the sort/unique pass on load.
+SORTED_METADATA_KEY = b"binance_backtest.ts_1s_sorted_unique"
+
+# Storage profiles
+# - default: Float64 OHLCV + tz-aware datetime, zstd (same schema readers use)
+# - compact: scaled Int64 (or Float32) prices, Int32 second offsets, delta /
+#            byte-stream-split encodings, no dictionary, zstd with large row groups.
+#            Widened back to the default schema by read_bars.
+PROFILES = ("default", "compact")
+COMPACT_METADATA_KEY = b"binance_backtest.compact"
+COMPACT_ROW_GROUP_SIZE = 256 * 1024
+COMPACT_ZSTD_LEVEL = 3
+MAX_SCALE_DECIMALS = 8
+VOLUME_RTOL = 1e-12
+
+def ensure_sorted_unique(df: pl.DataFrame, ts_col: str = TS_COL) -> pl.DataFrame:
+    """
+    Returns df with strictly increasing ts_col and the sorted flag set.
+    Fast path: a single diff pass when the frame is already in order.
+    Slow path: stable sort + drop duplicate timestamps (first occurrence wins).
+    """
+    if df.height < 2:
+        return df.set_sorted(ts_col)
+
+    if _is_strictly_increasing(df[ts_col]):
+        return df.set_sorted(ts_col)
+
+    df = df.sort(ts_col, maintain_order=True)
+    df = df.unique(subset=[ts_col], keep="first", maintain_order=True)
+    return df.set_sorted(ts_col)
+
+
+def _is_strictly_increasing(ts: pl.Series) -> bool:
+    """True if every value is larger than the previous one (no ties)."""
+    if ts.null_count() > 0:
+        return False
+    return bool((ts.diff().drop_nulls().cast(pl.Int64) > 0).all())
+
+
+def write_bars(
+    df: pl.DataFrame,
+    path: Union[str, Path],
+    ts_col: str = TS_COL,
+    profile: str = "default",
+    price_decimals: Optional[int] = None,
+) -> pl.DataFrame:
+    """
+    Writes bars to parquet with the sorted/unique guarantee.
+    The guarantee is recorded in the parquet schema metadata.
+
+    profile="compact" stores the narrow schema (see compact_bars).
+    price_decimals: tick size as decimals (tickSize 0.001 -> 3, see symbols.price_decimals);
+    inferred if None or if the prices are not exact multiples of that tick.
+    Returns the frame (default schema) that was actually written.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown storage profile: {profile}")
+
+    df = ensure_sorted_unique(df, ts_col)
+
+    metadata = {SORTED_METADATA_KEY: b"true"}
+    options = {"compression": "zstd"}
+
+    if profile == "compact":
+        out, spec = compact_bars(df, ts_col, price_decimals)
+        metadata[COMPACT_METADATA_KEY] = json.dumps(spec).encode()
+        options.update(
+            compression_level=COMPACT_ZSTD_LEVEL,
+            row_group_size=COMPACT_ROW_GROUP_SIZE,
+            use_dictionary=False,
+            column_encoding=_compact_encodings(out),
+        )
+    else:
+        out = df
+
+    table = out.to_arrow()
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+
+    pq.write_table(table, str(path), **options)
+    return df
+
+
+def _compact_encodings(df: pl.DataFrame) -> Dict[str, str]:
+    """Delta encoding for integer ticks/offsets, byte-stream-split for floats."""
+    encodings = {}
+    for col, dtype in df.schema.items():
+        if dtype in (pl.Int32, pl.Int64):
+            encodings[col] = "DELTA_BINARY_PACKED"
+        elif dtype in (pl.Float32, pl.Float64):
+            encodings[col] = "BYTE_STREAM_SPLIT"
+    return encodings
+
+
+def infer_decimals(values: pl.Series, max_decimals: int = MAX_SCALE_DECIMALS, rtol: float = 0.0) -> Optional[int]:
+    """
+    Smallest d such that values round-trip through Int64 ticks of 10**-d.
+    rtol=0 requires an exact round-trip (prices); a tiny rtol absorbs the float
+    noise of summed quantities (volume). None if no d <= max_decimals works.
+    """
+    values = values.drop_nulls()
+    if values.is_empty():
+        return 0
+    if values.abs().max() * 10.0 ** max_decimals >= 2 ** 53:
+        return None
+
+    arr = values.cast(pl.Float64).to_numpy()
+    for d in range(max_decimals + 1):
+        if _round_trips(arr, d, rtol):
+            return d
+    return None
+
+
+def _round_trips(arr: np.ndarray, decimals: int, rtol: float = 0.0) -> bool:
+    # NumPy for true IEEE division (x / 10**d), matching widen_bars exactly
+    scale = 10.0 ** decimals
+    ticks = np.round(arr * scale)
+    return bool((np.abs(ticks / scale - arr) <= np.abs(arr) * rtol).all())
+
+
+def compact_bars(df: pl.DataFrame, ts_col: str = TS_COL, price_decimals: Optional[int] = None):
+    """
+    Narrows a default-schema bar frame for the compact profile.
+
+    - ts_col -> Int32 seconds since the first bar (week start for weekly files)
+    - prices -> Int64 ticks of 10**-price_decimals (the symbol's tick size) when
+      every price is exact at that scale, else of the inferred decimals;
+      Float32 if no exact tick exists
+    - volume -> Int64 ticks within VOLUME_RTOL (summed qty noise), else kept Float64
+
+    Returns (frame, spec); spec is stored in the parquet metadata for widen_bars.
+    """
+    spec = {"version": 1, "ts": None, "columns": {}}
+    exprs = []
+
+    ts = df[ts_col] if ts_col in df.columns else None
+    if ts is not None and ts.dtype == pl.Datetime and not ts.is_empty():
+        epoch_us = ts.dt.epoch("us")
+        base_us = int(epoch_us[0]) // 1_000_000 * 1_000_000
+        offset_us = epoch_us - base_us
+        whole_seconds = bool((offset_us % 1_000_000 == 0).all())
+        if whole_seconds and int(offset_us.max()) // 1_000_000 < 2 ** 31:
+            spec["ts"] = {"base_us": base_us, "tz": ts.dtype.time_zone}
+            exprs.append(((pl.col(ts_col).dt.epoch("us") - base_us) // 1_000_000).cast(pl.Int32))
+
+    for col in PRICE_COLS + [VOLUME_COL]:
+        if col not in df.columns:
+            continue
+        if col in PRICE_COLS and price_decimals is not None and _round_trips(
+                df[col].drop_nulls().cast(pl.Float64).to_numpy(), price_decimals):
+            # Tick size changes over a symbol's life: older bars may need more decimals
+            decimals = price_decimals
+        elif col in PRICE_COLS:
+            decimals = infer_decimals(df[col])
+        else:
+            decimals = infer_decimals(df[col], rtol=VOLUME_RTOL)
+
+        if decimals is not None:
+            spec["columns"][col] = {"kind": "scaled", "decimals": decimals}
+            exprs.append((pl.col(col) * 10.0 ** decimals).round(0).cast(pl.Int64))
+        elif col in PRICE_COLS:
+            spec["columns"][col] = {"kind": "float32"}
+            exprs.append(pl.col(col).cast(pl.Float32))
+
+    return df.with_columns(exprs), spec
+
+
+def _unscale(values: pl.Series, decimals: int) -> pl.Series:
+    # True division (not x * 0.001) so ticks widen to the exact original floats
+    out = values.to_numpy().astype(np.float64)
+    np.divide(out, 10.0 ** decimals, out=out)
+    return pl.Series(values.name, out)
+
+
+def _widen_exprs(spec: Dict, columns: Sequence[str], ts_col: str = TS_COL) -> List[pl.Expr]:
+    exprs = []
+
+    ts_spec = spec.get("ts")
+    if ts_spec and ts_col in columns:
+        ts = (pl.col(ts_col).cast(pl.Int64) * 1_000_000 + ts_spec["base_us"]).cast(pl.Datetime("us"))
+        if ts_spec.get("tz"):
+            ts = ts.dt.replace_time_zone("UTC").dt.convert_time_zone(ts_spec["tz"])
+        exprs.append(ts.alias(ts_col))
+
+    for col, col_spec in spec.get("columns", {}).items():
+        if col not in columns:
+            continue
+        if col_spec["kind"] == "scaled":
+            decimals = col_spec["decimals"]
+            exprs.append(pl.col(col).map_batches(lambda s, d=decimals: _unscale(s, d), return_dtype=pl.Float64))
+        else:
+            exprs.append(pl.col(col).cast(pl.Float64))
+    return exprs
+
+
+def widen_bars(df: pl.DataFrame, spec: Dict, ts_col: str = TS_COL) -> pl.DataFrame:
+    """Inverse of compact_bars: restores the default (Float64 / tz-aware datetime) schema."""
+    exprs = _widen_exprs(spec, df.columns, ts_col)
+    return df.with_columns(exprs) if exprs else df
+
+
+def read_bar_metadata(path: Union[str, Path]) -> Dict[bytes, bytes]:
+    """Parquet schema key/value metadata (footer only, no data pages are read)."""
+    try:
+        return pq.read_schema(str(path)).metadata or {}
+    except Exception as e:
+        logger.warning(f"Could not read parquet schema for {path}: {e}")
+        return {}
+
+
+def is_sorted_on_write(path: Union[str, Path], metadata: Optional[Dict[bytes, bytes]] = None) -> bool:
+    """Checks the parquet footer for the sorted/unique flag."""
+    if metadata is None:
+        metadata = read_bar_metadata(path)
+    return metadata.get(SORTED_METADATA_KEY) == b"true"
+
+
+def read_bar_file(
+    path: Union[str, Path],
+    metadata: Optional[Dict[bytes, bytes]] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> pl.DataFrame:
+    """
+    Reads one bar file, widening compact-profile files to the default schema.
+    columns: projection; names absent from the file are ignored.
+    """
+    if metadata is None:
+        metadata = read_bar_metadata(path)
+    if columns is not None:
+        available = pl.read_parquet_schema(path)
+        columns = [c for c in columns if c in available]
+    df = pl.read_parquet(path, columns=columns)
+    spec = metadata.get(COMPACT_METADATA_KEY)
+    if spec:
+        df = widen_bars(df, json.loads(spec))
+    return df
+
+
+def list_bar_files(path: Union[str, Path]) -> List[Path]:
+    """
+    Returns bar files for a dataset path in time order.
+    Directory: raw/SYMBOL/TF/*.parquet (week filenames sort chronologically).
+    File: the file itself.
+    """
+    p = Path(path)
+    if p.is_dir():
+        return sorted(p.glob("*.parquet"))
+    return [p]
+
+
+def list_datasets(data_dir: Union[str, Path], tf_filter: Optional[str] = None) -> List[Path]:
+    """
+    Backtest universe under data_dir, one entry per (symbol, TF).
+    New mode: data_dir/raw/SYMBOL/TF directories of weekly files.
+    Legacy mode: data_dir/SYMBOL_TF.parquet files.
+    """
+    base = Path(data_dir)
+    raw = base / "raw"
+    if raw.exists():
+        datasets = []
+        for sym_dir in sorted(d for d in raw.iterdir() if d.is_dir()):
+            for tf_dir in sorted(d for d in sym_dir.iterdir() if d.is_dir()):
+                if tf_filter and tf_dir.name != tf_filter:
+                    continue
+                datasets.append(tf_dir)
+        return datasets
+
+    if not base.exists():
+        return []
+    files = sorted(base.glob("*.parquet"))
+    if tf_filter:
+        files = [f for f in files if f.name.endswith(f"_{tf_filter}.parquet")]
+    return files
+
+
+def dataset_id(dataset: Union[str, Path]) -> Tuple[str, str]:
+    """(symbol, timeframe) of a dataset: raw/SYMBOL/TF directory or legacy SYMBOL_TF.parquet."""
+    p = Path(dataset)
+    if p.is_dir():
+        return p.parent.name, p.name
+    symbol, _, tf = p.stem.rpartition("_")
+    return symbol, tf
+
+
+def list_symbol_timeframes(data_dir: Union[str, Path]) -> Dict[str, Dict[str, Path]]:
+    """Universe grouped by symbol: {symbol: {timeframe: dataset path}}."""
+    grouped: Dict[str, Dict[str, Path]] = {}
+    for dataset in list_datasets(data_dir):
+        symbol, tf = dataset_id(dataset)
+        grouped.setdefault(symbol, {})[tf] = dataset
+    return grouped
+
+
+def read_bars(path: Union[str, Path], ts_col: str = TS_COL, columns: Optional[Sequence[str]] = None) -> pl.DataFrame:
+    """
+    Loads a bar file or a weekly dataset directory, sorted and unique on ts_col.
+
+    Files written by write_bars are trusted as-is; only the boundaries between
+    consecutive files are checked. Legacy files fall back to sort + unique.
+    Compact-profile files are widened to the default schema.
+    columns: optional projection (ts_col is always kept for ordering).
+    """
+    files = list_bar_files(path)
+    if not files:
+        return pl.DataFrame()
+
+    if columns is not None and ts_col not in columns:
+        columns = [ts_col, *columns]
+
+    frames = []
+    trusted = True
+    for f in files:
+        metadata = read_bar_metadata(f)
+        frames.append(read_bar_file(f, metadata, columns))
+        trusted = trusted and is_sorted_on_write(f, metadata)
+    return concat_bars(frames, trusted, ts_col)
+
+
+def concat_bars(frames: List[pl.DataFrame], trusted: bool, ts_col: str = TS_COL) -> pl.DataFrame:
+    """
+    Concatenates per-week frames given in time order.
+
+    trusted=True means every frame came from write_bars; only the boundaries
+    between consecutive frames are checked. Otherwise falls back to sort + unique.
+    """
+    frames = [f for f in frames if not f.is_empty()]
+    if not frames:
+        return pl.DataFrame()
+
+    if ts_col not in frames[0].columns:
+        # Legacy schema without ts_1s (e.g. open_time): nothing to guarantee
+        return pl.concat(frames) if len(frames) > 1 else frames[0]
+
+    if trusted:
+        # Each frame is sorted/unique; the concat is too if frames don't overlap.
+        for prev, nxt in zip(frames, frames[1:]):
+            if nxt[ts_col][0] <= prev[ts_col][-1]:
+                trusted = False
+                break
+
+    df = pl.concat(frames) if len(frames) > 1 else frames[0]
+
+    if trusted:
+        return df.set_sorted(ts_col)
+
+    logger.debug("Bars without sorted flag (or overlapping), sorting on read")
+    return ensure_sorted_unique(df, ts_col)
+
+
+def scan_bar_files(files: Sequence[Union[str, Path]], ts_col: str = TS_COL, path_col: str = "path") -> pl.LazyFrame:
+    """
+    One lazy query over many bar files, with the source file in `path_col`.
+
+    Default-profile files written by write_bars go through a single scan_parquet.
+    Compact files are widened per file (their scale/offsets live in the footer)
+    and legacy files are sorted + deduplicated per file, as in read_bars.
+    """
+    plain, frames = [], []
+    for f in files:
+        metadata = read_bar_metadata(f)
+        spec = metadata.get(COMPACT_METADATA_KEY)
+        if spec:
+            lf = pl.scan_parquet(f).with_columns(pl.lit(str(f)).alias(path_col))
+            frames.append(lf.with_columns(_widen_exprs(json.loads(spec), lf.collect_schema().names(), ts_col)))
+        elif is_sorted_on_write(f, metadata):
+            plain.append(str(f))
+        else:
+            lf = pl.scan_parquet(f).with_columns(pl.lit(str(f)).alias(path_col))
+            if ts_col in lf.collect_schema().names():
+                lf = lf.sort(ts_col, maintain_order=True).unique(subset=[ts_col], keep="first", maintain_order=True)
+            frames.append(lf)
+
+    if plain:
+        frames.insert(0, pl.scan_parquet(plain, include_file_paths=path_col))
+    if not frames:
+        return pl.LazyFrame()
+    return pl.concat(frames, how="diagonal_relaxed") if len(frames) > 1 else frames[0]
+
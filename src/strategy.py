@@ -1,36 +1,38 @@
 import polars as pl
+from typing import List, TypeVar
 
-def detect_signals(df: pl.DataFrame) -> pl.DataFrame:
+Frame = TypeVar("Frame", pl.DataFrame, pl.LazyFrame)
+
+# 2% change -> 0.02
+# 80% marubozu -> 0.8
+CHANGE_THRESHOLD = 0.02
+MARUBOZU_THRESHOLD = 0.80
+
+def signal_columns() -> List[pl.Expr]:
+    """
+    Signal columns as pure expressions (usable on eager frames and lazy scans):
+    1. Candle Change > 2% (High Volatility)
+    2. Marubozu Ratio > 80% (Body / Range)
+    """
+    body_size = (pl.col("close") - pl.col("open")).abs()
+    range_size = pl.col("high") - pl.col("low")
+    change_pct = ((pl.col("close") - pl.col("open")) / pl.col("open")).abs()
+
+    # Calculate Marubozu Ratio safely (High==Low -> 0)
+    marubozu_ratio = pl.when(range_size > 0).then(body_size / range_size).otherwise(0.0)
+
+    return [
+        body_size.alias("body_size"),
+        range_size.alias("range_size"),
+        change_pct.alias("change_pct"),
+        marubozu_ratio.alias("marubozu_ratio"),
+        ((change_pct > CHANGE_THRESHOLD) & (marubozu_ratio > MARUBOZU_THRESHOLD)).alias("signal_entry"),
+    ]
+
+def detect_signals(df: Frame) -> Frame:
     """
-    Adds signal columns to the DataFrame based on:
+    Adds signal columns to the DataFrame (or LazyFrame) based on:
     1. Candle Change > 2% (High Volatility)
     2. Marubozu Ratio > 80% (Body / Range)
     """
-    # Create necessary calculations
-    # Polars is lazy-friendly, but we'll do eager for simplicity in this context or use expressions
-    
-    # Avoid division by zero: if Open is 0 (unlikely) or High==Low
-    
-    df = df.with_columns([
-        (pl.col("close") - pl.col("open")).abs().alias("body_size"),
-        (pl.col("high") - pl.col("low")).alias("range_size"),
-        ((pl.col("close") - pl.col("open")) / pl.col("open")).abs().alias("change_pct")
-    ])
-    
-    # Calculate Marubozu Ratio safely
-    df = df.with_columns(
-        pl.when(pl.col("range_size") > 0)
-        .then(pl.col("body_size") / pl.col("range_size"))
-        .otherwise(0.0)
-        .alias("marubozu_ratio")
-    )
-    
-    # Define Signal Condition
-    # 2% change -> 0.02
-    # 80% marubozu -> 0.8
-    
-    df = df.with_columns(
-        ((pl.col("change_pct") > 0.02) & (pl.col("marubozu_ratio") > 0.80)).alias("signal_entry")
-    )
-    
-    return df
+    return df.with_columns(signal_columns())
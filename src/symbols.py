@@ -0,0 +1,236 @@
+"""
+Cached USDT-M perpetual symbol registry.
+
+Keeps every symbol ever seen on /fapi/v1/exchangeInfo with its listing and
+delisting dates (UTC days, matching data.binance.vision daily files):
+
+    meta/symbols.json
+    {
+        "fetched_at": "2024-01-01T00:00:00+00:00",
+        "symbols": {
+            "BTCUSDT": {"listed": "2019-09-08", "delisted": null, "status": "TRADING", "last_seen": "2024-01-01",
+                        "tick_size": "0.10"},
+            ...
+        }
+    }
+
+The registry is refreshed when older than config.SYMBOL_REGISTRY_TTL_HOURS.
+If the API is unreachable (or offline=True) the cached copy is used as-is.
+Symbols that disappear from exchangeInfo are kept and marked delisted, so
+history for them is not silently dropped.
+
+Usage:
+    python -m src.symbols refresh
+    python -m src.symbols list --all
+"""
+
+import json
+import logging
+from decimal import Decimal
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import requests
+
+from src import config
+
+logger = logging.getLogger("symbols")
+
+REGISTRY_FILE = config.META_DIR / "symbols.json"
+
+# Perpetuals report a placeholder deliveryDate far in the future
+_NO_DELIVERY_YEAR = 2100
+
+# exchangeInfo statuses after which no new daily files appear
+DELISTED_STATUSES = {"SETTLING", "CLOSE", "DELIVERING", "DELIVERED", "DELISTED"}
+
+
+def load_registry() -> Dict:
+    if REGISTRY_FILE.exists():
+        try:
+            with open(REGISTRY_FILE, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load symbol registry: {e}")
+    return {"fetched_at": None, "symbols": {}}
+
+
+def save_registry(registry: Dict):
+    try:
+        tmp = REGISTRY_FILE.with_suffix(".json.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(registry, f, indent=4, sort_keys=True)
+        tmp.replace(REGISTRY_FILE)
+    except Exception as e:
+        logger.error(f"Failed to save symbol registry: {e}")
+
+
+def _ms_to_day(ms: Optional[int]) -> Optional[str]:
+    if not ms:
+        return None
+    day = datetime.fromtimestamp(ms / 1000, tz=timezone.utc).date()
+    if day.year >= _NO_DELIVERY_YEAR:
+        return None
+    return day.isoformat()
+
+
+def fetch_exchange_symbols() -> Dict[str, Dict]:
+    """All USDT-M perpetual symbols from exchangeInfo (any status)."""
+    url = f"{config.BINANCE_FAPI_BASE_URL}/fapi/v1/exchangeInfo"
+    response = requests.get(url, timeout=10)
+    response.raise_for_status()
+    data = response.json()
+
+    symbols = {}
+    for s in data['symbols']:
+        if s.get('contractType') != 'PERPETUAL' or s.get('quoteAsset') != 'USDT':
+            continue
+        delisted = s.get('status') in DELISTED_STATUSES
+        price_filter = next((f for f in s.get('filters', []) if f.get('filterType') == 'PRICE_FILTER'), {})
+        symbols[s['symbol']] = {
+            "listed": _ms_to_day(s.get('onboardDate')),
+            "delisted": _ms_to_day(s.get('deliveryDate')) if delisted else None,
+            "status": s.get('status'),
+            "tick_size": price_filter.get('tickSize'),
+        }
+    return symbols
+
+
+def merge_registry(registry: Dict, fetched: Dict[str, Dict], today: Optional[date] = None) -> Dict:
+    """Merges a fresh exchangeInfo snapshot into the registry (never drops symbols)."""
+    today = today or datetime.now(timezone.utc).date()
+    known = registry.setdefault("symbols", {})
+
+    for sym, info in fetched.items():
+        entry = known.setdefault(sym, {})
+        entry["listed"] = info["listed"] or entry.get("listed")
+        entry["status"] = info["status"]
+        entry["tick_size"] = info.get("tick_size") or entry.get("tick_size")
+        if info["status"] in DELISTED_STATUSES:
+            entry["delisted"] = info["delisted"] or entry.get("delisted") or today.isoformat()
+        else:
+            entry["delisted"] = None
+        entry["last_seen"] = today.isoformat()
+
+    # Gone from exchangeInfo entirely: delisted since the last time we saw it
+    for sym, entry in known.items():
+        if sym not in fetched and entry.get("status") != "DELISTED":
+            entry["status"] = "DELISTED"
+            entry["delisted"] = entry.get("delisted") or entry.get("last_seen") or today.isoformat()
+
+    registry["fetched_at"] = datetime.now(timezone.utc).isoformat()
+    return registry
+
+
+def _is_expired(registry: Dict, ttl_hours: float) -> bool:
+    fetched_at = registry.get("fetched_at")
+    if not fetched_at:
+        return True
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(fetched_at)
+    return age > timedelta(hours=ttl_hours)
+
+
+def get_registry(force_refresh: bool = False, offline: bool = False, ttl_hours: Optional[float] = None) -> Dict:
+    """
+    Returns the symbol registry, refreshing it from the API when the TTL expired.
+    Falls back to the cached copy if the API is unreachable; raises only if there is no cache.
+    """
+    ttl_hours = config.SYMBOL_REGISTRY_TTL_HOURS if ttl_hours is None else ttl_hours
+    registry = load_registry()
+
+    if offline or not (force_refresh or _is_expired(registry, ttl_hours)):
+        if not registry["symbols"]:
+            raise RuntimeError(f"Symbol registry is empty ({REGISTRY_FILE}); run without offline mode first")
+        return registry
+
+    try:
+        fetched = fetch_exchange_symbols()
+    except Exception as e:
+        if registry["symbols"]:
+            logger.warning(f"Failed to refresh symbols ({e}); using cached registry from {registry['fetched_at']}")
+            return registry
+        logger.error(f"Failed to fetch symbols and no cached registry: {e}")
+        raise
+
+    registry = merge_registry(registry, fetched)
+    save_registry(registry)
+    logger.info(f"Symbol registry refreshed: {len(registry['symbols'])} symbols")
+    return registry
+
+
+def _day(value) -> date:
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).date() if value.tzinfo else value.date()
+    return value
+
+
+def active_symbols(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    registry: Optional[Dict] = None,
+    **registry_kwargs,
+) -> List[str]:
+    """
+    Symbols with data in [start, end] (UTC days, inclusive).
+    Without a range: currently TRADING symbols only.
+    """
+    registry = registry or get_registry(**registry_kwargs)
+    symbols = []
+    for sym, entry in sorted(registry["symbols"].items()):
+        if start is None and end is None:
+            if entry.get("status") == "TRADING":
+                symbols.append(sym)
+            continue
+        if end is not None and entry.get("listed") and date.fromisoformat(entry["listed"]) > _day(end):
+            continue
+        if start is not None and entry.get("delisted") and date.fromisoformat(entry["delisted"]) < _day(start):
+            continue
+        symbols.append(sym)
+    return symbols
+
+
+def has_data_on(symbol: str, day, registry: Dict) -> bool:
+    """
+    False only when the day is provably outside [listed, delisted] (guaranteed 404).
+    Unknown symbols/dates return True so the download is still attempted.
+    """
+    entry = registry.get("symbols", {}).get(symbol)
+    if not entry:
+        return True
+    day = _day(day)
+    if entry.get("listed") and day < date.fromisoformat(entry["listed"]):
+        return False
+    if entry.get("delisted") and day > date.fromisoformat(entry["delisted"]):
+        return False
+    return True
+
+
+def price_decimals(symbol: str, registry: Optional[Dict] = None) -> Optional[int]:
+    """
+    Decimals of the symbol's current tick size (tickSize "0.00100" -> 3), used
+    as the compact storage scale. None if unknown (the scale is then inferred).
+    """
+    registry = registry if registry is not None else load_registry()
+    tick = registry.get("symbols", {}).get(symbol, {}).get("tick_size")
+    if not tick:
+        return None
+    return max(0, -Decimal(tick).normalize().as_tuple().exponent)
+
+
+if __name__ == "__main__":
+    import argparse
+    from src.utils import setup_logging
+    setup_logging("symbols")
+
+    parser = argparse.ArgumentParser(description="USDT-M symbol registry")
+    parser.add_argument("command", choices=["refresh", "list"])
+    parser.add_argument("--all", action="store_true", help="Include delisted symbols")
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        get_registry(force_refresh=True)
+    else:
+        reg = get_registry()
+        for sym, entry in sorted(reg["symbols"].items()):
+            if args.all or entry.get("status") == "TRADING":
+                print(f"{sym:<20} {entry.get('status', ''):<16} listed={entry.get('listed')} delisted={entry.get('delisted')}")
@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+import polars as pl
 import pytz
 
 # Constants
@@ -84,3 +85,13 @@ def format_filename_ts(dt: datetime) -> str:
 
 def utc_to_ist(dt_utc):
     return dt_utc.astimezone(TZ_IST)
+
+def week_start_expr(col: str) -> pl.Expr:
+    """
+    Start of the IST week (Sunday 03:00 Europe/Istanbul) containing each value
+    of a timezone-aware datetime column, as a Polars expression.
+    """
+    local = pl.col(col).dt.convert_time_zone(TZ_IST.zone)
+    # Shift so the week boundary falls on Monday 00:00, truncate, shift back
+    monday = local.dt.offset_by("-3h").dt.offset_by("1d").dt.truncate("1w")
+    return monday.dt.offset_by("-1d").dt.offset_by("3h")
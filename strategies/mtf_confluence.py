@@ -0,0 +1,40 @@
+import polars as pl
+
+from backtest_framework import MultiTimeframeStrategy
+from conditions.signal_batch import SignalFeatures
+
+class MtfPumpTrend(MultiTimeframeStrategy):
+    """
+    Fast-TF pump + marubozu entry, only while the higher-TF EMA chain agrees
+    (e.g. "5s pump while the 1m chain is all_bull").
+    The chain is computed on the native trend-TF bars, then aligned as-of.
+    """
+    required_columns = ('open', 'high', 'low', 'close')
+
+    def __init__(self, tp=0.04, sl=0.02, side='SHORT', pump_threshold=0.02, marubozu_threshold=0.80,
+                 base_timeframes=('5s',), trend_timeframe='1m', trend_ema='all_bull',
+                 bet_size=7.0, tsl=0.0, **kwargs):
+        super().__init__(bet_size=bet_size, tsl=tsl)
+        self.tp = tp
+        self.sl = sl
+        self.side = side
+        self.pump_threshold = pump_threshold
+        self.marubozu_threshold = marubozu_threshold
+        self.base_timeframes = tuple(base_timeframes)
+        self.trend_timeframe = trend_timeframe
+        self.trend_ema = trend_ema.lower()
+        self.context_columns = {trend_timeframe: ('open', 'high', 'low', 'close')}
+
+    def context(self, tf, bars):
+        # Same chain (and tolerances) as VectorizedStrategy's ema filter, on the trend TF
+        trend = SignalFeatures(bars.select(self.context_columns[tf]).to_pandas()).ema_filter(self.trend_ema)
+        return pl.DataFrame({"trend": trend})
+
+    def signals(self, bars):
+        pump_pct = (pl.col("close") - pl.col("open")) / pl.col("open")
+        body = (pl.col("close") - pl.col("open")).abs()
+        rng = pl.col("high") - pl.col("low")
+        is_marubozu = (rng > 0) & (body / rng >= self.marubozu_threshold)
+        # Before the first closed trend bar the joined value is null -> no entry
+        trend = pl.col(f"trend_{self.trend_timeframe}").fill_null(False)
+        return (pump_pct > self.pump_threshold) & is_marubozu & trend
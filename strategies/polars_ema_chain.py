@@ -1,107 +1,89 @@
 import polars as pl
-import numpy as np
 
-class PolarsEmaChain:
+from backtest_framework import SignalStrategy
+
+class PolarsEmaChain(SignalStrategy):
     """
     Turbo-Charged EMA Chain Strategy using Polars.
     Replaces both 'conditions' and 'actions' files.
+    Signal protocol: the engine loads the bars; signals() only builds the expression.
     """
-    def __init__(self, tp=0.04, sl=0.04, trend='BULLISH', pump_threshold=0.02, **kwargs):
+    required_columns = ('open', 'high', 'low', 'close')
+    # Materialized change/marubozu are reused when present (EMA tolerances differ from the bitmask)
+    feature_columns = ('change_pct', 'marubozu_ratio')
+
+    def __init__(self, tp=0.04, sl=0.04, trend='BULLISH', pump_threshold=0.02, side='SHORT',
+                 bet_size=7.0, tsl=0.0, **kwargs):
+        super().__init__(bet_size=bet_size, tsl=tsl)
         self.tp = tp
         self.sl = sl
+        self.side = side
         self.trend = trend.upper() # BULLISH, BEARISH, NONE
         self.pump_threshold = pump_threshold
         self.ema_periods = [9, 20, 50, 100, 200, 300, 500, 1000, 2000, 5000]
 
-    def process_file(self, filepath: str):
-        """
-        Reads parquet, calculates indicators, generates signals.
-        Returns a list of Trade Dicts (Simulated).
-        """
-        try:
-            # 1. Read Data (Scan Parquet is faster)
-            df = pl.read_parquet(filepath)
-            if df.is_empty(): return []
-            
-            # Ensure sorting
-            if 'open_time' in df.columns:
-                df = df.sort('open_time')
-            elif 'ts_1s' in df.columns:
-                df = df.sort('ts_1s')
-                
-            # 2. Add EMA Columns
-            # Polars ewm_mean is available in recent versions
-            exprs = []
-            for p in self.ema_periods:
-                exprs.append(pl.col("close").ewm_mean(span=p, adjust=False, min_periods=p).alias(f"ema_{p}"))
-            
-            df = df.with_columns(exprs)
-            
-            # 3. Define Logic Expressions
-            
-            trend_condition = None
-            
-            if self.trend == 'BULLISH':
-                # Small Bull: 9 > 20 > 50 > 100 > 200
-                small_bull = (
-                    (pl.col("ema_9") > pl.col("ema_20") * 1.0000001) &
-                    (pl.col("ema_20") > pl.col("ema_50") * 1.0000001) &
-                    (pl.col("ema_50") > pl.col("ema_100") * 1.0000001) &
-                    (pl.col("ema_100") > pl.col("ema_200") * 1.0000001)
-                )
-                # Big Bull: 300 > 500 > 1000 > 2000 > 5000
-                big_bull = (
-                    (pl.col("ema_300") > pl.col("ema_500") * 1.000001) &
-                    (pl.col("ema_500") > pl.col("ema_1000") * 1.000001) &
-                    (pl.col("ema_1000") > pl.col("ema_2000") * 1.000001) &
-                    (pl.col("ema_2000") > pl.col("ema_5000") * 1.000001)
-                )
-                trend_condition = small_bull & big_bull
-                
-            elif self.trend == 'BEARISH':
-                 # Small Bear: 9 < 20 < 50 < 100 < 200
-                small_bear = (
-                    (pl.col("ema_9") < pl.col("ema_20") * 0.9999999) &
-                    (pl.col("ema_20") < pl.col("ema_50") * 0.9999999) &
-                    (pl.col("ema_50") < pl.col("ema_100") * 0.9999999) &
-                    (pl.col("ema_100") < pl.col("ema_200") * 0.9999999)
-                )
-                # Big Bear: 300 < 500 < 1000 < 2000 < 5000
-                big_bear = (
-                    (pl.col("ema_300") < pl.col("ema_500") * 0.999999) &
-                    (pl.col("ema_500") < pl.col("ema_1000") * 0.999999) &
-                    (pl.col("ema_1000") < pl.col("ema_2000") * 0.999999) &
-                    (pl.col("ema_2000") < pl.col("ema_5000") * 0.999999)
-                )
-                trend_condition = small_bear & big_bear
-                
-            else: # NONE or any other string
-                # Always True (No trend filter)
-                trend_condition = pl.lit(True)
+    @property
+    def warmup_bars(self):
+        # Trend filters need the slowest EMA (min_samples) before they can be True
+        return self.ema_periods[-1] - 1 if self.trend in ('BULLISH', 'BEARISH') else 0
+
+    def signals(self, bars: pl.DataFrame) -> pl.Expr:
+        """Trend + Pump + Marubozu entry expression over the bar columns."""
+        ema = {p: pl.col("close").ewm_mean(span=p, adjust=False, min_samples=p) for p in self.ema_periods}
+
+        if self.trend == 'BULLISH':
+            # Small Bull: 9 > 20 > 50 > 100 > 200
+            small_bull = (
+                (ema[9] > ema[20] * 1.0000001) &
+                (ema[20] > ema[50] * 1.0000001) &
+                (ema[50] > ema[100] * 1.0000001) &
+                (ema[100] > ema[200] * 1.0000001)
+            )
+            # Big Bull: 300 > 500 > 1000 > 2000 > 5000
+            big_bull = (
+                (ema[300] > ema[500] * 1.000001) &
+                (ema[500] > ema[1000] * 1.000001) &
+                (ema[1000] > ema[2000] * 1.000001) &
+                (ema[2000] > ema[5000] * 1.000001)
+            )
+            trend_condition = small_bull & big_bull
 
-            
-            # --- Pump & Marubozu ---
+        elif self.trend == 'BEARISH':
+            # Small Bear: 9 < 20 < 50 < 100 < 200
+            small_bear = (
+                (ema[9] < ema[20] * 0.9999999) &
+                (ema[20] < ema[50] * 0.9999999) &
+                (ema[50] < ema[100] * 0.9999999) &
+                (ema[100] < ema[200] * 0.9999999)
+            )
+            # Big Bear: 300 < 500 < 1000 < 2000 < 5000
+            big_bear = (
+                (ema[300] < ema[500] * 0.999999) &
+                (ema[500] < ema[1000] * 0.999999) &
+                (ema[1000] < ema[2000] * 0.999999) &
+                (ema[2000] < ema[5000] * 0.999999)
+            )
+            trend_condition = small_bear & big_bear
+
+        else: # NONE or any other string
+            # Always True (No trend filter)
+            trend_condition = pl.lit(True)
+
+        # --- Pump & Marubozu ---
+        if all(c in bars.columns for c in self.feature_columns):
+            # Precomputed at ingest (src/features.py); ratio is 0 for flat bars
+            is_pump = pl.col("change_pct") > self.pump_threshold
+            is_marubozu = pl.col("marubozu_ratio") >= 0.80
+        else:
             # Pump > Threshold
-            # Open != 0
             pump_pct = (pl.col("close") - pl.col("open")) / pl.col("open")
             is_pump = (pump_pct > self.pump_threshold)
-            
+
             # Marubozu > 80%
             body = (pl.col("close") - pl.col("open")).abs()
             rng = pl.col("high") - pl.col("low")
-            marubozu_ratio = body / rng
-            is_marubozu = (rng > 0) & (marubozu_ratio >= 0.80)
-            
-            # --- FINAL TRIGGER ---
-            # Trend + Pump + Marubozu -> ENTRY
-            signal = trend_condition & is_pump & is_marubozu
-            
-            # Add signal column to DF
-            df = df.with_columns(signal.alias("entry_signal"))
-            
-            # Return Full DF (needed for Backtest Engine to simulate exits)
-            return df
-            
-        except Exception as e:
-            # print(f"Error {filepath}: {e}")
-            return None
+            is_marubozu = (rng > 0) & (body / rng >= 0.80)
+
+        # --- FINAL TRIGGER ---
+        # Trend + Pump + Marubozu -> ENTRY
+        return (trend_condition & is_pump & is_marubozu).alias("entry_signal")
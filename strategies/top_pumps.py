@@ -0,0 +1,27 @@
+import polars as pl
+
+from backtest_framework import CrossSectionalStrategy
+
+class TopPumps(CrossSectionalStrategy):
+    """
+    Shorts the top_n strongest pump + marubozu bars of the universe at each
+    timestamp (BacktestEngine.run_cross_sectional). Score = pump %.
+    """
+    required_columns = ('open', 'high', 'low', 'close')
+
+    def __init__(self, tp=0.04, sl=0.02, side='SHORT', pump_threshold=0.02, marubozu_threshold=0.80,
+                 top_n=3, bet_size=7.0, tsl=0.0, **kwargs):
+        super().__init__(bet_size=bet_size, tsl=tsl)
+        self.tp = tp
+        self.sl = sl
+        self.side = side
+        self.pump_threshold = pump_threshold
+        self.marubozu_threshold = marubozu_threshold
+        self.top_n = top_n
+
+    def score(self, bars):
+        pump_pct = (pl.col("close") - pl.col("open")) / pl.col("open")
+        body = (pl.col("close") - pl.col("open")).abs()
+        rng = pl.col("high") - pl.col("low")
+        is_marubozu = (rng > 0) & (body / rng >= self.marubozu_threshold)
+        return pl.when((pump_pct > self.pump_threshold) & is_marubozu).then(pump_pct)
@@ -0,0 +1,159 @@
+"""
+Sweep journal for resumable batch backtests (sweep_journal.py)
+==============================================================
+
+BacktestEngine.run_batch(..., journal=SweepJournal()) commits the trades of
+every finished (combination, pair) to SQLite as soon as its task returns, in
+one transaction per task, so a crash, a kill or a failing worker never loses
+more than the tasks in flight. On the next run only the missing
+(combination, pair) tasks are computed; the rest is read back from here.
+
+    meta/sweep_journal.sqlite
+        partials(combo_key, pair, signature, trades BLOB, finished_at)  PK (combo_key, pair)
+        failures(combo_key, pair, attempts, error, failed_at)           PK (combo_key, pair)
+
+combo_key is the canonical key of the strategy parameters (results_db.run_params,
+without engine parameters: partial trades are taken before the pyramid filter).
+signature is hot_cache.source_signature(pair): a partial is reused only while
+the pair's parquet files are unchanged.
+
+Once a combination is stored in the results DB its partials are dropped
+(discard); prune(keep) drops partials left over from combinations that are no
+longer pending (e.g. recorded just before a crash). Pairs that kept failing
+after run_batch's retries stay in failures (python sweep_journal.py status).
+
+    python sweep_journal.py status
+"""
+
+import argparse
+import json
+import pickle
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+from results_db import run_key, run_params
+from src import config, hot_cache
+
+SWEEP_JOURNAL_FILE = config.META_DIR / "sweep_journal.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS partials (
+    combo_key   TEXT NOT NULL,
+    pair        TEXT NOT NULL,
+    signature   TEXT NOT NULL,
+    trades      BLOB NOT NULL,
+    finished_at TEXT NOT NULL,
+    PRIMARY KEY (combo_key, pair)
+);
+CREATE TABLE IF NOT EXISTS failures (
+    combo_key TEXT NOT NULL,
+    pair      TEXT NOT NULL,
+    attempts  INTEGER NOT NULL,
+    error     TEXT,
+    failed_at TEXT NOT NULL,
+    PRIMARY KEY (combo_key, pair)
+);
+"""
+
+
+def pair_signature(pair: str) -> str:
+    return json.dumps(hot_cache.source_signature(pair), separators=(",", ":"))
+
+
+class SweepJournal:
+    """Per-(combination, pair) partial results of a sweep; every write is one SQLite transaction."""
+
+    def __init__(self, path=None):
+        self.path = Path(path or SWEEP_JOURNAL_FILE)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30)
+
+    @staticmethod
+    def combo_key(strategy_class, strategy_kwargs: Dict) -> str:
+        return run_key({"strategy": strategy_class.__name__,
+                        "params": run_params(strategy_class, **strategy_kwargs)["params"]})
+
+    def load(self, combo_keys: Iterable[str], pairs: Sequence[str]) -> Dict[Tuple[str, str], List]:
+        """{(combo_key, pair): trades} of the finished tasks whose pair data is unchanged."""
+        keys = list(dict.fromkeys(combo_keys))
+        signatures = {p: pair_signature(p) for p in pairs}
+        found = {}
+        with closing(self._connect()) as conn:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = conn.execute("SELECT combo_key, pair, signature, trades FROM partials WHERE combo_key IN "
+                                    f"({','.join('?' * len(chunk))})", chunk)
+                for key, pair, signature, blob in rows:
+                    if signatures.get(pair) == signature:
+                        found[(key, pair)] = pickle.loads(blob)
+        return found
+
+    def save(self, pair: str, results: Dict[str, List], signature: str = None):
+        """Commits the trades of one finished task ({combo_key: trades} of one pair) atomically."""
+        signature = signature or pair_signature(pair)
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [(key, pair, signature, pickle.dumps(trades, protocol=pickle.HIGHEST_PROTOCOL), now)
+                for key, trades in results.items()]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO partials VALUES (?, ?, ?, ?, ?)", rows)
+            conn.executemany("DELETE FROM failures WHERE combo_key = ? AND pair = ?", [(k, pair) for k in results])
+
+    def record_failure(self, pair: str, combo_keys: Iterable[str], error: str):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT INTO failures (combo_key, pair, attempts, error, failed_at) VALUES (?, ?, 1, ?, ?) "
+                "ON CONFLICT(combo_key, pair) DO UPDATE SET attempts=attempts+1, "
+                "error=excluded.error, failed_at=excluded.failed_at",
+                [(k, pair, error, now) for k in combo_keys])
+
+    def failures(self) -> List[Dict]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT combo_key, pair, attempts, error, failed_at FROM failures "
+                                "ORDER BY failed_at").fetchall()
+        return [dict(zip(('combo_key', 'pair', 'attempts', 'error', 'failed_at'), r)) for r in rows]
+
+    def discard(self, combo_keys: Iterable[str]):
+        """Drops the partials of combinations whose result is stored elsewhere (failures stay for review)."""
+        keys = [(k,) for k in combo_keys]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM partials WHERE combo_key = ?", keys)
+
+    def clear_failures(self) -> int:
+        with closing(self._connect()) as conn, conn:
+            return conn.execute("DELETE FROM failures").rowcount
+
+    def prune(self, keep: Set[str]) -> int:
+        """Drops partials of every combination not in `keep`; returns how many combinations."""
+        with closing(self._connect()) as conn:
+            stale = {k for (k,) in conn.execute("SELECT DISTINCT combo_key FROM partials")} - set(keep)
+        self.discard(stale)
+        return len(stale)
+
+    def counts(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            partials, combos = conn.execute("SELECT COUNT(*), COUNT(DISTINCT combo_key) FROM partials").fetchone()
+            (failed,) = conn.execute("SELECT COUNT(*) FROM failures").fetchone()
+        return {'partials': partials, 'combinations': combos, 'failures': failed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep journal of resumable batch backtests")
+    parser.add_argument("command", choices=["status", "clear"])
+    parser.add_argument("--journal", default=str(SWEEP_JOURNAL_FILE))
+    args = parser.parse_args()
+
+    journal = SweepJournal(args.journal)
+    if args.command == "clear":
+        print(f"🧹 Dropped partials of {journal.prune(set())} combinations, {journal.clear_failures()} failures")
+    print(f"📓 {journal.counts()}")
+    for f in journal.failures()[-10:]:
+        print(f"   ⚠️  {Path(f['pair']).name} x{f['attempts']}: {f['error']}")
@@ -0,0 +1,77 @@
+"""
+Shared synthetic market data for the tests.
+
+    make_bars(n, seed)                  pandas OHLCV random walk (every EMA regime occurs)
+    write_dataset(root, n)              root/raw/BTCUSDT/5s with one weekly file
+    write_universe(root, seeds, n)      root/raw/S{k}USDT/5s, one pair per seed
+    emas                                every ema filter name of VectorizedStrategy
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+
+from src import storage
+
+EMAS = ["none", "all_bear", "all_bull", "big_bear", "big_bull", "small_bear", "small_bull",
+        "big_bear_small_bull", "big_bull_small_bear"]
+
+
+def _bars(n=12_000, seed=7):
+    rng = np.random.default_rng(seed)
+    # Long trending legs so every EMA regime occurs at least somewhere
+    drift = np.repeat(rng.choice([-1, 1], size=n // 3000 + 1), 3000)[:n] * 2e-4
+    closes = 100 * np.exp(np.cumsum(drift + rng.normal(0, 2e-3, n)))
+    opens = np.r_[closes[0], closes[:-1]]
+    wick = np.abs(rng.normal(0, 5e-4, n)) * closes
+    return pd.DataFrame({
+        "open": opens,
+        "high": np.maximum(opens, closes) + wick,
+        "low": np.minimum(opens, closes) - wick,
+        "close": closes,
+        "volume": 1.0,
+    })
+
+
+def _timed_bars(n, seed=7):
+    """_bars as Polars with naive 5s ts_1s from 2024-01-01."""
+    return pl.from_pandas(_bars(n=n, seed=seed)).with_columns(
+        pl.Series("ts_1s", [datetime(2024, 1, 1) + timedelta(seconds=5 * i) for i in range(n)])
+    )
+
+
+def _write_dataset(root, n=12_000):
+    tf_dir = root / "raw" / "BTCUSDT" / "5s"
+    tf_dir.mkdir(parents=True)
+    storage.write_bars(_timed_bars(n), tf_dir / "2024-01-01_to_2024-01-08.parquet")
+    return tf_dir
+
+
+def _write_universe(root, seeds=(3, 5, 7), n=6_000):
+    for k, seed in enumerate(seeds):
+        tf_dir = root / "raw" / f"S{k}USDT" / "5s"
+        tf_dir.mkdir(parents=True)
+        storage.write_bars(_timed_bars(n, seed), tf_dir / "2024-01-01.parquet")
+
+
+@pytest.fixture
+def make_bars():
+    return _bars
+
+
+@pytest.fixture
+def write_dataset():
+    return _write_dataset
+
+
+@pytest.fixture
+def write_universe():
+    return _write_universe
+
+
+@pytest.fixture
+def emas():
+    return EMAS
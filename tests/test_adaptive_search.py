@@ -0,0 +1,58 @@
+import pytest
+from adaptive_search import AdaptiveSearch, tpe_propose
+from backtest_framework import BacktestEngine
+from conditions.vectorized_strategy import VectorizedStrategy
+from sweep_journal import SweepJournal
+
+SPACE = {"side": ["SHORT", "LONG"], "tp": [0.004, 0.008, 0.012], "sl": [0.004, 0.008, 0.012]}
+FIXED = dict(cond="pump", pump_threshold=0.003, marubozu_threshold=0.6, ema="none", max_positions=1, avg_threshold=0.0)
+
+def test_tpe_prefers_the_good_region():
+    space = {"tp": list(range(1, 11)), "side": ["SHORT", "LONG"]}
+    good = [{"tp": 9, "side": "LONG"}, {"tp": 10, "side": "LONG"}]
+    bad = [{"tp": t, "side": s} for t in range(1, 6) for s in ("SHORT", "LONG")]
+    proposals = tpe_propose(space, good, bad, 3, exclude={(9, "LONG"), (10, "LONG")})
+    assert len(proposals) == 3
+    assert all(p["tp"] >= 7 for p in proposals)
+    assert proposals[0] == {"tp": 8, "side": "LONG"}
+
+def test_search_finds_top_results_with_less_work(tmp_path, write_universe):
+    write_universe(tmp_path / "data", seeds=(3, 5, 7, 11, 13, 17, 19, 23, 29), n=4_000)
+    engine = BacktestEngine(str(tmp_path / "data"))
+    recorded = []
+    search = AdaptiveSearch(engine, VectorizedStrategy, SPACE, fixed=FIXED, eta=3, min_pairs=1,
+                            journal=SweepJournal(tmp_path / "journal.sqlite"), parallel=False,
+                            on_result=lambda point, trades: recorded.append(point))
+    assert search.rungs() == [1, 3, 9]
+    top, summary = search.run(top_k=3, refine_rounds=1, per_round=2)
+
+    grid = search.grid()
+    frames = engine.run_batch(VectorizedStrategy, [dict(FIXED, **p) for p in grid], parallel=False)
+    exhaustive = sorted((f["pnl_usd"].sum() if len(f) else 0.0 for f in frames), reverse=True)
+    assert top["score"].iloc[0] == pytest.approx(exhaustive[0])
+    assert summary["full_runs"] == len(recorded) >= 3
+    assert summary["cost"] < 0.6
+    # Full-universe scores equal the exhaustive run of the same point
+    by_point = {tuple(p.values()): (f["pnl_usd"].sum() if len(f) else 0.0) for p, f in zip(grid, frames)}
+    for row in top.itertuples():
+        assert row.score == pytest.approx(by_point[(row.side, row.tp, row.sl)])
+
+def test_pairs_failing_after_retries_are_not_full_results(tmp_path, monkeypatch, write_universe):
+    write_universe(tmp_path / "data", n=4_000)
+    engine = BacktestEngine(str(tmp_path / "data"))
+    recorded = []
+    search = AdaptiveSearch(engine, VectorizedStrategy, SPACE, fixed=FIXED, min_pairs=3,
+                            journal=SweepJournal(tmp_path / "journal.sqlite"), parallel=False,
+                            on_result=lambda point, trades: recorded.append(point))
+    original = engine.run_batch
+    def lossy(*args, **kwargs):
+        frames = original(*args, **kwargs)
+        frames[0].attrs["failed_pairs"] = [search.pairs[0]]
+        return frames
+    monkeypatch.setattr(engine, "run_batch", lossy)
+
+    points = search.grid()[:2]
+    search.evaluate(points, len(search.pairs))
+    assert recorded == [points[1]]
+    assert search.scores[search.key(points[0])][0] == len(search.pairs) - 1
+    assert (search.key(points[0]), search.pairs[0]) not in search.evaluated_tasks
@@ -0,0 +1,43 @@
+import pandas as pd
+import polars as pl
+import pytest
+from src.analytics import summarize_trades
+
+TRADES = pd.DataFrame({
+    "symbol": ["BTCUSDT_5s", "BTCUSDT_5s", "ETHUSDT_1m", "ETHUSDT_5s", "XUSDT"],
+    # 2024-01-07 is a Sunday; the IST week starts at 03:00 local = 00:00 UTC
+    "entry_time": ["2024-01-06 23:59:59", "2024-01-07 00:00:01", "2024-01-08 10:00:00",
+                   "2024-01-13 23:00:00", "2024-01-14 00:10:00"],
+    "pnl_usd": [1.0, -2.0, 3.0, -0.5, 0.5],
+})
+
+def test_breakdowns_use_ist_weeks():
+    s = summarize_trades(TRADES, top_n=2)
+    assert (s["total_trades"], s["wins"]) == (5, 3)
+    assert s["win_rate"] == pytest.approx(60.0) and s["total_pnl"] == pytest.approx(2.0)
+    assert (s["best_trade"], s["worst_trade"]) == (3.0, -2.0)
+    assert s["tf_breakdown"] == {
+        "1m": {"trades": 1, "pnl": 3.0, "win_rate": 100.0},
+        "5s": {"trades": 3, "pnl": -1.5, "win_rate": pytest.approx(100 / 3)},
+        "Unknown": {"trades": 1, "pnl": 0.5, "win_rate": 100.0},
+    }
+    assert [(w["label"], w["trades"], w["pnl"]) for w in s["weekly_stats"]] == [
+        ("31.12-07.01", 1, 1.0), ("07.01-14.01", 3, 0.5), ("14.01-21.01", 1, 0.5)]
+    assert s["weekly_stats"][1]["week_start"] == "2024-01-07T03:00:00+03:00"
+    assert s["top_symbols"] == [("ETHUSDT_1m", 3.0), ("XUSDT", 0.5)]
+    assert s["bottom_symbols"] == [("BTCUSDT_5s", -1.0), ("ETHUSDT_5s", -0.5)]
+    assert s["date_range"] == "2024-01-06 to 2024-01-14" and s["total_days"] == 9
+
+def test_polars_and_tz_aware_input_match_pandas():
+    aware = TRADES.assign(entry_time=pd.to_datetime(TRADES["entry_time"]).dt.tz_localize("UTC"))
+    expected = summarize_trades(TRADES)
+    assert summarize_trades(aware) == expected
+    assert summarize_trades(pl.from_pandas(TRADES)) == expected
+    assert summarize_trades(TRADES.iloc[:0])["total_trades"] == 0
+
+def test_summary_fills_sheet_row():
+    from sheets import TF_COLS, WEEKLY_START_COL, build_row
+    row = build_row({"strategy_name": "[SHORT] PUMP EMA:None Pump:2.0% TP:4% SL:2% TSL:OFF M:0.8",
+                     **summarize_trades(TRADES)})
+    assert row[TF_COLS["5s"] - 1:TF_COLS["5s"] + 1] == [3, -1.5]
+    assert row[WEEKLY_START_COL - 1:WEEKLY_START_COL + 5] == [1, 1.0, 3, 0.5, 1, 0.5]
@@ -0,0 +1,100 @@
+import pytest
+from backtest_framework import BacktestEngine
+from conditions.vectorized_strategy import VectorizedStrategy
+from src import hot_cache
+
+COMBINATIONS = [
+    dict(side="SHORT", cond="pump", pump_threshold=0.003, marubozu_threshold=0.6, tp=0.01, sl=0.008, ema="none"),
+    dict(side="LONG", cond="pump", pump_threshold=0.004, marubozu_threshold=0.6, tp=0.01, sl=0.008, ema="none"),
+    dict(side="SHORT", cond="dump", dump_threshold=0.003, marubozu_threshold=0.6, tp=0.008, sl=0.01, tsl=0.004, ema="none"),
+    dict(side="SHORT", cond="pump", pump_threshold=0.003, marubozu_threshold=0.6, tp=0.01, sl=0.008, ema="big_bull",
+         bet_size=10.0, max_positions=3, avg_threshold=0.001),
+]
+
+def _key(frame):
+    return sorted(map(tuple, frame[["symbol", "entry_time", "exit_time", "type", "pnl_usd"]].values)) if len(frame) else []
+
+def test_batch_matches_individual_runs(tmp_path, monkeypatch, write_universe):
+    write_universe(tmp_path, n=6_000)
+    engine = BacktestEngine(str(tmp_path))
+
+    loads = []
+    original = hot_cache.load_bars
+    monkeypatch.setattr(hot_cache, "load_bars", lambda p, **kw: loads.append(p) or original(p, **kw))
+    frames = engine.run_batch(VectorizedStrategy, COMBINATIONS, parallel=False, workers=1, tasks_per_worker=1,
+                              use_cache=False)
+    assert len(loads) == 3  # every pair decoded once for all combinations
+    monkeypatch.setattr(hot_cache, "load_bars", original)
+
+    assert len(frames) == len(COMBINATIONS)
+    assert sum(len(f) for f in frames) > 20
+    for combination, frame in zip(COMBINATIONS, frames):
+        kwargs = dict(combination)
+        single = engine.run(VectorizedStrategy, max_positions=kwargs.pop("max_positions", 10),
+                            avg_threshold=kwargs.pop("avg_threshold", 0.10), parallel=False, use_cache=False, **kwargs)
+        assert _key(frame) == _key(single)
+
+def test_batch_rejects_non_pair_major_strategies(tmp_path):
+    from strategies.top_pumps import TopPumps
+    with pytest.raises(TypeError):
+        BacktestEngine(str(tmp_path)).run_batch(TopPumps, [{}])
+
+def test_journal_resumes_only_missing_tasks(tmp_path, monkeypatch, write_universe):
+    import backtest_framework
+    from sweep_journal import SweepJournal
+    write_universe(tmp_path / "data", n=6_000)
+    engine = BacktestEngine(str(tmp_path / "data"))
+    journal = SweepJournal(tmp_path / "journal.sqlite")
+    expected = engine.run_batch(VectorizedStrategy, COMBINATIONS, parallel=False, use_cache=False)
+
+    # First pair fails once (retried after backoff), second pair keeps failing and is left out
+    original = backtest_framework.process_pair_combinations
+    calls = []
+    def flaky(task):
+        calls.append(task[0])
+        if "S1USDT" in task[0] or calls.count(task[0]) == 1 and "S0USDT" in task[0]:
+            raise OSError("disk hiccup")
+        return original(task)
+    monkeypatch.setattr(backtest_framework, "process_pair_combinations", flaky)
+    partial = engine.run_batch(VectorizedStrategy, COMBINATIONS, parallel=False, workers=1, tasks_per_worker=1,
+                               use_cache=False, journal=journal, retries=1, backoff=0)
+    for frame, full in zip(partial, expected):
+        assert len(frame.attrs["failed_pairs"]) == 1 and "S1USDT" in frame.attrs["failed_pairs"][0]
+        assert _key(frame) == _key(full[~full["symbol"].str.startswith("S1USDT")])
+    assert journal.counts() == {"partials": 2 * len(COMBINATIONS), "combinations": len(COMBINATIONS),
+                                "failures": len(COMBINATIONS)}
+    assert {f["attempts"] for f in journal.failures()} == {2}
+
+    # Restart: only the missing pair is computed, results equal an uninterrupted run
+    calls.clear()
+    monkeypatch.setattr(backtest_framework, "process_pair_combinations", lambda t: calls.append(t[0]) or original(t))
+    frames = engine.run_batch(VectorizedStrategy, COMBINATIONS, parallel=False, workers=1, tasks_per_worker=1,
+                              use_cache=False, journal=journal)
+    assert len(calls) == 1 and "S1USDT" in calls[0]
+    assert [_key(f) for f in frames] == [_key(f) for f in expected]
+    assert journal.counts()["failures"] == 0 and frames[0].attrs["failed_pairs"] == []
+
+    journal.discard(SweepJournal.combo_key(VectorizedStrategy, {k: v for k, v in c.items()
+                                                                 if k not in ("max_positions", "avg_threshold")})
+                    for c in COMBINATIONS)
+    assert journal.counts()["partials"] == 0
+
+def test_mega_batch_keeps_incomplete_combinations_pending(tmp_path):
+    import pandas as pd
+    from results_db import ResultsDB, run_key, run_params
+    from run_mega_batch import combination_params, record_block
+    from sweep_journal import SweepJournal
+    db, journal = ResultsDB(tmp_path / "results.sqlite"), SweepJournal(tmp_path / "journal.sqlite")
+    combos = [("SHORT", "pump", 2.0, "none", 3.0, 1.0, 0), ("LONG", "dump", -2.0, "none", 3.0, 1.0, 0)]
+    block = [(c, run_params(VectorizedStrategy, **combination_params(*c))) for c in combos]
+    keys = [journal.combo_key(VectorizedStrategy, combination_params(*c)) for c in combos]
+    journal.save("S0USDT", {k: [] for k in keys}, signature="-")
+
+    complete, incomplete = pd.DataFrame(), pd.DataFrame()
+    complete.attrs["failed_pairs"], incomplete.attrs["failed_pairs"] = [], ["S1USDT"]
+    assert record_block(db, journal, block, [complete, incomplete]) == 1
+
+    # Only the complete combination is done; the other keeps its partials for the restart
+    assert db.completed_keys() == {run_key(block[0][1])}
+    assert journal.counts()["combinations"] == 1
+    assert journal.prune({keys[1]}) == 0  # what is left belongs to the incomplete one
@@ -0,0 +1,98 @@
+import pandas as pd
+import polars as pl
+from backtest_framework import BacktestEngine, process_pair_candidates
+from src import storage
+from strategies.top_pumps import TopPumps
+
+KWARGS = dict(side="SHORT", tp=0.01, sl=0.008, pump_threshold=0.003, marubozu_threshold=0.6, use_cache=False)
+
+def _max_open(trades):
+    entries, exits = pd.to_datetime(trades["entry_time"]), pd.to_datetime(trades["exit_time"])
+    return max(((entries <= t) & (exits >= t)).sum() for t in entries)
+
+def test_unconstrained_matches_pair_major(tmp_path, write_universe):
+    write_universe(tmp_path)
+    engine = BacktestEngine(str(tmp_path))
+    pair_major = engine.run(TopPumps, max_positions=1, parallel=False, **KWARGS)
+    time_major = engine.run_cross_sectional(TopPumps, max_positions=1_000, parallel=False, top_n=1_000, **KWARGS)
+    assert len(pair_major) > 20
+    key = ["symbol", "entry_time", "exit_time", "type"]
+    assert sorted(map(tuple, time_major[key].values)) == sorted(map(tuple, pair_major[key].values))
+
+def test_global_limits_and_ranking(tmp_path, write_universe):
+    write_universe(tmp_path)
+    engine = BacktestEngine(str(tmp_path))
+    capped = engine.run_cross_sectional(TopPumps, max_positions=2, parallel=False, **KWARGS)
+    assert len(capped) > 0 and _max_open(capped) <= 2
+
+    # top_n=1: one entry per timestamp, the best-scored pair that is not already in a position
+    best = engine.run_cross_sectional(TopPumps, max_positions=1_000, parallel=False, top_n=1, **KWARGS)
+    assert best["entry_time"].is_unique
+    candidates = {}
+    for dataset in storage.list_datasets(tmp_path):
+        for c in process_pair_candidates((str(dataset), TopPumps, KWARGS)):
+            candidates.setdefault(c.entry_time, []).append(c)
+    for _, trade in best.iterrows():
+        entry = pd.Timestamp(trade.entry_time)
+        held = set(best[(pd.to_datetime(best["entry_time"]) < entry)
+                        & (pd.to_datetime(best["exit_time"]) >= entry)]["symbol"])
+        eligible = [c for c in candidates[trade.entry_time] if c.symbol not in held]
+        assert trade.symbol == max(eligible, key=lambda c: c.score).symbol
+
+def test_capital_model(tmp_path, write_universe):
+    write_universe(tmp_path)
+    trades = BacktestEngine(str(tmp_path)).run_cross_sectional(
+        TopPumps, max_positions=10, capital=100.0, position_fraction=0.5, parallel=False, **KWARGS)
+    # Half of the equity per position: never more than two open at once
+    assert len(trades) > 0 and _max_open(trades) <= 2
+    bets = trades["pnl_usd"] / trades["pnl_percent"]
+    assert abs(bets.iloc[0] - 50.0) < 1e-9 and (bets > 0).all()
+
+class EveryBar(TopPumps):
+    """Dense score: every bar of every pair is a candidate."""
+    def score(self, bars):
+        return (pl.col("close") - pl.col("open")) / pl.col("open")
+
+def test_dense_score_streams_every_bar(tmp_path, monkeypatch, write_universe):
+    import backtest_framework
+    write_universe(tmp_path, n=3_000)
+    engine = BacktestEngine(str(tmp_path))
+    pair_major = engine.run(EveryBar, max_positions=1, parallel=False, **KWARGS)
+    # Small batches: the merge reads every spilled file in several row groups
+    monkeypatch.setattr(backtest_framework, "CANDIDATE_BATCH_ROWS", 500)
+    time_major = engine.run_cross_sectional(EveryBar, max_positions=1_000, parallel=False, top_n=1_000, **KWARGS)
+    assert len(pair_major) > 100
+    key = ["symbol", "entry_time", "exit_time", "type"]
+    assert sorted(map(tuple, time_major[key].values)) == sorted(map(tuple, pair_major[key].values))
+    assert len(process_pair_candidates((str(storage.list_datasets(tmp_path)[0]), EveryBar, KWARGS))) == 3_000
+
+def _reference_exit(i, high, low, close, exits):
+    """Bar-by-bar exit: static SL (wins a tie with TP) / TP, trailing SL on the best price before the bar."""
+    short = exits.side == "SHORT"
+    entry = close[i]
+    sl = entry * (1 + exits.sl) if short else entry * (1 - exits.sl)
+    tp = entry * (1 - exits.tp) if short else entry * (1 + exits.tp)
+    best = entry
+    for j in range(i + 1, len(close)):
+        if short and high[j] >= sl or not short and low[j] <= sl:
+            return j, "SL", sl
+        if short and low[j] <= tp or not short and high[j] >= tp:
+            return j, "TP", tp
+        if exits.tsl > 0:
+            trigger = best * (1 + exits.tsl) if short else best * (1 - exits.tsl)
+            if short and high[j] >= trigger or not short and low[j] <= trigger:
+                return j, "TSL", trigger
+            best = min(best, low[j]) if short else max(best, high[j])
+    return None
+
+def test_windowed_find_exit_matches_bar_by_bar(monkeypatch, make_bars):
+    import backtest_framework
+    from backtest_framework import ExitParams, find_exit
+    monkeypatch.setattr(backtest_framework, "EXIT_SCAN_WINDOW", 4)  # many window boundaries
+    df = make_bars(n=3_000)
+    high, low, close = df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy()
+    for side in ("SHORT", "LONG"):
+        for tsl in (0.0, 0.003):
+            exits = ExitParams(side=side, tp=0.01, sl=0.008, tsl=tsl, bet_size=7.0)
+            for i in range(0, 3_000, 37):
+                assert find_exit(i, high, low, close, exits) == _reference_exit(i, high, low, close, exits), (side, tsl, i)
@@ -0,0 +1,50 @@
+import numpy as np
+from backtest_framework import process_single_pair_signals
+from conditions import ema_kernel
+from conditions.signal_batch import (BEAR_THRESHOLD_PCT, BULL_THRESHOLD_PCT, EMA_PAIRS, EMA_PERIODS,
+                                     SignalConfig, SignalFeatures)
+from conditions.vectorized_strategy import VectorizedStrategy
+
+def _mismatch_distance(bits, features, bullish):
+    """Largest |fast/slow - threshold| among bars where the kernel bit differs from pandas."""
+    reference = features.ema_bits(bullish)
+    level = 1 + BULL_THRESHOLD_PCT if bullish else 1 - BEAR_THRESHOLD_PCT
+    worst = 0.0
+    for k, (fast, slow) in enumerate(EMA_PAIRS):
+        differs = ((bits >> k) & 1) != ((reference >> k) & 1)
+        if differs.any():
+            worst = max(worst, np.abs(features.ema(fast)[differs] / features.ema(slow)[differs] - level).max())
+    return worst
+
+def test_fused_kernel_tolerance(make_bars):
+    for seed in (3, 7):
+        df = make_bars(n=40_000, seed=seed)
+        closes = df['close'].to_numpy()
+        features = SignalFeatures(df)
+        reference = np.array([df['close'].ewm(span=p, adjust=False).mean().to_numpy() for p in EMA_PERIODS])
+
+        # Small chunks exercise the carried state between chunks
+        for dtype, tolerance in ((np.float64, ema_kernel.FLOAT64_TOLERANCE), (np.float32, ema_kernel.FLOAT32_TOLERANCE)):
+            emas = ema_kernel.chain_emas(closes, dtype, chunk=5_000)
+            assert np.max(np.abs(emas - reference) / reference) < (1e-10 if dtype is np.float64 else 1e-4)
+            bull, bear = ema_kernel.ema_chain_bits(closes, dtype, chunk=5_000)
+            assert _mismatch_distance(bull, features, True) <= tolerance
+            assert _mismatch_distance(bear, features, False) <= tolerance
+
+        bull, bear = ema_kernel.ema_chain_bits(closes, np.float64)
+        assert np.array_equal(bull, features.ema_bits(True)) and np.array_equal(bear, features.ema_bits(False))
+
+def test_strategy_kernel_option(tmp_path, make_bars, write_dataset, emas):
+    df = make_bars()
+    reference, fused = SignalFeatures(df), SignalFeatures(df, ema_kernel="fused64")
+    for ema in emas:
+        config = SignalConfig("pump", 0.002, ema, 0.6)
+        assert np.array_equal(fused.signal(config), reference.signal(config)), ema
+    assert fused._emas == {}  # masks only, no EMA series
+
+    tf_dir = write_dataset(tmp_path)
+    kwargs = dict(side="SHORT", tp=0.01, sl=0.008, cond="pump", pump_threshold=0.002,
+                  marubozu_threshold=0.6, ema="all_bull", use_cache=False)
+    trades = process_single_pair_signals((str(tf_dir), VectorizedStrategy, False, kwargs))
+    assert process_single_pair_signals((str(tf_dir), VectorizedStrategy, False, dict(kwargs, ema_kernel="fused64"))) == trades
+    assert len(process_single_pair_signals((str(tf_dir), VectorizedStrategy, False, dict(kwargs, ema_kernel="fused32")))) > 0
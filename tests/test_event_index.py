@@ -0,0 +1,60 @@
+import numpy as np
+import polars as pl
+import pytest
+from datetime import datetime, timedelta
+from conditions.vectorized_strategy import VectorizedStrategy
+from src import event_index, storage
+
+START = datetime(2024, 1, 5, 12)  # 12k 1m bars -> two IST weeks
+
+def _dataset(tmp_path, df, symbol):
+    bars = pl.from_pandas(df).with_columns(
+        pl.Series("ts_1s", [START + timedelta(minutes=i) for i in range(len(df))])
+        .dt.replace_time_zone("Europe/Istanbul")
+    )
+    tf_dir = tmp_path / "raw" / symbol / "1m"
+    tf_dir.mkdir(parents=True)
+    storage.write_bars(bars, tf_dir / "bars.parquet")
+    return df, bars["ts_1s"].dt.convert_time_zone("UTC")
+
+def test_query_matches_process_data(tmp_path, make_bars, emas):
+    data = {sym: _dataset(tmp_path, make_bars(seed=seed), sym) for sym, seed in (("AAAUSDT", 7), ("BBBUSDT", 11))}
+    event_dir = tmp_path / "events"
+    total = event_index.build_index(tmp_path, min_change=0.001, min_marubozu=0.5, event_dir=event_dir, workers=2)
+
+    manifest = event_index.load_manifest(event_dir)
+    assert manifest["events"] == total > 0
+    assert manifest["weeks"] == ["2023-12-31.parquet", "2024-01-07.parquet"]
+
+    for cond in ("pump", "dump"):
+        for ema in emas:
+            result = event_index.query(min_change=0.002, direction=cond, min_marubozu=0.6, ema=ema, event_dir=event_dir)
+            assert result["timestamp"].is_sorted()
+            for sym, (df, ts) in data.items():
+                strat = VectorizedStrategy(cond=cond, pump_threshold=0.002, dump_threshold=0.002,
+                                           ema=ema, marubozu_threshold=0.6)
+                out = strat.process_data(df.copy())
+                mask = np.zeros(len(df), dtype=bool) if out is None else out["entry_signal"].to_numpy()
+                expected = ts.filter(pl.Series(mask))
+                got = result.filter(pl.col("symbol") == sym)["timestamp"]
+                assert got.to_list() == expected.to_list(), (sym, cond, ema)
+
+def test_query_prunes_weeks_and_filters(tmp_path, make_bars):
+    _dataset(tmp_path, make_bars(seed=7), "AAAUSDT")
+    _dataset(tmp_path, make_bars(seed=11), "BBBUSDT")
+    event_dir = tmp_path / "events"
+    event_index.build_index(tmp_path, min_change=0.001, event_dir=event_dir, workers=1)
+
+    start, end = datetime(2024, 1, 7, 3), datetime(2024, 1, 14, 3)
+    week = event_index.query(start, end, symbols=["BBBUSDT"], direction="both", event_dir=event_dir)
+    assert week.height > 0
+    assert week["symbol"].unique().to_list() == ["BBBUSDT"]
+    local = week["timestamp"].dt.convert_time_zone("Europe/Istanbul").dt.replace_time_zone(None)
+    assert local.min() >= start and local.max() < end
+
+    everything = event_index.query(direction="both", event_dir=event_dir)
+    buckets = event_index.concurrent_signals(everything, every="1m")
+    assert (buckets["symbols"] == 2).all()
+
+    with pytest.raises(ValueError):
+        event_index.query(min_change=0.0005, event_dir=event_dir)
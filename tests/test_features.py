@@ -0,0 +1,60 @@
+import numpy as np
+import polars as pl
+from datetime import datetime, timedelta
+from backtest_framework import process_single_pair_signals
+from conditions.signal_batch import SignalConfig, SignalFeatures
+from conditions.vectorized_strategy import VectorizedStrategy
+from src import features, storage
+
+def _write_weeks(tmp_path, bars, weeks=3):
+    n = len(bars)
+    df = pl.from_pandas(bars).with_columns(
+        pl.Series("ts_1s", [datetime(2024, 1, 1) + timedelta(seconds=5 * i) for i in range(n)])
+    )
+    tf_dir = tmp_path / "raw" / "BTCUSDT" / "5s"
+    tf_dir.mkdir(parents=True)
+    bounds = np.linspace(0, n, weeks + 1).astype(int)
+    files = []
+    for k, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+        files.append(tf_dir / f"2024-01-{k + 1:02d}.parquet")
+        storage.write_bars(df.slice(lo, hi - lo), files[-1])
+    return tf_dir, files, df
+
+def test_weekly_features_equal_full_history(tmp_path, make_bars, emas):
+    tf_dir, files, df = _write_weeks(tmp_path, make_bars())
+    assert features.materialize_dataset(tf_dir) == 3
+    assert features.materialize_dataset(tf_dir) == 0  # all fresh
+
+    stored = features.load_features(tf_dir)
+    full, _ = features.compute_features(df)
+    assert stored.equals(full)
+
+    # Materialized columns give process_data's signals for every ema filter
+    materialized = SignalFeatures(stored.to_pandas())
+    for ema in emas:
+        for cond in ("pump", "dump"):
+            out = VectorizedStrategy(cond=cond, pump_threshold=0.002, dump_threshold=0.002,
+                                     ema=ema, marubozu_threshold=0.6).process_data(df.to_pandas())
+            expected = np.zeros(df.height, dtype=bool) if out is None else out["entry_signal"].to_numpy()
+            assert np.array_equal(materialized.signal(SignalConfig(cond, 0.002, ema, 0.6)), expected), (cond, ema)
+
+def test_missing_week_is_recomputed_with_later_weeks(tmp_path, make_bars):
+    tf_dir, files, df = _write_weeks(tmp_path, make_bars())
+    features.materialize_dataset(tf_dir)
+    features.feature_path(files[1]).unlink()
+    assert features.load_features(tf_dir) is None
+
+    assert features.materialize_week(files[1]) == 2  # weeks 2 and 3
+    assert features.load_features(tf_dir).equals(features.compute_features(df)[0])
+
+def test_engine_uses_sidecars(tmp_path, make_bars):
+    tf_dir, files, df = _write_weeks(tmp_path, make_bars())
+    kwargs = dict(side="SHORT", tp=0.01, sl=0.008, cond="pump", pump_threshold=0.002,
+                  marubozu_threshold=0.6, ema="all_bull", use_cache=False)
+    plain = process_single_pair_signals((str(tf_dir), VectorizedStrategy, False, kwargs))
+
+    features.materialize_dataset(tf_dir)
+    bars = features.attach_features(tf_dir, storage.read_bars(tf_dir), VectorizedStrategy.feature_columns)
+    assert set(VectorizedStrategy.feature_columns) <= set(bars.columns)
+    assert len(plain) > 5
+    assert process_single_pair_signals((str(tf_dir), VectorizedStrategy, False, kwargs)) == plain
@@ -0,0 +1,42 @@
+import os
+import polars as pl
+from datetime import datetime
+from src import hot_cache, storage
+
+def _write_week(tf_dir, name, seconds):
+    df = pl.DataFrame({
+        "ts_1s": [datetime(2024, 1, 1, 0, 0, s) for s in seconds],
+        "open": [1.0] * len(seconds),
+        "high": [2.0] * len(seconds),
+        "low": [0.5] * len(seconds),
+        "close": [float(s) for s in seconds],
+        "volume": [1.0] * len(seconds),
+    })
+    storage.write_bars(df, tf_dir / name)
+
+def test_build_load_and_invalidate(tmp_path):
+    tf_dir = tmp_path / "raw" / "BTCUSDT" / "5s"
+    tf_dir.mkdir(parents=True)
+    _write_week(tf_dir, "2024-01-01_to_2024-01-08.parquet", [0, 5, 10])
+
+    assert hot_cache.build(tmp_path) == 1
+    assert hot_cache.cache_path(tf_dir) == tmp_path / "cache" / "BTCUSDT" / "5s.arrow"
+    assert hot_cache.is_fresh(tf_dir)
+    assert hot_cache.build(tmp_path) == 0  # already fresh
+
+    cached = hot_cache.load_bars(tf_dir)
+    assert cached.equals(storage.read_bars(tf_dir))
+    arrays = hot_cache.load_arrays(tf_dir, ["close"])
+    assert arrays["close"].tolist() == [0.0, 5.0, 10.0]
+    assert hot_cache.load_bars(tf_dir, columns=["high", "open_time"]).columns == ["ts_1s", "high"]
+
+    # A new week lands -> entry is stale and readers fall back to parquet
+    _write_week(tf_dir, "2024-01-08_to_2024-01-15.parquet", [15])
+    assert not hot_cache.is_fresh(tf_dir)
+    assert hot_cache.load_bars(tf_dir)["close"].to_list() == [0.0, 5.0, 10.0, 15.0]
+
+    # Rewritten source (mtime change) is detected too
+    hot_cache.build(tmp_path)
+    st = (tf_dir / "2024-01-08_to_2024-01-15.parquet").stat()
+    os.utime(tf_dir / "2024-01-08_to_2024-01-15.parquet", ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert not hot_cache.is_fresh(tf_dir)
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+from src import downloader
+from src.miss_cache import MissCache
+
+NOW = datetime(2024, 3, 10, 12, tzinfo=timezone.utc)
+
+def test_revalidation_policy(tmp_path):
+    misses = MissCache(tmp_path / "missing_days.json")
+    misses.record("NEWUSDT", "2024-01-01", now=NOW)   # old day: stable miss
+    misses.record("NEWUSDT", "2024-03-09", now=NOW)   # yesterday: maybe not published yet
+
+    assert misses.is_missing("NEWUSDT", "2024-01-01", now=NOW + timedelta(days=10))
+    assert not misses.is_missing("NEWUSDT", "2024-01-01", now=NOW + timedelta(days=31))
+    assert misses.is_missing("NEWUSDT", "2024-03-09", now=NOW + timedelta(hours=1))
+    assert not misses.is_missing("NEWUSDT", "2024-03-09", now=NOW + timedelta(hours=7))
+    assert not misses.is_missing("BTCUSDT", "2024-01-01", now=NOW)
+
+    misses.save()
+    reloaded = MissCache(tmp_path / "missing_days.json")
+    assert reloaded.is_missing("NEWUSDT", "2024-01-01", now=NOW + timedelta(days=1))
+
+def test_download_day_records_only_404(tmp_path, monkeypatch):
+    misses = MissCache(tmp_path / "missing_days.json")
+    calls = []
+
+    def fake_download(url, local_path):
+        calls.append(url)
+        return downloader.DOWNLOAD_MISSING if "2024-01-01" in url else downloader.DOWNLOAD_ERROR
+    monkeypatch.setattr(downloader, "_download", fake_download)
+
+    zip_path = tmp_path / "x.zip"
+    assert not downloader.download_day("NEWUSDT", "2024-01-01", zip_path, misses)
+    assert not downloader.download_day("NEWUSDT", "2024-01-01", zip_path, misses)
+    assert len(calls) == 1  # second attempt served from the cache
+
+    # Transient errors are retried every time
+    downloader.download_day("NEWUSDT", "2024-01-02", zip_path, misses)
+    downloader.download_day("NEWUSDT", "2024-01-02", zip_path, misses)
+    assert len(calls) == 3
@@ -0,0 +1,68 @@
+import numpy as np
+import polars as pl
+from datetime import datetime, timedelta
+from backtest_framework import BacktestEngine, align_context, evaluate_signals, process_symbol_multi_tf, simulate_exits
+from conditions.signal_batch import SignalFeatures
+from src import hot_cache, processor, storage
+from strategies.mtf_confluence import MtfPumpTrend
+
+def _write_symbol(tmp_path, df, symbol, context_tf="1m"):
+    n = len(df)
+    base = pl.from_pandas(df).with_columns(
+        pl.Series("ts_1s", [datetime(2024, 1, 1) + timedelta(seconds=5 * i) for i in range(n)])
+        .dt.replace_time_zone("Europe/Istanbul")
+    )
+    for tf, bars in (("5s", base), (context_tf, processor.resample_from_1s(base, context_tf))):
+        tf_dir = tmp_path / "raw" / symbol / tf
+        tf_dir.mkdir(parents=True)
+        storage.write_bars(bars, tf_dir / "2024-01-01.parquet")
+    return base
+
+def test_align_context_has_no_lookahead(tmp_path, make_bars):
+    base = _write_symbol(tmp_path, make_bars(n=2_000, seed=7), "BTCUSDT")
+    minute = processor.resample_from_1s(base, "1m")
+    aligned = align_context(base, "5s", minute.select("ts_1s", "close"), "1m")
+
+    base_close = base["ts_1s"] + timedelta(seconds=5)
+    minute_close = (minute["ts_1s"] + timedelta(minutes=1)).to_list()
+    for i in (0, 10, 11, 12, 13, 500, 1999):
+        done = [k for k, t in enumerate(minute_close) if t <= base_close[i]]
+        expected = minute["close"][done[-1]] if done else None
+        assert aligned["close_1m"][i] == expected
+    # The 12th 5s bar closes with the first minute: first bar that may see it
+    assert aligned["close_1m"][10] is None and aligned["close_1m"][11] == minute["close"][0]
+
+def test_engine_schedules_per_symbol(tmp_path, monkeypatch, make_bars):
+    # 15s context: enough trend bars for the 5000 EMA
+    bases = {sym: _write_symbol(tmp_path, make_bars(n=60_000, seed=seed), sym, context_tf="15s") for sym, seed in (("AAAUSDT", 3), ("BBBUSDT", 5))}
+    loads = []
+    original = hot_cache.load_bars
+    monkeypatch.setattr(hot_cache, "load_bars", lambda p, **kw: loads.append(p) or original(p, **kw))
+
+    kwargs = dict(side="SHORT", tp=0.01, sl=0.008, pump_threshold=0.002, marubozu_threshold=0.6,
+                  trend_timeframe="15s", trend_ema="big_bull", use_cache=False)
+    result = BacktestEngine(str(tmp_path)).run(MtfPumpTrend, max_positions=1, parallel=False, **kwargs)
+    assert len(loads) == 4  # 2 symbols x (5s, 15s), each read once
+    assert len(result) > 0 and set(result["symbol"]) <= {"AAAUSDT_5s", "BBBUSDT_5s"}
+
+    # Reference: trend computed on 15s bars by hand, forward-filled at 5s bar closes
+    expected = []
+    for sym, base in bases.items():
+        context = processor.resample_from_1s(base, "15s")
+        trend = SignalFeatures(context.to_pandas()).ema_filter("big_bull")
+        context_close = (context["ts_1s"] + timedelta(seconds=15)).to_numpy()
+        seen = np.searchsorted(context_close, (base["ts_1s"] + timedelta(seconds=5)).to_numpy(), side="right") - 1
+        trend_5s = np.where(seen >= 0, trend[np.maximum(seen, 0)], False)
+
+        strat = MtfPumpTrend(**kwargs)
+        signals = evaluate_signals(strat, base.with_columns(pl.Series("trend_15s", trend_5s)))
+        expected += simulate_exits(signals, base["high"].to_numpy(), base["low"].to_numpy(), base["close"].to_numpy(),
+                                   base["ts_1s"].to_list(), strat.exit_params(), f"{sym}_5s")
+    assert sorted(result["entry_time"]) == sorted(t.entry_time for t in expected)
+
+def test_symbol_without_context_tf_is_reported(tmp_path, capsys, make_bars):
+    _write_symbol(tmp_path, make_bars(n=2_000, seed=7), "BTCUSDT")
+    datasets = {"5s": str(tmp_path / "raw" / "BTCUSDT" / "5s")}
+    kwargs = dict(trend_timeframe="15s", use_cache=False)
+    assert process_symbol_multi_tf((datasets, MtfPumpTrend, False, kwargs)) == []
+    assert "Skipping BTCUSDT: missing timeframes 15s" in capsys.readouterr().out
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from results_db import ResultsDB, run_key, sync
+
+def _summary(name, pnl):
+    return {"strategy_name": name, "total_trades": 3, "total_pnl": np.float64(pnl),
+            "tf_breakdown": {"5s": {"trades": np.int64(3), "pnl": pnl}}}
+
+def test_run_key_is_canonical():
+    assert run_key({"tp": 0.02, "side": "SHORT"}) == run_key({"side": "SHORT", "tp": 2 / 100})
+    assert run_key({"threshold": 2}) == run_key({"threshold": 2.0}) == run_key({"threshold": np.float32(2.0)})
+    assert run_key({"tp": 0.02}) != run_key({"tp": 0.03})
+
+def test_record_and_batched_sync(tmp_path):
+    db = ResultsDB(tmp_path / "results.sqlite")
+    keys = [db.record({"tp": tp / 100, "side": "SHORT"}, _summary(f"run {tp}", tp)) for tp in range(1, 6)]
+    assert db.completed_keys() == set(keys)
+    assert db.strategy_names() == {f"run {tp}" for tp in range(1, 6)}
+    assert db.get(keys[0])["tf_breakdown"]["5s"]["trades"] == 3
+
+    batches = []
+    assert sync(db, batches.append, batch_size=2) == 5
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert [s["strategy_name"] for b in batches for s in b] == [f"run {tp}" for tp in range(1, 6)]
+    assert all("timestamp" in s for b in batches for s in b)
+    assert db.counts() == {"runs": 5, "unsynced": 0, "completed": 5}
+
+    # Re-running a combination replaces its row and queues it again
+    db.record({"side": "SHORT", "tp": 0.01}, _summary("run 1", -1.0))
+    assert db.counts() == {"runs": 5, "unsynced": 1, "completed": 5}
+
+def test_failed_push_keeps_rows(tmp_path):
+    db = ResultsDB(tmp_path / "results.sqlite")
+    db.record({"tp": 0.01}, _summary("a", 1.0))
+
+    def failing(rows):
+        raise ConnectionError("quota")
+    with pytest.raises(ConnectionError):
+        sync(db, failing)
+    assert db.counts()["unsynced"] == 1
+
+    pushed = []
+    assert sync(db, pushed.extend) == 1 and pushed[0]["strategy_name"] == "a"
+
+def test_strategy_run_key_fills_defaults_and_drops_options():
+    from conditions.vectorized_strategy import VectorizedStrategy
+    from results_db import strategy_run_key
+
+    grid = strategy_run_key(VectorizedStrategy, side="SHORT", cond="pump", pump_threshold=2.0 / 100,
+                            dump_threshold=0.02, tp=3.0 / 100, sl=0.01, tsl=0.0, ema="none",
+                            max_positions=1, avg_threshold=0.0, parallel=True, workers=2)
+    # Same run as main.py would record: unused dump threshold, defaults and execution options do not matter
+    cli = strategy_run_key(VectorizedStrategy, side="SHORT", cond="PUMP", pump_threshold=0.02, dump_threshold=0.03,
+                           tp=0.03, sl=0.01, marubozu_threshold=0.8, bet_size=7, ema="None",
+                           max_positions=1, avg_threshold=0, tf_filter=None, use_cache=False)
+    assert grid == cli
+    assert grid != strategy_run_key(VectorizedStrategy, side="SHORT", cond="pump", tp=0.03, sl=0.01,
+                                    max_positions=10, avg_threshold=0.0)
+
+def test_completed_index_includes_runs_without_results(tmp_path):
+    db = ResultsDB(tmp_path / "results.sqlite")
+    ran = db.record({"tp": 0.01}, _summary("a", 1.0))
+    empty = db.mark_completed({"tp": 0.02})
+    assert db.completed_keys() == {ran, empty}
+    assert db.counts() == {"runs": 1, "unsynced": 1, "completed": 2}
@@ -0,0 +1,65 @@
+from backtest_framework import Strategy, process_single_pair, process_single_pair_polars
+from conditions.vectorized_strategy import VectorizedStrategy
+
+def test_rowwise_matches_polars_worker(tmp_path, write_dataset):
+    tf_dir = write_dataset(tmp_path)
+    for side, tsl in (("SHORT", 0.0), ("LONG", 0.004)):
+        kwargs = dict(side=side, tsl=tsl, tp=0.01, sl=0.008, cond="pump", pump_threshold=0.002,
+                      marubozu_threshold=0.6, ema="all_bull", use_cache=False)
+        turbo = process_single_pair_polars((str(tf_dir), VectorizedStrategy, False, kwargs))
+        rowwise = process_single_pair((str(tf_dir), VectorizedStrategy, False, kwargs))
+        assert len(turbo) > 5
+        assert rowwise == turbo
+
+class PumpConditions(Strategy):
+    def __init__(self, tp=0.01, sl=0.01, **kwargs):
+        super().__init__()
+        self.tp, self.sl = tp, sl
+
+    def batch_conditions(self, df):
+        return {"pump": ((df["close"] - df["open"]) / df["open"]).to_numpy()}
+
+    def on_candle(self, timestamp, open, high, low, close):
+        raise AssertionError("batched strategies are not stepped row by row")
+
+def short_on_pump(state, candle):
+    if state.conditions["pump"] > 0.004:
+        close = candle["close"]
+        return {"action": "SHORT", "entry_price": close, "tp": close * (1 - state.tp), "sl": close * (1 + state.sl)}
+    return None
+short_on_pump.candidates = lambda arrays: arrays["pump"] > 0.004
+
+def test_batched_conditions_with_candidate_skipping(tmp_path, write_dataset):
+    tf_dir = write_dataset(tmp_path, n=4_000)
+    args = (str(tf_dir), PumpConditions, False, {"action_func": short_on_pump, "use_cache": False})
+    trades = process_single_pair(args)
+    assert trades and all(t.symbol == "BTCUSDT_5s" for t in trades)
+
+    # Same result when every row is visited
+    del short_on_pump.candidates
+    try:
+        assert process_single_pair(args) == trades
+    finally:
+        short_on_pump.candidates = lambda arrays: arrays["pump"] > 0.004
+
+class FirstCandleFlag(Strategy):
+    """Streaming strategy whose 'first' condition exists on the first candle only."""
+    def __init__(self, **kwargs):
+        super().__init__()
+        self.conditions = {}
+
+    def on_candle(self, timestamp, open, high, low, close):
+        self.conditions = {} if hasattr(self, "seen") else {"first": True}
+        self.seen = True
+        return None
+
+def test_streaming_conditions_do_not_leak_between_candles(tmp_path, write_dataset):
+    tf_dir = write_dataset(tmp_path, n=50)
+    flagged = []
+
+    def record(state, candle):
+        flagged.append("first" in state.conditions)
+        return None
+
+    process_single_pair((str(tf_dir), FirstCandleFlag, False, {"action_func": record, "use_cache": False}))
+    assert flagged[0] and not any(flagged[1:])
@@ -0,0 +1,46 @@
+from backtest_framework import BacktestEngine
+from main import BacktestConfig, RunResult, run_backtest
+from results_db import ResultsDB
+
+def _config(**kw):
+    return BacktestConfig(**dict(dict(pump=0.3, marubozu=0.6, tp=1.0, sl=0.8, no_sheets=True, results_csv=None,
+                                      verbose=False, serial=True), **kw))
+
+def test_run_backtest_records_summary(tmp_path, write_universe):
+    write_universe(tmp_path / "data", n=6_000)
+    engine, db = BacktestEngine(str(tmp_path / "data")), ResultsDB(tmp_path / "results.sqlite")
+
+    result = run_backtest(_config(), engine, db)
+    assert isinstance(result, RunResult) and result.total_trades > 0
+    assert result.strategy_name == "[SHORT] PUMP EMA:None Pump:0.3% TP:1.0% SL:0.8% TSL:OFF M:0.6"
+    stored = db.get(result.run_key)
+    assert stored["total_trades"] == result.total_trades == result.summary["total_trades"]
+    assert stored["total_pnl"] == result.trades["pnl_usd"].sum()
+
+    # Same parameters as the CLI would use, and the grid drivers' dedup key
+    from run_mega_grid import run_key_for
+    grid = run_backtest(_config(pump=2.0, marubozu=0.8, tp=3.0, sl=1.0), engine, db)
+    assert grid.run_key == run_key_for("SHORT", "pump", "none", 3.0, 1.0, 2.0)
+    assert grid.run_key in db.completed_keys()
+
+def test_shared_pool_reuses_one_executor(tmp_path, write_universe):
+    write_universe(tmp_path / "data", n=6_000)
+    engine, db = BacktestEngine(str(tmp_path / "data")), ResultsDB(tmp_path / "results.sqlite")
+    serial = [run_backtest(_config(tp=tp), engine, db).total_trades for tp in (0.8, 1.2)]
+
+    with engine.shared_pool(2):
+        executor = engine._executor
+        pooled = [run_backtest(_config(tp=tp, serial=False), engine, db).total_trades for tp in (0.8, 1.2)]
+        assert engine._executor is executor
+    assert engine._executor is None
+    assert pooled == serial
+
+def test_mega_grid_imports_sheet_history(tmp_path, monkeypatch):
+    import sheets
+    from run_mega_grid import generate_strategy_name, import_sheet_history, run_key_for
+    grid = [("SHORT", "pump", "none", tp, 1.0, 2.0) for tp in (1.0, 3.0)]
+    monkeypatch.setattr(sheets, "get_existing_strategies", lambda: {generate_strategy_name(*grid[0])})
+    db = ResultsDB(tmp_path / "results.sqlite")
+
+    assert import_sheet_history(db, grid) == 1
+    assert db.completed_keys() == {run_key_for(*grid[0])}
@@ -0,0 +1,70 @@
+import polars as pl
+from datetime import datetime, timedelta
+from src import scanner, storage, strategy
+
+def _week(start, closes):
+    n = len(closes)
+    opens = [100.0] * n
+    return pl.DataFrame({
+        "ts_1s": [start + timedelta(seconds=5 * i) for i in range(n)],
+        "open": opens,
+        "high": [max(o, c) + 0.1 for o, c in zip(opens, closes)],
+        "low": [min(o, c) - 0.1 for o, c in zip(opens, closes)],
+        "close": closes,
+        "volume": [1.0] * n,
+    }).with_columns(pl.col("ts_1s").dt.replace_time_zone("Europe/Istanbul"))
+
+def test_lazy_scan_matches_eager_detect_signals(tmp_path):
+    weeks = [datetime(2024, 1, 7, 3), datetime(2024, 1, 14, 3)]
+    for sym, profile in (("BTCUSDT", "default"), ("ETHUSDT", "compact")):
+        tf_dir = tmp_path / "raw" / sym / "5s"
+        tf_dir.mkdir(parents=True)
+        for k, start in enumerate(weeks):
+            closes = [100.0, 103.0, 100.5, 97.0, 101.0 + k]
+            storage.write_bars(_week(start, closes), tf_dir / f"{start:%Y-%m-%d}.parquet", profile=profile)
+
+    out = scanner.run_scanner(tmp_path, fmt="parquet", output=tmp_path / "report.parquet")
+    report = pl.read_parquet(out)
+
+    expected = []
+    for sym in ("BTCUSDT", "ETHUSDT"):
+        df = strategy.detect_signals(storage.read_bars(tmp_path / "raw" / sym / "5s")).filter("signal_entry")
+        expected.append(df.select(pl.lit(sym).alias("symbol"), pl.lit("5s").alias("timeframe"),
+                                  pl.col("ts_1s").alias("timestamp"), "open", "close", "change_pct", "marubozu_ratio"))
+    expected = pl.concat(expected).sort(["timestamp", "symbol"])
+
+    assert report.height == 8  # +3% and -3% bar, 2 weeks x 2 symbols
+    assert report.sort(["timestamp", "symbol"]).equals(expected)
+
+def test_incremental_scan_reads_only_new_weeks(tmp_path, monkeypatch):
+    tf_dir = tmp_path / "raw" / "BTCUSDT" / "5s"
+    tf_dir.mkdir(parents=True)
+    store, state_file = tmp_path / "signals", tmp_path / "scanner_state.json"
+    run = lambda: scanner.run_incremental_scan(tmp_path, store_dir=store, state_file=state_file, warmup_bars=2)
+
+    storage.write_bars(_week(datetime(2024, 1, 7, 3), [100.0, 103.0, 100.5]), tf_dir / "2024-01-07.parquet")
+    assert run() == 1
+    assert run() == 0  # nothing new
+
+    # Only the new week is read (the old one is touched just for its warm-up tail)
+    scanned = []
+    original = storage.scan_bar_files
+    monkeypatch.setattr(storage, "scan_bar_files", lambda files, **kw: scanned.append([f.name for f in files]) or original(files, **kw))
+    storage.write_bars(_week(datetime(2024, 1, 14, 3), [97.0, 100.2, 103.5]), tf_dir / "2024-01-14.parquet")
+    assert run() == 2
+    assert sorted(scanned) == [["2024-01-07.parquet"], ["2024-01-14.parquet"]]
+
+    stored = scanner.load_signals(store).collect()
+    assert stored["close"].to_list() == [103.0, 97.0, 103.5]
+    assert len(list(store.glob("part-*.parquet"))) == 2
+
+def test_default_dir_falls_back_to_legacy_files(tmp_path, monkeypatch):
+    from src import config
+    processed = tmp_path / "raw"
+    processed.mkdir()
+    storage.write_bars(_week(datetime(2024, 1, 7, 3), [100.0, 103.0, 100.5]), processed / "BTCUSDT_5s.parquet")
+    monkeypatch.setattr(config, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(config, "PROCESSED_DATA_DIR", processed)
+
+    report = pl.read_parquet(scanner.run_scanner(fmt="parquet", output=tmp_path / "report.parquet"))
+    assert report.select("symbol", "timeframe", "close").rows() == [("BTCUSDT", "5s", 103.0)]
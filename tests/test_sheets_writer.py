@@ -0,0 +1,69 @@
+import pytest
+import sheets
+from sheets import SheetsWriter, build_row
+
+class FakeSpreadsheet:
+    def __init__(self):
+        self.batch_updates = 0
+
+    def batch_update(self, body):
+        self.batch_updates += 1
+
+class FakeWorksheet:
+    """Local stand-in for a gspread worksheet: rows inserted at the top, API calls counted."""
+    id = 0
+
+    def __init__(self, fail=False):
+        self.rows = []
+        self.calls = 0
+        self.fail = fail
+        self.spreadsheet = FakeSpreadsheet()
+
+    def insert_rows(self, rows, row, value_input_option=None):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("quota exceeded")
+        assert row == 3
+        self.rows[0:0] = rows
+
+    def row_values(self, row):
+        self.calls += 1
+        return []
+
+def _summary(i):
+    return {"strategy_name": f"[SHORT] PUMP EMA:none Pump:{i}.0% TP:4.0% SL:2.0% TSL:OFF M:0.8",
+            "total_trades": i, "total_pnl": float(i), "win_rate": 50.0, "timestamp": f"t{i}"}
+
+def test_rows_are_coalesced_and_formatted_once():
+    ws = FakeWorksheet()
+    writer = SheetsWriter(flush_rows=10, flush_seconds=1e9, worksheet=ws)
+    for i in range(25):
+        writer.add(_summary(i))
+    writer.close()
+
+    # 3 inserts + one headers read; formatting batch_update once
+    assert ws.calls == 4 and ws.spreadsheet.batch_updates == 1
+    assert writer.rows_written == 25
+    # Newest on top, same values as the single-row path
+    assert [r[0] for r in ws.rows] == [f"t{i}" for i in reversed(range(25))]
+    assert ws.rows[-1] == build_row(_summary(0))
+
+def test_time_based_flush(monkeypatch):
+    ws = FakeWorksheet()
+    clock = iter([0.0, 1.0, 31.0])
+    monkeypatch.setattr(sheets.time, "monotonic", lambda: next(clock))
+    writer = SheetsWriter(flush_rows=100, flush_seconds=30.0, worksheet=ws)
+    writer.add(_summary(1))   # t=0 starts the window
+    writer.add(_summary(2))   # t=1
+    assert ws.rows == []
+    writer.add(_summary(3))   # t=31 -> flush
+    assert len(ws.rows) == 3
+
+def test_failed_push_is_not_kept():
+    ws = FakeWorksheet(fail=True)
+    writer = SheetsWriter(worksheet=ws)
+    with pytest.raises(ConnectionError):
+        writer.push([_summary(1), _summary(2)])
+    ws.fail = False
+    writer.push([_summary(3)])
+    assert [r[0] for r in ws.rows] == ["t3"]
@@ -0,0 +1,25 @@
+import numpy as np
+from conditions.signal_batch import SignalConfig, evaluate_signals, signal_indices
+from conditions.vectorized_strategy import VectorizedStrategy
+
+def test_batch_matches_process_data(make_bars, emas):
+    df = make_bars()
+    configs = [SignalConfig(cond, 0.002, ema, 0.6) for cond in ("pump", "dump") for ema in emas]
+    matrix = evaluate_signals(df, configs)
+    indices = signal_indices(df, configs)
+
+    for k, config in enumerate(configs):
+        strat = VectorizedStrategy(cond=config.cond, pump_threshold=config.threshold,
+                                   dump_threshold=config.threshold, ema=config.ema,
+                                   marubozu_threshold=config.marubozu)
+        out = strat.process_data(df.copy())
+        expected = np.zeros(len(df), dtype=bool) if out is None else out["entry_signal"].to_numpy()
+        assert np.array_equal(matrix[k], expected), config
+        assert np.array_equal(indices[k], np.flatnonzero(expected)), config
+
+    # Sanity: the sweep is not trivially empty
+    assert matrix.any(axis=1).sum() > len(configs) // 2
+
+def test_config_from_strategy_kwargs():
+    config = SignalConfig.from_strategy_kwargs(cond="DUMP", pump_threshold=0.01, dump_threshold=0.03, ema="All_Bull")
+    assert config == SignalConfig("dump", 0.03, "all_bull", 0.80)
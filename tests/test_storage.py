@@ -0,0 +1,78 @@
+import json
+import pytest
+import polars as pl
+from datetime import datetime
+from src import storage
+
+def _bars(seconds):
+    return pl.DataFrame({
+        "ts_1s": [datetime(2024, 1, 1, 0, 0, s) for s in seconds],
+        "open": [float(s) for s in seconds],
+        "high": [float(s) + 1 for s in seconds],
+        "low": [float(s) - 1 for s in seconds],
+        "close": [float(s) for s in seconds],
+        "volume": [1.0] * len(seconds),
+    })
+
+def test_write_sorts_dedups_and_flags(tmp_path):
+    path = tmp_path / "week.parquet"
+    written = storage.write_bars(_bars([3, 1, 2, 2]), path)
+
+    assert written["ts_1s"].to_list() == sorted(set(written["ts_1s"].to_list()))
+    assert written.height == 3
+    assert storage.is_sorted_on_write(path)
+
+    df = storage.read_bars(path)
+    assert df.height == 3
+    assert df["ts_1s"].flags["SORTED_ASC"]
+
+def test_read_dir_trusts_flagged_weeks(tmp_path):
+    storage.write_bars(_bars([0, 1, 2]), tmp_path / "2024-01-01_to_2024-01-08.parquet")
+    storage.write_bars(_bars([3, 4]), tmp_path / "2024-01-08_to_2024-01-15.parquet")
+
+    df = storage.read_bars(tmp_path)
+    assert df["open"].to_list() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert df["ts_1s"].flags["SORTED_ASC"]
+
+def test_read_legacy_files_sorts_and_dedups(tmp_path):
+    _bars([2, 1]).write_parquet(tmp_path / "a.parquet")
+    _bars([1, 0]).write_parquet(tmp_path / "b.parquet")
+    assert not storage.is_sorted_on_write(tmp_path / "a.parquet")
+
+    df = storage.read_bars(tmp_path)
+    assert df["open"].to_list() == [0.0, 1.0, 2.0]
+
+def test_compact_profile_round_trips_to_default_schema(tmp_path):
+    df = _bars([0, 5, 10]).with_columns(
+        pl.col("ts_1s").dt.replace_time_zone("Europe/Istanbul"),
+        (pl.col("close") / 10_000.0 + 0.1234).alias("close"),
+        pl.Series("volume", [0.1 + 0.2, 1.5, 2.0]),
+    )
+    path = tmp_path / "week.parquet"
+    storage.write_bars(df, path, profile="compact")
+
+    raw = pl.read_parquet(path)
+    assert raw.schema["ts_1s"] == pl.Int32
+    assert raw.schema["close"] == pl.Int64
+
+    back = storage.read_bars(path)
+    assert back.schema == df.schema
+    assert back.drop("volume").equals(df.drop("volume"))
+    assert back["volume"].to_list() == pytest.approx(df["volume"].to_list(), rel=1e-12)
+
+def test_compact_tick_size_falls_back_when_prices_are_finer(tmp_path):
+    path = tmp_path / "week.parquet"
+    # Registry tick 0.1 (1 decimal) fits open/high/low; close needs 4 decimals (older, finer tick)
+    df = _bars([0, 1]).with_columns((pl.col("close") + 0.0001).alias("close"))
+    storage.write_bars(df, path, profile="compact", price_decimals=1)
+
+    spec = json.loads(storage.read_bar_metadata(path)[storage.COMPACT_METADATA_KEY])
+    assert spec["columns"]["open"]["decimals"] == 1
+    assert spec["columns"]["close"]["decimals"] == 4
+    assert storage.read_bars(path).equals(df)
+
+def test_read_bars_projection(tmp_path):
+    storage.write_bars(_bars([0, 1, 2]), tmp_path / "2024-01-01_to_2024-01-08.parquet", profile="compact")
+    df = storage.read_bars(tmp_path, columns=["close", "open_time"])
+    assert df.columns == ["ts_1s", "close"]
+    assert df["close"].to_list() == [0.0, 1.0, 2.0]
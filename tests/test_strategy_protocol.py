@@ -0,0 +1,69 @@
+import numpy as np
+import polars as pl
+import pytest
+from datetime import datetime, timedelta
+from backtest_framework import (ExitParams, SignalStrategy, process_single_pair_polars, process_single_pair_signals,
+                                simulate_exits)
+from conditions.vectorized_strategy import VectorizedStrategy
+from src import storage
+from strategies.polars_ema_chain import PolarsEmaChain
+
+class ClosingAbove(SignalStrategy):
+    """Minimal protocol strategy: reads only 'close'."""
+    required_columns = ('close',)
+    warmup_bars = 100
+
+    def __init__(self, level=100.0, **kwargs):
+        super().__init__()
+        self.level, self.tp, self.sl, self.side = level, 0.01, 0.01, 'LONG'
+
+    def signals(self, bars):
+        assert set(bars.columns) <= {'ts_1s', 'open_time', 'close', 'high', 'low'}
+        return pl.col("close") > self.level
+
+def test_signal_protocol_worker(tmp_path, write_dataset):
+    tf_dir = write_dataset(tmp_path)
+
+    # VectorizedStrategy through the protocol == legacy turbo worker
+    kwargs = dict(side="SHORT", tsl=0.003, tp=0.01, sl=0.008, cond="pump", pump_threshold=0.002,
+                  marubozu_threshold=0.6, ema="big_bull_small_bear", use_cache=False)
+    protocol = process_single_pair_signals((str(tf_dir), VectorizedStrategy, False, kwargs))
+    assert protocol == process_single_pair_polars((str(tf_dir), VectorizedStrategy, False, kwargs))
+
+    # Projection + warm-up: no entry inside the first 100 bars
+    trades = process_single_pair_signals((str(tf_dir), ClosingAbove, False, {"level": 0.0, "use_cache": False}))
+    assert trades[0].entry_time == str(datetime(2024, 1, 1) + timedelta(seconds=5 * 100))
+
+def _ema_chain_mask(df, pump_threshold):
+    """BULLISH + pump + marubozu entries computed with pandas, independent of the Polars expression."""
+    periods = [9, 20, 50, 100, 200, 300, 500, 1000, 2000, 5000]
+    ema = {p: df["close"].ewm(span=p, adjust=False, min_periods=p).mean().to_numpy() for p in periods}
+    small = np.all([ema[a] > ema[b] * 1.0000001 for a, b in zip(periods[:4], periods[1:5])], axis=0)
+    big = np.all([ema[a] > ema[b] * 1.000001 for a, b in zip(periods[5:9], periods[6:])], axis=0)
+    o, h, l, c = (df[k].to_numpy() for k in ("open", "high", "low", "close"))
+    marubozu = (h - l > 0) & (np.abs(c - o) / np.where(h - l > 0, h - l, 1) >= 0.80)
+    return small & big & ((c - o) / o > pump_threshold) & marubozu
+
+def test_polars_ema_chain_uses_protocol(tmp_path, write_dataset):
+    tf_dir = write_dataset(tmp_path, n=30_000)
+    df = storage.read_bars(tf_dir).to_pandas()
+    mask = _ema_chain_mask(df, 0.002)
+    assert mask.sum() > 5
+
+    for side, tsl, bet_size in (("SHORT", 0.0, 7.0), ("LONG", 0.002, 10.0)):
+        kwargs = dict(trend="BULLISH", pump_threshold=0.002, side=side, tsl=tsl, bet_size=bet_size, tp=0.01, sl=0.008)
+        trades = process_single_pair_signals((str(tf_dir), PolarsEmaChain, False, dict(kwargs, use_cache=False)))
+        assert len(trades) > 0 and all(t.symbol == "BTCUSDT_5s" for t in trades)
+
+        exits = ExitParams(side=side, tp=0.01, sl=0.008, tsl=tsl, bet_size=bet_size)
+        expected = simulate_exits(mask, df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy(),
+                                  [str(t) for t in df["ts_1s"]], exits, "BTCUSDT_5s")
+        assert [t.entry_time for t in trades] == [t.entry_time for t in expected]
+        assert trades == expected
+
+        # Side, bet size and trailing SL reach the trades
+        for t in trades:
+            move = (t.exit_price - t.entry_price) / t.entry_price
+            assert t.pnl_percent == pytest.approx(move if side == "LONG" else -move)
+            assert t.pnl_usd == pytest.approx(bet_size * t.pnl_percent)
+        assert any(t.type == "TSL" for t in trades) == (tsl > 0)
@@ -0,0 +1,28 @@
+import json
+import numpy as np
+from conditions.signal_batch import SignalConfig, evaluate_signals
+from conditions.streaming_signals import StreamingSignalEngine
+from conditions.vectorized_strategy import VectorizedStrategy
+
+def test_replay_matches_process_data_exactly(make_bars, emas):
+    df = make_bars()
+    configs = [SignalConfig(cond, 0.002, ema, 0.6) for cond in ("pump", "dump") for ema in emas]
+    streamed = StreamingSignalEngine(configs).replay(df)
+    assert np.array_equal(streamed, evaluate_signals(df, configs))
+
+    strat = VectorizedStrategy(cond="pump", pump_threshold=0.002, ema="all_bull", marubozu_threshold=0.6)
+    expected = strat.process_data(df.copy())["entry_signal"].to_numpy()
+    live = [strat.on_candle(None, o, h, l, c) is not None
+            for o, h, l, c in zip(df["open"], df["high"], df["low"], df["close"])]
+    assert np.array_equal(np.array(live), expected)
+
+def test_snapshot_restore_resumes_identically(make_bars):
+    df = make_bars(n=8_000, seed=3)
+    configs = [SignalConfig("pump", 0.002, "big_bull_small_bear", 0.6), SignalConfig("dump", 0.002, "all_bear", 0.6)]
+    full = StreamingSignalEngine(configs).replay(df)
+
+    head = StreamingSignalEngine(configs)
+    head.replay(df.iloc[:5_500])
+    state = json.loads(json.dumps(head.snapshot()))
+    tail = StreamingSignalEngine.restore(state).replay(df.iloc[5_500:])
+    assert np.array_equal(tail, full[:, 5_500:])
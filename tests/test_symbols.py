@@ -0,0 +1,74 @@
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from src import symbols
+
+def _registry():
+    return {
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+        "symbols": {
+            "BTCUSDT": {"listed": "2019-09-08", "delisted": None, "status": "TRADING", "last_seen": "2024-03-01"},
+            "NEWUSDT": {"listed": "2024-02-15", "delisted": None, "status": "TRADING", "last_seen": "2024-03-01"},
+            "OLDUSDT": {"listed": "2021-01-01", "delisted": "2024-01-10", "status": "DELISTED", "last_seen": "2024-01-10"},
+        },
+    }
+
+def test_merge_keeps_vanished_symbols_as_delisted():
+    registry = _registry()
+    fetched = {
+        "BTCUSDT": {"listed": "2019-09-08", "delisted": None, "status": "TRADING"},
+        "NEWUSDT": {"listed": "2024-02-15", "delisted": None, "status": "SETTLING"},
+    }
+    merged = symbols.merge_registry(registry, fetched, today=date(2024, 3, 5))
+
+    assert set(merged["symbols"]) == {"BTCUSDT", "NEWUSDT", "OLDUSDT"}
+    assert merged["symbols"]["NEWUSDT"]["delisted"] == "2024-03-05"
+    assert merged["symbols"]["OLDUSDT"]["delisted"] == "2024-01-10"
+
+    # Vanishes on the next refresh: keeps its original delisting day
+    merged = symbols.merge_registry(merged, {"BTCUSDT": fetched["BTCUSDT"]}, today=date(2024, 3, 9))
+    assert merged["symbols"]["NEWUSDT"]["status"] == "DELISTED"
+    assert merged["symbols"]["NEWUSDT"]["delisted"] == "2024-03-05"
+
+def test_active_symbols_by_range():
+    registry = _registry()
+    assert symbols.active_symbols(registry=registry) == ["BTCUSDT", "NEWUSDT"]
+    assert symbols.active_symbols(date(2024, 1, 1), date(2024, 1, 7), registry=registry) == ["BTCUSDT", "OLDUSDT"]
+    assert symbols.active_symbols(date(2024, 2, 11), date(2024, 2, 17), registry=registry) == ["BTCUSDT", "NEWUSDT"]
+
+def test_has_data_on_listing_window():
+    registry = _registry()
+    assert not symbols.has_data_on("NEWUSDT", date(2024, 2, 14), registry)
+    assert symbols.has_data_on("NEWUSDT", date(2024, 2, 15), registry)
+    assert symbols.has_data_on("OLDUSDT", datetime(2024, 1, 10, 23, tzinfo=timezone.utc), registry)
+    assert not symbols.has_data_on("OLDUSDT", date(2024, 1, 11), registry)
+    assert symbols.has_data_on("UNKNOWNUSDT", date(2024, 1, 1), registry)
+
+def test_get_registry_offline_and_fetch_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr(symbols, "REGISTRY_FILE", tmp_path / "symbols.json")
+
+    def unreachable():
+        raise ConnectionError("no network")
+    monkeypatch.setattr(symbols, "fetch_exchange_symbols", unreachable)
+
+    with pytest.raises(RuntimeError):
+        symbols.get_registry(offline=True)
+
+    stale = _registry()
+    stale["fetched_at"] = (datetime.now(timezone.utc) - timedelta(days=3)).isoformat()
+    symbols.save_registry(stale)
+
+    # Expired + API down -> cached copy is served
+    assert set(symbols.get_registry()["symbols"]) == {"BTCUSDT", "NEWUSDT", "OLDUSDT"}
+    assert symbols.get_registry(offline=True)["fetched_at"] == stale["fetched_at"]
+
+def test_tick_size_kept_as_price_decimals():
+    registry = _registry()
+    fetched = {"BTCUSDT": {"listed": "2019-09-08", "delisted": None, "status": "TRADING", "tick_size": "0.10"}}
+    merged = symbols.merge_registry(registry, fetched, today=date(2024, 3, 5))
+    # A refresh without filters keeps the known tick size
+    merged = symbols.merge_registry(merged, {"BTCUSDT": dict(fetched["BTCUSDT"], tick_size=None)})
+
+    assert symbols.price_decimals("BTCUSDT", merged) == 1
+    assert symbols.price_decimals("NEWUSDT", merged) is None
+    assert symbols.price_decimals("X", {"symbols": {"X": {"tick_size": "0.00001000"}}}) == 5
+    assert symbols.price_decimals("X", {"symbols": {"X": {"tick_size": "1"}}}) == 0
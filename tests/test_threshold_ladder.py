@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+from backtest_framework import BacktestEngine, process_single_pair_signals, process_single_pair_threshold_sweep
+from conditions.signal_batch import SignalConfig, SignalFeatures, ThresholdLadder, signal_indices
+from conditions.vectorized_strategy import VectorizedStrategy
+
+THRESHOLDS = [0.001, 0.0015, 0.002, 0.0025, 0.003]
+
+def test_ladder_matches_signal_indices(make_bars):
+    df = make_bars()
+    features = SignalFeatures(df)
+    for cond in ("pump", "dump"):
+        for ema in ("none", "all_bull", "big_bear_small_bull"):
+            ladder = ThresholdLadder(features, cond, ema, 0.6, min_threshold=min(THRESHOLDS))
+            expected = signal_indices(df, [SignalConfig(cond, t, ema, 0.6) for t in THRESHOLDS])
+            for t, rows in zip(THRESHOLDS, expected):
+                assert np.array_equal(ladder.entries(t), rows), (cond, ema, t)
+
+def test_sweep_worker_matches_per_threshold_runs(tmp_path, write_dataset):
+    tf_dir = write_dataset(tmp_path)
+    for side, tsl in (("SHORT", 0.0), ("LONG", 0.003)):
+        kwargs = dict(side=side, tsl=tsl, tp=0.01, sl=0.008, cond="pump", marubozu_threshold=0.6,
+                      ema="none", use_cache=False)
+        sweep = process_single_pair_threshold_sweep((str(tf_dir), VectorizedStrategy, THRESHOLDS, kwargs))
+        for t in THRESHOLDS:
+            single = process_single_pair_signals((str(tf_dir), VectorizedStrategy, False, dict(kwargs, pump_threshold=t)))
+            assert sweep[t] == single, (side, t)
+        assert len(sweep[THRESHOLDS[0]]) > len(sweep[THRESHOLDS[-1]]) > 0
+
+def test_engine_threshold_sweep(tmp_path, write_dataset):
+    write_dataset(tmp_path)
+    engine = BacktestEngine(data_dir=str(tmp_path))
+    kwargs = dict(side="SHORT", tp=0.01, sl=0.008, cond="dump", marubozu_threshold=0.6, ema="none", use_cache=False)
+    # Engine defaults (max_positions, avg_threshold) are the same as run()'s
+    for engine_kwargs in ({}, dict(max_positions=1)):
+        sweep = engine.run_threshold_sweep(VectorizedStrategy, THRESHOLDS[:2], parallel=False, **engine_kwargs, **kwargs)
+        for t in THRESHOLDS[:2]:
+            single = engine.run(VectorizedStrategy, parallel=False, dump_threshold=t, **engine_kwargs, **kwargs)
+            pd.testing.assert_frame_equal(sweep[t], single)